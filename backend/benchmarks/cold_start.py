@@ -0,0 +1,139 @@
+# uv run benchmarks/cold_start.py
+
+"""Imports each Lambda handler in a fresh interpreter and reports how long the import took and how much memory it used.
+
+Importing the handler module is what a Lambda cold start does before the first invocation, so regressions here show up
+directly as cold start latency.  Pass `--max-import-ms` to fail when any handler takes longer than that to import.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+HANDLERS = [
+    "src.external.aws.lambdas.authenticate",
+    "src.external.aws.lambdas.token",
+    "src.external.aws.lambdas.get_extracted_document",
+    "src.external.aws.lambdas.get_document_status",
+    "src.external.aws.lambdas.s3_file_upload",
+    "src.external.aws.lambdas.s3_direct_upload",
+    "src.external.aws.lambdas.s3_complete_upload",
+    "src.external.aws.lambdas.update_extracted_document",
+    "src.external.aws.lambdas.sqs_dynamo_writer",
+    "src.external.aws.lambdas.text_extractor",
+    "src.external.aws.lambdas.textract_completion",
+]
+
+# the handlers read these at import time
+HANDLER_ENVIRONMENT = {
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "AWS_ACCESS_KEY_ID": "benchmark",
+    "AWS_SECRET_ACCESS_KEY": "benchmark",
+    "ENVIRONMENT": "benchmark",
+    "SQS_QUEUE_URL": "https://sqs.us-east-1.amazonaws.com/000000000000/benchmark",
+    "DYNAMODB_TABLE": "benchmark",
+}
+
+MEASURE_IMPORT = """
+import importlib
+import json
+import resource
+import sys
+import time
+import tracemalloc
+
+baseline_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+tracemalloc.start()
+start = time.perf_counter()
+if sys.argv[1]:
+    importlib.import_module(sys.argv[1])
+import_seconds = time.perf_counter() - start
+_, peak_traced_bytes = tracemalloc.get_traced_memory()
+
+print(
+    json.dumps(
+        {
+            "import_seconds": import_seconds,
+            "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "baseline_rss_kb": baseline_rss_kb,
+            "peak_traced_bytes": peak_traced_bytes,
+        }
+    )
+)
+"""
+
+
+def measure(module: str, python: str, code_path: Path, isolated: bool = False) -> dict:
+    """Imports the module in a fresh interpreter started in `code_path`.
+
+    With `isolated`, the interpreter's site-packages aren't used, so everything has to come from `code_path` like in a
+    Lambda.
+    """
+    environment = {**os.environ, **HANDLER_ENVIRONMENT, "PYTHONDONTWRITEBYTECODE": "1"}
+    interpreter_options = ["-S"] if isolated else []
+    completed = subprocess.run(
+        [python, *interpreter_options, "-c", MEASURE_IMPORT, module],
+        cwd=code_path,
+        env=environment,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def benchmark(modules: list[str], repeat: int, python: str = sys.executable, code_path: Path = Path(".")) -> list[dict]:
+    results = []
+
+    for module in modules:
+        measurements = [measure(module, python, code_path) for _ in range(repeat)]
+        results.append(
+            {
+                "handler": module,
+                "import_ms": statistics.median(m["import_seconds"] for m in measurements) * 1000,
+                "peak_rss_mb": max(m["peak_rss_kb"] for m in measurements) / 1024,
+                "rss_increase_mb": max(m["peak_rss_kb"] - m["baseline_rss_kb"] for m in measurements) / 1024,
+                "peak_python_allocations_mb": max(m["peak_traced_bytes"] for m in measurements) / (1024 * 1024),
+            }
+        )
+
+    return results
+
+
+def print_report(results: list[dict]):
+    print(f"{'handler':<55} {'import ms':>10} {'peak RSS MB':>12} {'RSS +MB':>9} {'Python +MB':>11}")
+    for result in results:
+        print(
+            f"{result['handler']:<55} {result['import_ms']:>10.1f} {result['peak_rss_mb']:>12.1f} "
+            f"{result['rss_increase_mb']:>9.1f} {result['peak_python_allocations_mb']:>11.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("handlers", nargs="*", default=HANDLERS, help="handler modules to import")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per handler, the median is reported")
+    parser.add_argument("--max-import-ms", type=float, help="fail if any handler takes longer than this to import")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    arguments = parser.parse_args()
+
+    results = benchmark(arguments.handlers, arguments.repeat)
+
+    if arguments.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+    if arguments.max_import_ms is not None:
+        too_slow = [result["handler"] for result in results if result["import_ms"] > arguments.max_import_ms]
+        if too_slow:
+            print(f"Slower than {arguments.max_import_ms} ms to import: {', '.join(too_slow)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
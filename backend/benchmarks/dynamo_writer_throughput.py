@@ -0,0 +1,118 @@
+# uv run benchmarks/dynamo_writer_throughput.py
+
+"""Compares how fast sqs_dynamo_writer gets through batches of messages one at a time versus batched.
+
+The database is a stand-in for DynamoDB that takes a fixed time per request plus a little per item, and leaves some
+items of every batch write unprocessed like a throttled table does.  The one-at-a-time numbers also pay for the
+DeleteMessage call the writer used to make for every message.
+"""
+
+import json
+import logging
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from unittest import mock
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.insert(0, Path(__file__).parent.parent.as_posix())
+
+from src import context  # noqa: E402
+from src.database.database import Database  # noqa: E402
+from src.documents import write_document  # noqa: E402
+from src.external.aws.dynamodb import DynamoDb  # noqa: E402
+from src.external.aws.lambdas import sqs_dynamo_writer  # noqa: E402
+
+BATCH_SIZES = [10, 100]
+BATCHES = 5
+
+REQUEST_SECONDS = 0.008
+ITEM_SECONDS = 0.0002
+UNPROCESSED_FRACTION = 0.1
+
+
+class LocalDynamoDbClient:
+    def __init__(self, randomness: random.Random):
+        self.randomness = randomness
+        self.requests = 0
+
+    def put_item(self, TableName, Item):
+        self._request(1)
+
+    def batch_write_item(self, RequestItems):
+        (table, requests), *_ = RequestItems.items()
+        self._request(len(requests))
+
+        unprocessed = [request for request in requests if self.randomness.random() < UNPROCESSED_FRACTION]
+        return {"UnprocessedItems": {table: unprocessed} if unprocessed else {}}
+
+    def delete_message(self, QueueUrl, ReceiptHandle):
+        self._request(1)
+
+    def _request(self, items: int):
+        self.requests += 1
+        time.sleep(REQUEST_SECONDS + ITEM_SECONDS * items)
+
+
+def sqs_event(batch_size: int) -> dict:
+    return {
+        "Records": [
+            {
+                "messageId": str(index),
+                "receiptHandle": str(index),
+                "body": json.dumps(
+                    {
+                        "document_url": f"s3://bucket/input/document-{index}.jpg",
+                        "document_type": "W2",
+                        "extracted_data": {"field": {"value": "value", "confidence": 99.5}},
+                    }
+                ),
+            }
+            for index in range(batch_size)
+        ]
+    }
+
+
+def one_at_a_time(event: dict, client: LocalDynamoDbClient):
+    """How the writer handled a batch before it was batched."""
+    for record in event["Records"]:
+        message_body = json.loads(record["body"])
+        write_document.update_document(
+            message_body["document_url"], message_body.get("document_type"), message_body.get("extracted_data", {})
+        )
+        client.delete_message(QueueUrl="queue", ReceiptHandle=record["receiptHandle"])
+
+
+def batched(event: dict, client: LocalDynamoDbClient):
+    sqs_dynamo_writer.lambda_handler(event, None)
+
+
+def measure(process, batch_size: int) -> tuple[float, float]:
+    client = LocalDynamoDbClient(random.Random(batch_size))
+    with mock.patch("src.external.aws.clients.client", return_value=client):
+        database = DynamoDb()
+    database.table = "table"
+    context.ApplicationContext().register(Database, database)
+
+    start = time.perf_counter()
+    for _ in range(BATCHES):
+        process(sqs_event(batch_size), client)
+    elapsed = time.perf_counter() - start
+
+    return batch_size * BATCHES / elapsed, client.requests / BATCHES
+
+
+def main():
+    logging.disable(logging.INFO)
+
+    print(f"{'batch size':>10} {'mode':<14} {'messages/s':>11} {'requests/batch':>15}")
+    for batch_size in BATCH_SIZES:
+        for name, process in [("one at a time", one_at_a_time), ("batched", batched)]:
+            messages_per_second, requests_per_batch = measure(process, batch_size)
+            print(f"{batch_size:>10} {name:<14} {messages_per_second:>11.0f} {requests_per_batch:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
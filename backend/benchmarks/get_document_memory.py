@@ -0,0 +1,108 @@
+# uv run benchmarks/get_document_memory.py
+
+"""Measures how much memory get_extracted_document allocates for documents of different sizes.
+
+The handler runs against a stand-in S3 that streams the document out of memory the same way boto3 streams it off the
+network, so the measurement only counts what the handler itself allocates.  It compares the old way of inlining the
+document (reading the whole file and then base64 encoding it), the streaming base64 encoding, and leaving the file out
+of the response.
+"""
+
+import base64
+import io
+import json
+import logging
+import os
+import sys
+import tracemalloc
+from pathlib import Path
+from unittest import mock
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.insert(0, Path(__file__).parent.parent.as_posix())
+
+from src import context  # noqa: E402
+from src.database.data.document_item import DocumentItem  # noqa: E402
+from src.database.database import Database  # noqa: E402
+from src.external.aws.lambdas import get_extracted_document  # noqa: E402
+from src.external.aws.s3 import S3  # noqa: E402
+from src.storage import CloudStorage  # noqa: E402
+
+DOCUMENT_SIZES_MB = [1, 5, 20]
+DOCUMENT_ID = "benchmark"
+
+
+class InMemoryS3Client:
+    def __init__(self, document: bytes):
+        self.document = document
+
+    def get_object(self, Bucket: str, Key: str):
+        # BytesIO shares the bytes instead of copying them, like a network stream wouldn't hold the file
+        return {"Body": io.BytesIO(self.document), "ContentLength": len(self.document)}
+
+    def generate_presigned_url(self, *args, **kwargs):
+        return "https://bucket.s3.amazonaws.com/input/benchmark.pdf?X-Amz-Signature=benchmark"
+
+
+def inline_whole_file(s3: S3, event: dict) -> str:
+    """How the handler inlined the document before it was streamed."""
+    document_data = s3.get_file("s3://bucket/input/benchmark.pdf")
+    response = {
+        "document_id": DOCUMENT_ID,
+        "signed_url": s3.access_url("s3://bucket/input/benchmark.pdf"),
+        "base64_encoded_file": base64.b64encode(document_data).decode("utf-8"),
+    }
+    return json.dumps(response)
+
+
+def handler(s3: S3, event: dict) -> str:
+    return get_extracted_document.lambda_handler(event, None)["body"]
+
+
+def peak_allocation_mb(function, s3: S3, event: dict) -> float:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    body = function(s3, event)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del body
+    return peak / (1024 * 1024)
+
+
+def main():
+    logging.disable(logging.INFO)
+
+    application_context = context.ApplicationContext()
+
+    mock_database = mock.MagicMock()
+    mock_database.get_document.return_value = DocumentItem(DOCUMENT_ID, "s3://bucket/input/benchmark.pdf")
+    application_context.register(Database, mock_database)
+
+    # no cap, so every size is inlined
+    get_extracted_document.max_inline_file_size = None
+
+    # the query string parameters of each way of getting the document
+    modes = {
+        "whole file": (inline_whole_file, None),
+        "streamed": (handler, None),
+        "metadata only": (handler, {"inline_file": "false"}),
+    }
+
+    print(f"{'document MB':>11} " + " ".join(f"{mode + ' MB':>16}" for mode in modes))
+    for size_mb in DOCUMENT_SIZES_MB:
+        document = os.urandom(size_mb * 1024 * 1024)
+        with mock.patch("src.external.aws.clients.client", return_value=InMemoryS3Client(document)):
+            s3 = S3()
+        application_context.register(CloudStorage, s3)
+
+        peaks = [
+            peak_allocation_mb(
+                function, s3, {"pathParameters": {"document_id": DOCUMENT_ID}, "queryStringParameters": query}
+            )
+            for function, query in modes.values()
+        ]
+        print(f"{size_mb:>11} " + " ".join(f"{peak:>16.1f}" for peak in peaks))
+
+
+if __name__ == "__main__":
+    main()
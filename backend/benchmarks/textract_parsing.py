@@ -0,0 +1,262 @@
+# uv run benchmarks/textract_parsing.py
+
+"""Compares reading the lines and key-value pairs of large AnalyzeDocument responses against the parsers it replaced.
+
+The responses are synthetic, dense multi-page forms with lines, words, key-value sets, and query answers, shaped like
+what AnalyzeDocument and GetDocumentAnalysis return (including the geometry the parsers don't read).  Every
+comparison checks that both parsers give the same output before timing them.  Reading the lines and the key-value
+pairs of one response is timed together, because that's what `extract_raw_text_and_forms` does.  Query answers are
+included in the responses only so the blocks are as varied as real ones.
+"""
+
+import os
+import random
+import statistics
+import sys
+import timeit
+from pathlib import Path
+from typing import Any
+
+import iterator_chain
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.insert(0, Path(__file__).parent.parent.as_posix())
+
+from src.external.aws.textract import Textract  # noqa: E402
+from src.ocr import ClassificationScope  # noqa: E402
+
+PAGE_COUNTS = [1, 10, 25]
+LINES_PER_PAGE = 150
+WORDS_PER_LINE = 6
+KEY_VALUE_PAIRS_PER_PAGE = 80
+QUERIES_PER_PAGE = 30
+REPEATS = 15
+HEADER_FRACTION = 0.25
+
+
+class PreviousParsers:
+    """The parsers as they were before reading the lines and the forms in one walk over the blocks, kept here to
+    compare against."""
+
+    @staticmethod
+    def lines_in_scope(textract_response, scope: ClassificationScope, header_fraction: float) -> list[str]:
+        def in_scope(block) -> bool:
+            if scope == ClassificationScope.DOCUMENT:
+                return True
+            if block.get("Page", 1) != 1:
+                return False
+            if scope == ClassificationScope.HEADER:
+                return block["Geometry"]["BoundingBox"]["Top"] < header_fraction
+            return True
+
+        return (
+            iterator_chain.from_iterable(textract_response.get("Blocks", []))
+            .filter(lambda block: block["BlockType"] == "LINE")
+            .filter(lambda block: "Text" in block)
+            .filter(in_scope)
+            .map(lambda block: block["Text"])
+            .list()
+        )
+
+    @staticmethod
+    def parse_forms(textract_response) -> dict:
+        extracted_data = {}
+        key_blocks = []
+        block_map = {}
+
+        for block in textract_response["Blocks"]:
+            compact_block = PreviousParsers.compact_block(block)
+            block_map[block["Id"]] = compact_block
+            if block["BlockType"] == "KEY_VALUE_SET" and "KEY" in block.get("EntityTypes", []):
+                key_blocks.append(compact_block)
+
+        for block in key_blocks:
+            key_text, _ = PreviousParsers.text_and_confidence(block, block_map, "CHILD")
+
+            value_texts = []
+            value_confidences = []
+            for relationship in block.get("Relationships", []):
+                if relationship["Type"] != "VALUE":
+                    continue
+                for related_value_block_id in relationship["Ids"]:
+                    value_text, value_confidence = PreviousParsers.text_and_confidence(
+                        block_map[related_value_block_id], block_map, "CHILD"
+                    )
+                    if value_text != "":
+                        value_texts.append(value_text)
+                        value_confidences.append(value_confidence)
+
+            confidence = -1
+            if len(value_texts) > 0:
+                confidence = statistics.fmean(value_confidences)
+            extracted_data[key_text] = {"value": " ".join(value_texts), "confidence": confidence}
+
+        return extracted_data
+
+    @staticmethod
+    def compact_block(block: Any) -> dict[str, Any]:
+        compact_block = {}
+        if "Text" in block:
+            compact_block["Text"] = block["Text"]
+            compact_block["Confidence"] = block["Confidence"]
+        if "Relationships" in block:
+            compact_block["Relationships"] = block["Relationships"]
+        return compact_block
+
+    @staticmethod
+    def text_and_confidence(block: Any, blocks: dict[str, Any], wanted_relationship: str) -> tuple[str, float]:
+        texts = []
+        confidences = []
+
+        for relationship in block.get("Relationships", []):
+            if relationship["Type"] != wanted_relationship:
+                continue
+
+            related_blocks = [blocks[related_block_id] for related_block_id in relationship.get("Ids", [])]
+            relation_texts = []
+            relation_confidences = []
+            for related_block in related_blocks:
+                if "Text" not in related_block:
+                    continue
+                relation_texts.append(related_block["Text"])
+                relation_confidences.append(related_block["Confidence"])
+
+            if len(relation_texts) > 0:
+                texts.append(" ".join(relation_texts))
+                confidences.append(statistics.fmean(relation_confidences))
+
+        confidence = -1
+        if len(confidences) > 0:
+            confidence = statistics.fmean(confidences)
+        return " ".join(texts), confidence
+
+
+class SyntheticResponse:
+    def __init__(self, page_count: int, randomness: random.Random):
+        self.randomness = randomness
+        self.blocks = []
+        self.next_id = 0
+
+        for page in range(1, page_count + 1):
+            self.add_page(page)
+
+    def block(self, block_type: str, page: int, **attributes) -> dict:
+        self.next_id += 1
+        top = self.randomness.random()
+        block = {
+            "BlockType": block_type,
+            "Id": f"{self.next_id:08x}-5b2c-4b4e-9a3c-{page:012x}",
+            "Page": page,
+            "Geometry": {
+                "BoundingBox": {"Width": 0.2, "Height": 0.01, "Left": 0.1, "Top": top},
+                "Polygon": [{"X": 0.1, "Y": top}, {"X": 0.3, "Y": top}, {"X": 0.3, "Y": top + 0.01}],
+            },
+            **attributes,
+        }
+        self.blocks.append(block)
+        return block
+
+    def words(self, page: int, count: int) -> list[dict]:
+        return [
+            self.block(
+                "WORD",
+                page,
+                Text=f"word{self.randomness.randrange(10_000)}",
+                Confidence=self.randomness.uniform(50, 100),
+                TextType="PRINTED",
+            )
+            for _ in range(count)
+        ]
+
+    def add_page(self, page: int):
+        self.block("PAGE", page)
+
+        for _ in range(LINES_PER_PAGE):
+            words = self.words(page, WORDS_PER_LINE)
+            self.block(
+                "LINE",
+                page,
+                Text=" ".join(word["Text"] for word in words),
+                Confidence=self.randomness.uniform(50, 100),
+                Relationships=[{"Type": "CHILD", "Ids": [word["Id"] for word in words]}],
+            )
+
+        for pair in range(KEY_VALUE_PAIRS_PER_PAGE):
+            value_words = self.words(page, self.randomness.randrange(0, 4))
+            value = self.block(
+                "KEY_VALUE_SET",
+                page,
+                Confidence=self.randomness.uniform(50, 100),
+                EntityTypes=["VALUE"],
+                Relationships=[{"Type": "CHILD", "Ids": [word["Id"] for word in value_words]}] if value_words else [],
+            )
+            key_words = self.words(page, 3)
+            key_words[0]["Text"] = f"Page {page} field {pair}"
+            self.block(
+                "KEY_VALUE_SET",
+                page,
+                Confidence=self.randomness.uniform(50, 100),
+                EntityTypes=["KEY"],
+                Relationships=[
+                    {"Type": "VALUE", "Ids": [value["Id"]]},
+                    {"Type": "CHILD", "Ids": [word["Id"] for word in key_words]},
+                ],
+            )
+
+        for query in range(QUERIES_PER_PAGE):
+            answer = self.block(
+                "QUERY_RESULT",
+                page,
+                Text=f"answer{self.randomness.randrange(10_000)}",
+                Confidence=self.randomness.uniform(50, 100),
+            )
+            self.block(
+                "QUERY",
+                page,
+                Query={"Text": f"What is field {query} on page {page}?"},
+                Relationships=[{"Type": "ANSWER", "Ids": [answer["Id"]]}],
+            )
+
+    def response(self) -> dict:
+        return {"DocumentMetadata": {"Pages": self.blocks[-1]["Page"]}, "Blocks": self.blocks}
+
+
+def best_of(function, *args) -> float:
+    # like `timeit`, the garbage collector is off while timing, so a collection doesn't land on one parser by chance
+    return min(timeit.repeat(lambda: function(*args), number=1, repeat=REPEATS))
+
+
+def previous_lines_and_forms(response):
+    return (
+        PreviousParsers.lines_in_scope(response, ClassificationScope.HEADER, HEADER_FRACTION),
+        PreviousParsers.parse_forms(response),
+    )
+
+
+def current_lines_and_forms(response):
+    return Textract._parse_lines_and_forms(response, ClassificationScope.HEADER, HEADER_FRACTION)
+
+
+def main():
+    comparisons = [
+        ("lines and forms", previous_lines_and_forms, current_lines_and_forms),
+    ]
+
+    print(f"{'pages':>5} {'blocks':>8} {'parser':<16} {'before ms':>9} {'after ms':>9} {'speedup':>8}")
+    for page_count in PAGE_COUNTS:
+        response = SyntheticResponse(page_count, random.Random(page_count)).response()
+
+        for name, previous_parser, current_parser in comparisons:
+            if previous_parser(response) != current_parser(response):
+                raise AssertionError(f"The parsers disagree on {name} of {page_count} pages")
+
+            previous_seconds = best_of(previous_parser, response)
+            current_seconds = best_of(current_parser, response)
+            print(
+                f"{page_count:>5} {len(response['Blocks']):>8} {name:<16} {previous_seconds * 1000:>9.1f} "
+                f"{current_seconds * 1000:>9.1f} {previous_seconds / current_seconds:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,30 @@
-# uv run build.py
+# uv run build.py [--optimize] [--per-handler]
 
+import argparse
+import compileall
+import fnmatch
+import importlib.util
+import modulefinder
+import py_compile
 import shutil
 import subprocess
+import sys
 from pathlib import Path
 
+from benchmarks import cold_start
+from src.forms.registry import FormRegistry
+
+LAMBDA_PYTHON_VERSION = (3, 13)
+
+# packages that only carry type information, nothing imports them at runtime
+STUB_PACKAGE_PATTERNS = ["types_*", "mypy_boto3*", "boto3_stubs*", "botocore_stubs*"]
+TEST_FOLDER_NAMES = {"tests", "test"}
+
+HANDLERS_PATH = Path("src", "external", "aws", "lambdas")
+
+# loaded by name at runtime, so import tracing can't find them
+ALWAYS_INCLUDED_CODE = [Path("src", "forms")]
+
 
 def execute(program, *args):
     subprocess.call([program, *args])
@@ -17,7 +38,150 @@ def cp(*args):
     execute("cp", *args)
 
 
-def build():
+def compile_bytecode(folder: Path):
+    print(f"Compiling bytecode for Python {'.'.join(map(str, LAMBDA_PYTHON_VERSION))} in {folder.as_posix()}")
+
+    # the files in the zip don't keep their modification times, so the bytecode is validated by hash instead of by
+    # timestamp, and unchecked because the Lambda file system is read-only anyway
+    if sys.version_info[:2] == LAMBDA_PYTHON_VERSION:
+        compileall.compile_dir(
+            folder, quiet=1, workers=0, invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH
+        )
+    else:
+        uv(
+            "run",
+            "--no-project",
+            "--python",
+            ".".join(map(str, LAMBDA_PYTHON_VERSION)),
+            "python",
+            "-m",
+            "compileall",
+            "-q",
+            "-j",
+            "0",
+            "--invalidation-mode",
+            "unchecked-hash",
+            folder.as_posix(),
+        )
+
+
+def prune(folder: Path):
+    print(f"Removing type stub and test packages from {folder.as_posix()}")
+
+    for path in list(folder.iterdir()):
+        if any(fnmatch.fnmatch(path.name, pattern) for pattern in STUB_PACKAGE_PATTERNS):
+            remove(path)
+
+    for path in list(folder.rglob("*")):
+        if path.is_dir() and path.name in TEST_FOLDER_NAMES:
+            remove(path)
+
+
+def remove(path: Path):
+    if not path.exists():
+        # already removed along with a parent folder
+        return
+
+    if path.is_dir():
+        shutil.rmtree(path)
+    else:
+        path.unlink()
+
+
+def handler_modules() -> list[str]:
+    return [
+        ".".join(handler.with_suffix("").parts)
+        for handler in sorted(HANDLERS_PATH.glob("*.py"))
+        if handler.name != "__init__.py"
+    ]
+
+
+def files_used_by_handler(build_dir: Path, handler_module: str) -> set[Path]:
+    """Finds the files, relative to the build folder, that a handler needs.
+
+    Our own code is included module by module.  A dependency is included as a whole so its data files and shared
+    libraries come along.
+    """
+    finder = modulefinder.ModuleFinder(path=[build_dir.as_posix()])
+    finder.run_script(build_dir.joinpath(*handler_module.split(".")).with_suffix(".py").as_posix())
+
+    files = set(ALWAYS_INCLUDED_CODE)
+
+    for module in finder.modules.values():
+        if module.__file__ is None:
+            continue
+
+        module_file = Path(module.__file__).resolve()
+        if not module_file.is_relative_to(build_dir.resolve()):
+            # part of the standard library
+            continue
+
+        relative_file = module_file.relative_to(build_dir.resolve())
+        if relative_file.parts[0] == "src":
+            files.add(relative_file)
+        else:
+            files.add(Path(relative_file.parts[0]))
+
+    # package metadata and the shared libraries of compiled dependencies are small, so they're always included
+    files.update(path.relative_to(build_dir) for path in build_dir.glob("*.dist-info"))
+    files.update(path.relative_to(build_dir) for path in build_dir.glob("*.libs"))
+
+    return files
+
+
+def build_handler(build_dir: Path, handlers_dir: Path, handler_module: str) -> Path:
+    handler_name = handler_module.rsplit(".", 1)[-1]
+    handler_build_dir = handlers_dir.joinpath(handler_name)
+    print(f"Copying the code {handler_name} uses to {handler_build_dir.as_posix()}")
+
+    for relative_file in files_used_by_handler(build_dir, handler_module):
+        source = build_dir.joinpath(relative_file)
+        destination = handler_build_dir.joinpath(relative_file)
+
+        if source.is_dir():
+            shutil.copytree(src=source, dst=destination, dirs_exist_ok=True)
+            continue
+
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(source, destination)
+
+        # the bytecode of the module, if it was compiled
+        compiled_file = Path(importlib.util.cache_from_source(source.as_posix()))
+        if compiled_file.exists():
+            destination_cache = destination.parent.joinpath("__pycache__")
+            destination_cache.mkdir(exist_ok=True)
+            shutil.copy2(compiled_file, destination_cache.joinpath(compiled_file.name))
+
+    handler_zip = handlers_dir.joinpath(handler_name)
+    print(f"Creating distribution zip at {handler_zip.as_posix()}.zip")
+    shutil.make_archive(handler_zip, "zip", handler_build_dir)
+
+    return handler_build_dir
+
+
+def report(artifacts: list[tuple[str, Path, Path]]):
+    """Prints the size and the time it takes to import the handler for every artifact.
+
+    The import time is measured with the local interpreter and without its site-packages, so only the artifact's own
+    code is used.  Dependencies with compiled code are built for the Lambda architecture, so a handler that needs them
+    can't be imported on a different architecture.
+    """
+    print()
+    print(f"{'artifact':<40} {'handler':<28} {'zip MB':>8} {'import ms':>10}")
+
+    for handler_module, artifact_dir, artifact_zip in artifacts:
+        try:
+            measurement = cold_start.measure(handler_module, sys.executable, artifact_dir, isolated=True)
+            import_ms = f"{measurement['import_seconds'] * 1000:.1f}"
+        except subprocess.CalledProcessError:
+            import_ms = "n/a"
+
+        zip_mb = artifact_zip.stat().st_size / (1024 * 1024)
+        handler_name = handler_module.rsplit(".", 1)[-1]
+        print(f"{artifact_zip.as_posix():<40} {handler_name:<28} {zip_mb:>8.1f} {import_ms:>10}")
+
+
+def build(optimize: bool = False, per_handler: bool = False):
     dist_folder = Path("dist")
 
     if dist_folder.exists():
@@ -37,9 +201,11 @@ def build():
         "pip",
         "install",
         "--no-installer-metadata",
-        "--no-compile-bytecode",
+        "--no-compile-bytecode",  # uv would compile with this machine's interpreter, see compile_bytecode
         "--python-platform",
         "aarch64-manylinux_2_28",  # because the AWS Lambdas use arm64 architecture
+        "--python-version",
+        ".".join(map(str, LAMBDA_PYTHON_VERSION)),
         "--target",
         build_dir.as_posix(),
         "-r",
@@ -49,12 +215,52 @@ def build():
     our_code_path = "src"
     our_code = build_dir.joinpath(our_code_path)
     print(f"Copying our code to {our_code.as_posix()}")
-    shutil.copytree(src=our_code_path, dst=our_code, dirs_exist_ok=True)
+    shutil.copytree(src=our_code_path, dst=our_code, dirs_exist_ok=True, ignore=shutil.ignore_patterns("__pycache__"))
+
+    form_manifest = our_code.joinpath("forms", "manifest.json")
+    print(f"Generating the form manifest at {form_manifest.as_posix()}")
+    FormRegistry.discover().write_manifest(form_manifest)
+
+    if optimize:
+        prune(build_dir)
+        compile_bytecode(build_dir)
 
     lambda_zip = dist_folder.joinpath("lambda")
     print(f"Creating distribution zip at {lambda_zip.as_posix()}.zip")
     shutil.make_archive(lambda_zip, "zip", build_dir)
 
+    artifacts = [(handler, build_dir, lambda_zip.with_suffix(".zip")) for handler in handler_modules()]
+
+    if per_handler:
+        handlers_dir = dist_folder.joinpath("handlers")
+        artifacts += [
+            (
+                handler,
+                build_handler(build_dir, handlers_dir, handler),
+                handlers_dir.joinpath(handler.rsplit(".", 1)[-1]).with_suffix(".zip"),
+            )
+            for handler in handler_modules()
+        ]
+
+    report(artifacts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Builds the Lambda distribution zip in the dist folder.")
+    parser.add_argument(
+        "--optimize",
+        action="store_true",
+        help="precompile bytecode for the Lambda Python version and remove type stub and test packages",
+    )
+    parser.add_argument(
+        "--per-handler",
+        action="store_true",
+        help="also build a zip for each handler with only the code it imports",
+    )
+    arguments = parser.parse_args()
+
+    build(arguments.optimize, arguments.per_handler)
+
 
 if __name__ == "__main__":
-    build()
+    main()
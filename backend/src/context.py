@@ -1,5 +1,7 @@
 import functools
 import inspect
+import threading
+from collections.abc import Callable
 from typing import Any, get_type_hints
 
 
@@ -18,23 +20,22 @@ def singleton(cls):
 
 
 def inject(original_function):
+    # the reflection to figure out what can be injected is only done once, on the first call (type hints can refer to
+    # classes that don't exist yet when the function is decorated)
+    injection_plan: list[tuple[str, type[Any]]] | None = None
+
     @functools.wraps(original_function)
     def wrapper(*args, **kwargs):
-        context = ApplicationContext()
-
-        argument_type_hints = get_type_hints(original_function)
+        nonlocal injection_plan
+        if injection_plan is None:
+            injection_plan = _create_injection_plan(original_function)
 
-        argument_specification = inspect.getfullargspec(original_function)
-        argument_defaults = argument_specification.defaults or ()
-        keyword_arguments = argument_specification.args[-len(argument_defaults) :] if len(argument_defaults) else []
+        context = ApplicationContext()
 
-        for kwarg in keyword_arguments:
-            kwarg_type_hint = argument_type_hints.get(kwarg)
-            if kwarg in kwargs or kwarg_type_hint is None or not context.exists(kwarg_type_hint):
+        for kwarg, kwarg_type_hint in injection_plan:
+            if kwarg in kwargs or not context.exists(kwarg_type_hint):
                 # if the keyword argument was specified in this specific call to `original_function`
                 # or
-                # if there is no type hint for the keyword argument
-                # or
                 # if ApplicationContext doesn't have an implementation for the keyword argument
                 # then
                 # don't inject
@@ -47,19 +48,49 @@ def inject(original_function):
     return wrapper
 
 
+def _create_injection_plan(original_function) -> list[tuple[str, type[Any]]]:
+    """Finds the keyword arguments of a function that could be injected, along with the type to inject for each."""
+    argument_type_hints = get_type_hints(original_function)
+
+    argument_specification = inspect.getfullargspec(original_function)
+    argument_defaults = argument_specification.defaults or ()
+    keyword_arguments = argument_specification.args[-len(argument_defaults) :] if len(argument_defaults) else []
+
+    # keyword arguments without a type hint are never injected
+    return [(kwarg, argument_type_hints[kwarg]) for kwarg in keyword_arguments if kwarg in argument_type_hints]
+
+
 @singleton
 class ApplicationContext:
     def __init__(self):
         self._implementation_map: dict[type[Any], Any] = {}
+        self._provider_map: dict[type[Any], Callable[[], Any]] = {}
+        # reentrant, because a provider can inject (and so create) another lazily provided implementation
+        self._lock = threading.RLock()
 
     def register[T](self, identifier: type[T], implementation: T):
+        self._provider_map.pop(identifier, None)
         self._implementation_map[identifier] = implementation
 
+    def register_provider[T](self, identifier: type[T], provider: Callable[[], T]):
+        """Registers a provider that creates the implementation the first time it's needed.
+
+        The created implementation is kept and used from then on.
+        """
+        self._implementation_map.pop(identifier, None)
+        self._provider_map[identifier] = provider
+
     def exists(self, identifier: type[Any]) -> bool:
-        return identifier in self._implementation_map
+        return identifier in self._implementation_map or identifier in self._provider_map
 
     def implementation[T](self, identifier: type[T]) -> T:
+        if identifier not in self._implementation_map and identifier in self._provider_map:
+            with self._lock:
+                if identifier not in self._implementation_map:
+                    self._implementation_map[identifier] = self._provider_map[identifier]()
+
         return self._implementation_map[identifier]
 
     def reset(self):
         self._implementation_map.clear()
+        self._provider_map.clear()
@@ -9,6 +9,15 @@ class DocumentItem:
     status: str = "processing"
     document_type: str | None = None
     extracted_data: dict[str, Any] | None = None
+    ocr_job_ids: list[str] | None = None
+    # where the OCR results are stored for identical documents to reuse, once the OCR jobs finish
+    extraction_cache_key: str | None = None
+    # the version of the file that was extracted, so duplicate results of the same extraction are only written once
+    document_version: str | None = None
+    # the OCR configuration each query in `extracted_data` was answered with, by the query's text, so extracting the
+    # document again only asks the queries that are new or changed
+    answered_queries: dict[str, str] | None = None
+    version: int | None = None
 
     def to_dict(self) -> dict[str, Any]:
         return {k: v for k, v in asdict(self).items() if v is not None}
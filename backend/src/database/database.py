@@ -5,9 +5,15 @@ from src.database.data.document_item import DocumentItem
 
 class Database(ABC):
     @abstractmethod
-    def get_document(self, document_id: str) -> DocumentItem | None:
+    def get_document(self, document_id: str, attributes: list[str] | None = None) -> DocumentItem | None:
+        """Gets the document, or only the given attributes of it."""
         pass
 
     @abstractmethod
     def write_document(self, document: DocumentItem):
         pass
+
+    @abstractmethod
+    def write_documents(self, documents: list[DocumentItem]) -> list[DocumentItem]:
+        """Writes the documents in as few requests as possible and returns the ones that couldn't be written."""
+        pass
@@ -0,0 +1,69 @@
+from src import context
+from src.database.database import Database
+from src.documents import write_document
+from src.documents.extract_text import send_extracted_data
+from src.documents.extraction_cache import ExtractionCache
+from src.forms import form_registry
+from src.ocr import Ocr
+
+
+class OcrJobNotRecordedException(Exception):
+    pass
+
+
+@context.inject
+def complete_extraction(
+    job_id: str,
+    job_status: str,
+    document_id: str,
+    queue_url: str,
+    ocr_engine: Ocr = None,
+    database: Database = None,
+    extraction_cache: ExtractionCache = None,
+):
+    """Sends the extracted data of the document on once the last of its OCR jobs finished.
+
+    Raises `OcrJobNotRecordedException` for a job of a document that's still processing but doesn't have the job
+    recorded, for the notification to be delivered again.  The jobs are started before they're recorded, so a quick
+    notification can arrive in between.
+
+    A job that failed won't succeed when its notification is delivered again, so the document is marked as failed.
+    """
+    document_item = database.get_document(document_id)
+    if document_item is None or not document_item.ocr_job_ids or job_id not in document_item.ocr_job_ids:
+        if document_item is not None and document_item.status == "processing":
+            raise OcrJobNotRecordedException(f"Job {job_id} is not recorded for document {document_id} yet")
+
+        print(f"Job {job_id} does not belong to a document waiting on OCR, ignoring")
+        return
+
+    if job_status not in ("SUCCEEDED", "PARTIAL_SUCCESS"):
+        print(f"Job {job_id} for document {document_id} finished with status {job_status}, so the extraction failed")
+        write_document.record_failed_extraction(
+            document_item.document_url, document_item.document_type, document_item.extracted_data
+        )
+        return
+
+    document_type = document_item.document_type
+    form = form_registry().form(document_type) if document_type is not None else None
+    extracted_data = ocr_engine.finish_scan(document_item.ocr_job_ids, document_item.document_url, form)
+    if extracted_data is None:
+        # the last of the document's jobs to finish sends the results on
+        print(f"Other jobs for document {document_id} are still in progress")
+        return
+
+    # a cache key is only recorded for jobs that ask every query, so only OCR results are cached
+    if extraction_cache is not None and document_item.extraction_cache_key is not None:
+        extraction_cache.put(document_item.extraction_cache_key, {"extracted_data": extracted_data})
+
+    # the answers reused from an earlier extraction of the document were recorded along with the jobs
+    extracted_data = {**(document_item.extracted_data or {}), **extracted_data}
+
+    send_extracted_data(
+        queue_url,
+        document_item.document_url,
+        extracted_data,
+        document_item.document_type,
+        document_item.document_version,
+        document_item.answered_queries,
+    )
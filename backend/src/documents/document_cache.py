@@ -0,0 +1,60 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+
+from src.context import singleton
+from src.database.data.document_item import DocumentItem
+
+DEFAULT_TTL_SECONDS = 60
+
+
+@singleton
+class DocumentCache:
+    """A process-wide read-through cache of completed documents, keyed by document ID.
+
+    Only documents that are done processing are cached, and the least recently used one is evicted once the cache is
+    full.  A cached document doesn't see changes made through another Lambda (like edits to its extracted data) until
+    its TTL runs out, so the cache is off unless `DOCUMENT_CACHE_SIZE` is set.
+    """
+
+    def __init__(self):
+        self.max_size = int(os.environ.get("DOCUMENT_CACHE_SIZE", 0))
+        self.ttl_seconds = float(os.environ.get("DOCUMENT_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+        self.clock: Callable[[], float] = time.monotonic
+        self._documents: OrderedDict[str, tuple[DocumentItem, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, document_id: str, load: Callable[[str], DocumentItem | None]) -> DocumentItem | None:
+        if self.max_size <= 0:
+            return load(document_id)
+
+        with self._lock:
+            cached = self._documents.get(document_id)
+            if cached is not None:
+                document, expires_at = cached
+                if self.clock() < expires_at:
+                    self._documents.move_to_end(document_id)
+                    return document
+                del self._documents[document_id]
+
+        document = load(document_id)
+        if document is not None and document.status == "complete":
+            self._put(document)
+
+        return document
+
+    def invalidate(self, document_id: str | None = None):
+        with self._lock:
+            if document_id is None:
+                self._documents.clear()
+            else:
+                self._documents.pop(document_id, None)
+
+    def _put(self, document: DocumentItem):
+        with self._lock:
+            self._documents[document.document_id] = (document, self.clock() + self.ttl_seconds)
+            self._documents.move_to_end(document.document_id)
+            while len(self._documents) > self.max_size:
+                self._documents.popitem(last=False)
@@ -1,47 +1,242 @@
+import functools
 import json
-
-from types_boto3_sqs import SQSClient
+from typing import Any
 
 from src import context
-from src.forms import Form, supported_forms
-from src.ocr import Ocr
+from src.database.database import Database
+from src.documents import write_document
+from src.documents.extraction_cache import ExtractionCache
+from src.forms import Form, form_registry
+from src.idempotency import IdempotencyLedger
+from src.message_queue import MessageQueue
+from src.ocr import ClassificationScope, Ocr
 from src.storage import CloudStorage
 
 
 @context.inject
-def extract_text(remote_file_url: str, queue_url: str, ocr_engine: Ocr = None):
+def extract_text(
+    remote_file_url: str,
+    queue_url: str,
+    classification_scope: ClassificationScope = ClassificationScope.DOCUMENT,
+    single_pass_forms: bool = False,
+    ocr_engine: Ocr = None,
+    extraction_cache: ExtractionCache = None,
+    idempotency_ledger: IdempotencyLedger = None,
+    cloud_storage: CloudStorage = None,
+    reextract: bool = False,
+):
+    """Identifies the form in the document, extracts its data, and sends the data on to the next step.
+
+    With `single_pass_forms`, classification reads the text from the same OCR pass that does the generic key-value
+    extraction, so a document that doesn't match a form with queries only goes through OCR once.
+
+    With an `extraction_cache`, a document with the same content as an earlier one reuses the form and the data
+    extracted from the earlier one instead of going through OCR again.
+
+    With an `idempotency_ledger`, each version of a document is extracted once, and a duplicate notification about it
+    is skipped after the extraction is done.
+
+    A document that was extracted before as the same form keeps the answers to the queries that didn't change since, and
+    only the new or changed queries go through OCR.  That's what `reextract` is for, like after a form's queries
+    changed, since it extracts the document again even if its version was extracted before.
+    """
     check_that_file_is_good(remote_file_url)
 
-    document_text = ocr_engine.extract_raw_text(remote_file_url)
+    extract = functools.partial(
+        _extract_document,
+        remote_file_url,
+        queue_url,
+        classification_scope,
+        single_pass_forms,
+        ocr_engine,
+        extraction_cache,
+        cloud_storage,
+    )
 
-    identified_form = identify_form(document_text)
+    if idempotency_ledger is None:
+        extract()
+        return
 
-    extracted_data = ocr_engine.scan(remote_file_url, identified_form)
+    document_version = cloud_storage.object_version(remote_file_url)
+    if reextract:
+        # the ledger only records that a version was extracted, not with which queries, so it would skip this
+        extract(document_version=document_version)
+        return
+
+    idempotency_ledger.run_once(
+        f"extract_text:{remote_file_url}:{document_version}",
+        functools.partial(extract, document_version=document_version),
+    )
 
-    document_type = identified_form.identifier() if identified_form else None
 
+def _extract_document(
+    remote_file_url: str,
+    queue_url: str,
+    classification_scope: ClassificationScope,
+    single_pass_forms: bool,
+    ocr_engine: Ocr,
+    extraction_cache: ExtractionCache | None,
+    cloud_storage: CloudStorage,
+    document_version: str | None = None,
+):
+    content_hash = None
+    cached_classification = None
+    if extraction_cache is not None:
+        content_hash = cloud_storage.content_hash(remote_file_url)
+        cached_classification = extraction_cache.get(
+            extraction_cache.classification_key(content_hash, classification_scope)
+        )
+
+    forms_extracted_data = None
+    if cached_classification is not None:
+        document_type = cached_classification["document_type"]
+        identified_form = form_registry().form(document_type) if document_type is not None else None
+        print(f"Reusing the classification of an identical document: {document_type}")
+    else:
+        if single_pass_forms:
+            document_text, forms_extracted_data = ocr_engine.extract_raw_text_and_forms(
+                remote_file_url, classification_scope
+            )
+        else:
+            document_text = ocr_engine.extract_raw_text(remote_file_url, classification_scope)
+
+        identified_form = identify_form(document_text)
+        document_type = identified_form.identifier() if identified_form else None
+
+        if extraction_cache is not None:
+            classification_key = extraction_cache.classification_key(content_hash, classification_scope)
+            extraction_cache.put(classification_key, {"document_type": document_type})
+
+    answered_queries = None
+    if identified_form is not None and identified_form.queries():
+        # the answers are tied to the version of the file they're read from, so they're never reused for other content
+        content_version = document_version or cloud_storage.object_version(remote_file_url)
+        answered_queries = {
+            query: f"{configuration}@{content_version}"
+            for query, configuration in ocr_engine.query_configurations(identified_form).items()
+        }
+
+    result_key = None
+    if extraction_cache is not None:
+        result_key = extraction_cache.result_key(content_hash, identified_form, ocr_engine)
+        cached_result = extraction_cache.get(result_key)
+        if cached_result is not None:
+            print("Reusing the extracted data of an identical document")
+            send_extracted_data(
+                queue_url,
+                remote_file_url,
+                cached_result["extracted_data"],
+                document_type,
+                document_version,
+                answered_queries,
+            )
+            return
+
+    reused_data = {}
+    if answered_queries is not None:
+        reused_data = reusable_answers(remote_file_url, document_type, answered_queries)
+        if len(reused_data) > 0:
+            print(f"Reusing the answers to {len(reused_data)} of {len(answered_queries)} queries")
+
+        if len(reused_data) > 0 and len(reused_data) == len(answered_queries):
+            send_extracted_data(
+                queue_url, remote_file_url, reused_data, document_type, document_version, answered_queries
+            )
+            return
+
+    if identified_form is not None:
+        job_tag = write_document.convert_document_url_to_id(remote_file_url)
+        ocr_job_ids = ocr_engine.start_scan(remote_file_url, identified_form, job_tag, reused_data.keys())
+        if ocr_job_ids is not None:
+            # the OCR engine will notify a completion handler when the jobs are done, which sends the results on and
+            # stores them under the recorded key
+            write_document.record_ocr_jobs(
+                remote_file_url,
+                document_type,
+                ocr_job_ids,
+                # only a complete OCR result is cached, see below
+                result_key if not reused_data else None,
+                document_version,
+                reused_data or None,
+                answered_queries,
+            )
+            print(f"Started OCR jobs {', '.join(ocr_job_ids)}")
+            return
+
+    if forms_extracted_data is not None and (identified_form is None or not identified_form.queries()):
+        extracted_data = forms_extracted_data
+    else:
+        extracted_data = ocr_engine.scan(remote_file_url, identified_form, reused_data.keys())
+
+    # the reused answers can include changes made by hand, and without them the OCR result is incomplete, so only a
+    # result that's entirely from OCR is cached for identical documents
+    if extraction_cache is not None and not reused_data:
+        extraction_cache.put(result_key, {"extracted_data": extracted_data})
+
+    extracted_data = {**reused_data, **extracted_data}
+
+    send_extracted_data(queue_url, remote_file_url, extracted_data, document_type, document_version, answered_queries)
+
+
+@context.inject
+def reusable_answers(
+    document_url: str, document_type: str, query_configurations: dict[str, str], database: Database = None
+) -> dict[str, Any]:
+    """The data already extracted from the document for the queries that are answered the same way as before.
+
+    A query is answered the same way if it's asked of the same version of the file, as the same form, with the same OCR
+    configuration.  Any changes made to those answers by hand are kept.
+    """
+    if database is None:
+        return {}
+
+    document_item = database.get_document(
+        write_document.convert_document_url_to_id(document_url),
+        ["document_type", "extracted_data", "answered_queries"],
+    )
+    if document_item is None or document_item.document_type != document_type:
+        return {}
+
+    extracted_data = document_item.extracted_data or {}
+    answered_queries = document_item.answered_queries or {}
+    return {
+        query: extracted_data[query]
+        for query, configuration in query_configurations.items()
+        if query in extracted_data and answered_queries.get(query) == configuration
+    }
+
+
+def send_extracted_data(
+    queue_url: str,
+    document_url: str,
+    extracted_data: dict,
+    document_type: str | None,
+    document_version: str | None = None,
+    answered_queries: dict[str, str] | None = None,
+):
     send_queue_message_to_next_step(
         queue_url,
         json.dumps(
             {
-                "document_url": remote_file_url,
+                "document_url": document_url,
                 "extracted_data": extracted_data,
                 "document_type": document_type,
+                "document_version": document_version,
+                "answered_queries": answered_queries,
             }
         ),
     )
 
 
 def identify_form(document_text: list[str]) -> Form | None:
-    identified_form = None
+    registry = form_registry()
 
-    for text in document_text:
-        for form in supported_forms:
-            if form.form_matches() in text:
-                identified_form = form
-                break
+    candidates = registry.matcher().match(document_text)
+    if len(candidates) == 0:
+        return None
 
-    return identified_form
+    # only the identified form is loaded
+    return registry.form(candidates[0].form)
 
 
 @context.inject
@@ -52,6 +247,6 @@ def check_that_file_is_good(remote_file_url: str, cloud_storage: CloudStorage =
 
 
 @context.inject
-def send_queue_message_to_next_step(queue_url: str, message: str, sqs_client: SQSClient = None):
-    sqs_client.send_message(QueueUrl=queue_url, MessageBody=message)
+def send_queue_message_to_next_step(queue_url: str, message: str, message_queue: MessageQueue = None):
+    message_queue.send_message(queue_url, message)
     print("Message sent to queue successfully")
@@ -0,0 +1,57 @@
+import hashlib
+import json
+import os
+from typing import Any
+
+from src.external.aws.s3 import S3
+from src.forms import Form, form_registry
+from src.ocr import ClassificationScope, Ocr
+from src.storage import CloudStorage, CloudStorageException
+
+PREFIX = "extraction-cache/"
+
+
+class ExtractionCache:
+    """Extraction results of earlier documents, stored by the SHA-256 of the document's content.
+
+    Which form a document is and what was extracted from it are stored separately.  The form is keyed by the
+    classification scope and the version of the form registry.  The extracted data is keyed by the form, a hash of the
+    form's queries, and the OCR configuration version, so changing a form's queries or training a new adapter version
+    makes the old results unreachable instead of reused.
+    """
+
+    def __init__(self, cloud_storage: CloudStorage, bucket_name: str, prefix: str = PREFIX):
+        self.cloud_storage = cloud_storage
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+
+    def classification_key(self, content_hash: str, classification_scope: ClassificationScope) -> str:
+        registry_version = form_registry().version()
+        return f"{self.prefix}{content_hash}/classification/{classification_scope.value}-{registry_version}.json"
+
+    def result_key(self, content_hash: str, form: Form | None, ocr_engine: Ocr) -> str:
+        form_identifier = form.identifier() if form is not None else "none"
+        queries = form.queries() if form is not None else []
+        configuration = json.dumps([queries, ocr_engine.configuration_version(form)])
+        configuration_hash = hashlib.sha256(configuration.encode()).hexdigest()[:16]
+        return f"{self.prefix}{content_hash}/{form_identifier}/{configuration_hash}.json"
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        try:
+            return json.loads(self.cloud_storage.get_file(f"s3://{self.bucket_name}/{key}"))
+        except CloudStorageException:
+            # most often because nothing is stored under the key yet
+            return None
+
+    def put(self, key: str, value: dict[str, Any]):
+        self.cloud_storage.put_object(self.bucket_name, key, json.dumps(value).encode(), {})
+
+
+def extraction_cache_from_environment() -> ExtractionCache | None:
+    """The cache in the `EXTRACTION_CACHE_BUCKET` bucket, or `None` to extract every document from scratch."""
+    bucket_name = os.environ.get("EXTRACTION_CACHE_BUCKET")
+    if not bucket_name:
+        return None
+
+    # created here instead of injected, so providing the cache doesn't have to provide another implementation first
+    return ExtractionCache(S3(), bucket_name)
@@ -1,19 +1,59 @@
+import logging
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+
 from src import context
 from src.database.data.document_item import DocumentItem
 from src.database.database import Database
-from src.storage import CloudStorage
+from src.documents.document_cache import DocumentCache
+from src.storage import CloudStorage, CloudStorageFileTooLargeException
+
+# the access URL and the file are fetched at the same time, shared between invocations of a warm Lambda
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="get-document")
 
 
 @context.inject
 def get_document(
-    document_id: str, database: Database = None, cloud_storage: CloudStorage = None
-) -> tuple[DocumentItem | None, str | None, bytes | None]:
-    document_info = database.get_document(document_id)
+    document_id: str,
+    inline_file: bool = True,
+    max_inline_file_size: int | None = None,
+    database: Database = None,
+    cloud_storage: CloudStorage = None,
+) -> tuple[DocumentItem | None, str | None, str | None]:
+    """Gets the document's information, a URL to access the document, and optionally the document base64 encoded.
+
+    The base64 encoded document is None when `inline_file` is off or the document is larger than
+    `max_inline_file_size`, in which case the document can only be accessed through the URL.
+    """
+    document_info = DocumentCache().get(document_id, database.get_document)
     if document_info is None:
         return None, None, None
 
     remote_storage_url = document_info.document_url
-    storage_access_url = cloud_storage.access_url(remote_storage_url)
-    document_data = cloud_storage.get_file(remote_storage_url)
 
-    return document_info, storage_access_url, document_data
+    if not inline_file:
+        return document_info, cloud_storage.access_url(remote_storage_url), None
+
+    encoded_document_future = _executor.submit(
+        _get_encoded_document, document_id, remote_storage_url, max_inline_file_size, cloud_storage
+    )
+    try:
+        storage_access_url = cloud_storage.access_url(remote_storage_url)
+    except Exception:
+        # don't leave the download running after the failure
+        futures.wait([encoded_document_future])
+        raise
+
+    encoded_document = encoded_document_future.result()
+
+    return document_info, storage_access_url, encoded_document
+
+
+def _get_encoded_document(
+    document_id: str, remote_storage_url: str, max_inline_file_size: int | None, cloud_storage: CloudStorage
+) -> str | None:
+    try:
+        return cloud_storage.get_file_base64(remote_storage_url, max_inline_file_size)
+    except CloudStorageFileTooLargeException as e:
+        logging.warning(f"Not inlining document {document_id}: {e}")
+        return None
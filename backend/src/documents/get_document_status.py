@@ -0,0 +1,16 @@
+from src import context
+from src.database.data.document_item import DocumentItem
+from src.database.database import Database
+
+STATUS_ATTRIBUTES = ["document_id", "status", "version"]
+
+
+@context.inject
+def get_document_status(document_id: str, database: Database = None) -> DocumentItem | None:
+    """Gets only the status and version of the document, which is a small read with no access to the document itself."""
+    return database.get_document(document_id, STATUS_ATTRIBUTES)
+
+
+def entity_tag(document: DocumentItem) -> str:
+    # documents written before versions existed are told apart by their status alone
+    return f'"{document.version}"' if document.version is not None else f'"{document.status}"'
@@ -1,10 +1,21 @@
 import base64
+import hashlib
+import math
 import os
 import uuid
 
 from src import context
+from src.database.database import Database
 from src.storage import CloudStorage
 
+MEBIBYTE = 1024 * 1024
+MAX_UPLOAD_SIZE = 500 * MEBIBYTE
+# files larger than this are uploaded in parts, in parallel
+MULTIPART_UPLOAD_THRESHOLD = 16 * MEBIBYTE
+# S3 parts have to be at least 5 MiB (except the last one), and an upload can have at most 10,000 parts
+MIN_PART_SIZE = 8 * MEBIBYTE
+MAX_PART_COUNT = 10_000
+
 
 @context.inject
 def upload_file_data(
@@ -18,11 +29,61 @@ def upload_file_data(
     secure_filename, document_id = generate_secure_filename(file_name)
 
     key = f"{default_folder}{secure_filename}"
-    cloud_storage.put_object(bucket_name, key, decoded_file_content, {"original_filename": file_name})
+    # the hash lets an identical document reuse an earlier extraction without reading the file again
+    metadata = {"original_filename": file_name, "sha256": hashlib.sha256(decoded_file_content).hexdigest()}
+    cloud_storage.put_object(bucket_name, key, decoded_file_content, metadata)
 
     return document_id, key
 
 
+@context.inject
+def start_direct_upload(
+    file_name: str,
+    file_size: int,
+    bucket_name: str,
+    default_folder: str,
+    cloud_storage: CloudStorage = None,
+) -> tuple[str, str, dict]:
+    """Reserves a key for the file and returns how a client uploads the file straight to storage.
+
+    Small files get a form to POST the file with.  Larger files get a URL per part, to upload the parts in parallel
+    with a PUT each, and `complete_direct_upload` puts the parts together afterward.
+    """
+    if file_size <= 0 or file_size > MAX_UPLOAD_SIZE:
+        raise ValueError(f"The file size has to be between 1 and {MAX_UPLOAD_SIZE} bytes")
+
+    secure_filename, document_id = generate_secure_filename(file_name)
+    key = f"{default_folder}{secure_filename}"
+    metadata = {"original_filename": file_name}
+
+    if file_size <= MULTIPART_UPLOAD_THRESHOLD:
+        return document_id, key, {"form": cloud_storage.upload_form(bucket_name, key, metadata, file_size)}
+
+    part_size = max(MIN_PART_SIZE, math.ceil(file_size / MAX_PART_COUNT))
+    part_count = math.ceil(file_size / part_size)
+
+    upload_id = cloud_storage.start_multipart_upload(bucket_name, key, metadata)
+    part_urls = cloud_storage.multipart_upload_part_urls(bucket_name, key, upload_id, part_count)
+
+    return document_id, key, {"multipart": {"upload_id": upload_id, "part_size": part_size, "part_urls": part_urls}}
+
+
+@context.inject
+def complete_direct_upload(
+    document_id: str,
+    upload_id: str,
+    part_etags: list[str],
+    database: Database = None,
+    cloud_storage: CloudStorage = None,
+):
+    """Puts the uploaded parts of a multipart upload together into the document."""
+    document = database.get_document(document_id)
+    if document is None:
+        raise FileNotFoundError(f"Document {document_id} not found")
+
+    cloud_storage.complete_multipart_upload(document.document_url, upload_id, part_etags)
+
+
 def decode_file_content(file_content) -> bytes:
     try:
         decoded_file_data = base64.b64decode(file_content)
@@ -1,9 +1,12 @@
+import hashlib
+import json
 import os
 from urllib import parse
 
 from src import context
 from src.database.data.document_item import DocumentItem
 from src.database.database import Database
+from src.idempotency import IdempotencyLedger, RunStatus
 
 
 @context.inject
@@ -13,12 +16,165 @@ def write_document(document_id: str, document_url: str, database: Database = Non
 
 
 @context.inject
-def update_document(document_url: str, document_type: str | None, extracted_data: dict, database: Database = None):
+def update_document(
+    document_url: str,
+    document_type: str | None,
+    extracted_data: dict,
+    document_version: str | None = None,
+    answered_queries: dict[str, str] | None = None,
+    database: Database = None,
+    idempotency_ledger: IdempotencyLedger = None,
+):
+    """Writes the extracted data of the document, and the OCR configuration each of its queries was answered with.
+
+    With an `idempotency_ledger` and the `document_version` the data was extracted from, the data of a version is only
+    written once for the same `answered_queries`, so a duplicate message doesn't overwrite changes made to the document
+    since, but the data of a re-extraction with changed queries is.
+    """
+    document = completed_document(document_url, document_type, extracted_data, answered_queries)
+    if idempotency_ledger is None or document_version is None:
+        database.write_document(document)
+        return
+
+    idempotency_ledger.run_once(
+        update_key(document_url, document_version, answered_queries), lambda: database.write_document(document)
+    )
+
+
+@context.inject
+def update_documents(
+    updates: list[tuple[str, str | None, dict]],
+    document_versions: list[str | None] | None = None,
+    answered_queries: list[dict[str, str] | None] | None = None,
+    database: Database = None,
+    idempotency_ledger: IdempotencyLedger = None,
+) -> list[int]:
+    """Like `update_document` for every (document URL, document type, extracted data) update, but batched.
+
+    The `document_versions` and `answered_queries` are given in the same order as the updates.  Returns the indexes of
+    the updates that couldn't be written, which includes those another run is writing at the same time, since that run
+    can still fail.  An update that was already written is skipped and doesn't count as failed, and neither does a
+    duplicate of an update earlier in the batch, unless that one failed.
+    """
+    claims = {}
+    # the updates that aren't written, and the earlier update in the batch each duplicate shares the outcome of
+    skipped_indexes = set()
+    in_progress_indexes = []
+    duplicate_of = {}
+    if idempotency_ledger is not None and document_versions is not None:
+        first_indexes = {}
+        for index, ((document_url, _, _), document_version) in enumerate(zip(updates, document_versions, strict=True)):
+            if document_version is None:
+                continue
+            key = update_key(
+                document_url, document_version, answered_queries[index] if answered_queries is not None else None
+            )
+            if key in first_indexes:
+                duplicate_of[index] = first_indexes[key]
+                skipped_indexes.add(index)
+                continue
+
+            token = idempotency_ledger.start(key)
+            first_indexes[key] = index
+            if token is RunStatus.IN_PROGRESS:
+                in_progress_indexes.append(index)
+                skipped_indexes.add(index)
+            elif token is RunStatus.COMPLETE:
+                skipped_indexes.add(index)
+            else:
+                claims[index] = (key, token)
+
+    indexes_to_write = [index for index in range(len(updates)) if index not in skipped_indexes]
+    documents = [
+        completed_document(*updates[index], answered_queries[index] if answered_queries is not None else None)
+        for index in indexes_to_write
+    ]
+
+    try:
+        failed_documents = {id(document) for document in database.write_documents(documents)}
+    except Exception:
+        for key, token in claims.values():
+            idempotency_ledger.release(key, token)
+        raise
+
+    failed_indexes = set(in_progress_indexes)
+    for index, document in zip(indexes_to_write, documents, strict=True):
+        failed = id(document) in failed_documents
+        if failed:
+            failed_indexes.add(index)
+
+        if index in claims:
+            key, token = claims[index]
+            if failed:
+                idempotency_ledger.release(key, token)
+            else:
+                idempotency_ledger.complete(key, token)
+
+    failed_indexes.update(index for index, original_index in duplicate_of.items() if original_index in failed_indexes)
+    return sorted(failed_indexes)
+
+
+def update_key(document_url: str, document_version: str, answered_queries: dict[str, str] | None = None) -> str:
+    if not answered_queries:
+        return f"update_document:{document_url}:{document_version}"
+
+    # a version is extracted again when its queries change, and that data is written too
+    configuration_hash = hashlib.sha256(json.dumps(answered_queries, sort_keys=True).encode()).hexdigest()
+    return f"update_document:{document_url}:{document_version}:{configuration_hash}"
+
+
+def completed_document(
+    document_url: str, document_type: str | None, extracted_data: dict, answered_queries: dict[str, str] | None = None
+) -> DocumentItem:
     document_id = convert_document_url_to_id(document_url)
-    document_item = DocumentItem(document_id, document_url, "complete", document_type, extracted_data)
+    return DocumentItem(
+        document_id, document_url, "complete", document_type, extracted_data, answered_queries=answered_queries
+    )
+
+
+@context.inject
+def record_ocr_jobs(
+    document_url: str,
+    document_type: str | None,
+    ocr_job_ids: list[str],
+    extraction_cache_key: str | None = None,
+    document_version: str | None = None,
+    reused_data: dict | None = None,
+    answered_queries: dict[str, str] | None = None,
+    database: Database = None,
+):
+    """Records the OCR jobs the document waits on.
+
+    The answers reused from an earlier extraction are kept with the jobs, for the answers of the jobs to be merged into
+    once they finish.
+    """
+    document_id = convert_document_url_to_id(document_url)
+    document_item = DocumentItem(
+        document_id,
+        document_url,
+        "processing",
+        document_type,
+        reused_data,
+        ocr_job_ids=ocr_job_ids,
+        extraction_cache_key=extraction_cache_key,
+        document_version=document_version,
+        answered_queries=answered_queries,
+    )
     database.write_document(document_item)
 
 
+@context.inject
+def record_failed_extraction(
+    document_url: str, document_type: str | None, extracted_data: dict | None = None, database: Database = None
+):
+    """Marks the document as failed, for it not to show as processing forever.
+
+    Its OCR jobs aren't kept, so the notifications of the ones still running are ignored.
+    """
+    document_id = convert_document_url_to_id(document_url)
+    database.write_document(DocumentItem(document_id, document_url, "failed", document_type, extracted_data))
+
+
 def convert_document_url_to_id(document_url: str):
     parsed_url = parse.urlparse(document_url)
     document_key = parsed_url.path
@@ -0,0 +1,55 @@
+import os
+import threading
+from typing import Any
+
+DEFAULT_MAX_POOL_CONNECTIONS = 10
+
+_clients: dict[tuple[str, str, int, int | None], Any] = {}
+_lock = threading.Lock()
+
+
+def client(service_name: str, max_pool_connections: int | None = None, max_attempts: int | None = None) -> Any:
+    """Returns the process-wide boto3 client for a service, creating it the first time it's asked for.
+
+    boto3 itself is only imported then, so a handler that never calls AWS never pays for it.  Clients keep their
+    connections alive and pooled between invocations of a warm Lambda.  `max_attempts` overrides how many times boto3
+    tries a call, including retries.
+    """
+    return _get_or_create("client", service_name, max_pool_connections, max_attempts)
+
+
+def resource(service_name: str, max_pool_connections: int | None = None) -> Any:
+    """Returns the process-wide boto3 resource for a service, creating it the first time it's asked for."""
+    return _get_or_create("resource", service_name, max_pool_connections, None)
+
+
+def reset():
+    with _lock:
+        _clients.clear()
+
+
+def _get_or_create(kind: str, service_name: str, max_pool_connections: int | None, max_attempts: int | None) -> Any:
+    max_pool_connections = max_pool_connections or int(
+        os.environ.get("AWS_MAX_POOL_CONNECTIONS", DEFAULT_MAX_POOL_CONNECTIONS)
+    )
+    key = (kind, service_name, max_pool_connections, max_attempts)
+
+    if key not in _clients:
+        with _lock:
+            if key not in _clients:
+                _clients[key] = _create(kind, service_name, max_pool_connections, max_attempts)
+
+    return _clients[key]
+
+
+def _create(kind: str, service_name: str, max_pool_connections: int, max_attempts: int | None) -> Any:
+    import boto3
+    from botocore.config import Config
+
+    config = Config(max_pool_connections=max_pool_connections, tcp_keepalive=True)
+    if max_attempts is not None:
+        config = config.merge(Config(retries={"mode": "standard", "max_attempts": max_attempts}))
+
+    if kind == "resource":
+        return boto3.resource(service_name, config=config)
+    return boto3.client(service_name, config=config)
@@ -1,26 +1,48 @@
+import logging
 import os
+import random
+import time
 from decimal import Decimal
-from typing import Any
-
-import boto3
-from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
-from types_boto3_dynamodb import DynamoDBClient
+from typing import TYPE_CHECKING, Any
 
 from src.database.data.document_item import DocumentItem
 from src.database.database import Database
 from src.database.exception import DatabaseException
+from src.external.aws import clients
+
+if TYPE_CHECKING:
+    from types_boto3_dynamodb import DynamoDBClient
+
+# the most items DynamoDB takes in one BatchWriteItem request
+BATCH_WRITE_SIZE = 25
 
 
 class DynamoDb(Database):
     def __init__(self) -> None:
-        self.dynamodb_client: DynamoDBClient = boto3.client("dynamodb")
+        # imported here so boto3 is only loaded once a database is actually needed
+        from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+        self.dynamodb_client: DynamoDBClient = clients.client("dynamodb")
         self.table = os.getenv("DYNAMODB_TABLE")
         self.deserializer = TypeDeserializer()
         self.serializer = TypeSerializer()
+        self.max_batch_write_attempts = 5
+        self.batch_write_backoff_seconds = 0.05
 
-    def get_document(self, document_id: str) -> DocumentItem | None:
+    def get_document(self, document_id: str, attributes: list[str] | None = None) -> DocumentItem | None:
         try:
-            dynamodb_item = self.dynamodb_client.get_item(TableName=self.table, Key={"document_id": {"S": document_id}})
+            projection = {}
+            if attributes is not None:
+                # attribute names like `status` are reserved words in DynamoDB, so every name goes through a placeholder
+                attribute_names = {f"#attribute{index}": attribute for index, attribute in enumerate(attributes)}
+                projection = {
+                    "ProjectionExpression": ", ".join(attribute_names),
+                    "ExpressionAttributeNames": attribute_names,
+                }
+
+            dynamodb_item = self.dynamodb_client.get_item(
+                TableName=self.table, Key={"document_id": {"S": document_id}}, **projection
+            )
 
             if "Item" not in dynamodb_item:
                 return None
@@ -31,11 +53,55 @@ class DynamoDb(Database):
 
     def write_document(self, document: DocumentItem):
         try:
+            # every write gets a new version so readers can tell whether the document changed
+            document.version = time.time_ns()
             dynamodb_item = self._marshal_dynamodb_json(document.to_dict())
             self.dynamodb_client.put_item(TableName=self.table, Item=dynamodb_item)
         except Exception as e:
             raise DatabaseException("Failed to write the document") from e
 
+    def write_documents(self, documents: list[DocumentItem]) -> list[DocumentItem]:
+        # a batch can't have the same key twice, and the last write of a document would be the one kept anyway
+        latest_documents = list({document.document_id: document for document in documents}.values())
+
+        failed_documents = []
+        for start in range(0, len(latest_documents), BATCH_WRITE_SIZE):
+            failed_documents.extend(self._write_batch(latest_documents[start : start + BATCH_WRITE_SIZE]))
+
+        return failed_documents
+
+    def _write_batch(self, documents: list[DocumentItem]) -> list[DocumentItem]:
+        unwritten = {}
+        for document in documents:
+            document.version = time.time_ns()
+            unwritten[document.document_id] = document
+
+        for attempt in range(self.max_batch_write_attempts):
+            if attempt > 0:
+                # exponential backoff with full jitter, unprocessed items mean the table is being throttled
+                time.sleep(random.uniform(0, self.batch_write_backoff_seconds * 2 ** (attempt - 1)))
+
+            requests = [
+                {"PutRequest": {"Item": self._marshal_dynamodb_json(document.to_dict())}}
+                for document in unwritten.values()
+            ]
+            try:
+                response = self.dynamodb_client.batch_write_item(RequestItems={self.table: requests})
+            except Exception as e:
+                logging.warning(f"Failed to write a batch of {len(requests)} documents: {e}")
+                continue
+
+            unprocessed_requests = response.get("UnprocessedItems", {}).get(self.table, [])
+            unprocessed_ids = {
+                self.deserializer.deserialize(request["PutRequest"]["Item"]["document_id"])
+                for request in unprocessed_requests
+            }
+            unwritten = {document_id: unwritten[document_id] for document_id in unprocessed_ids}
+            if not unwritten:
+                return []
+
+        return list(unwritten.values())
+
     def _unmarshal_dynamodb_json(self, dynamodb_data: dict[str, Any]) -> dict[str, Any]:
         deserialized_data = {k: self.deserializer.deserialize(v) for k, v in dynamodb_data.items()}
         return self._convert_from_decimal(deserialized_data)
@@ -0,0 +1,102 @@
+import os
+import time
+import uuid
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+
+from src.external.aws import clients
+from src.idempotency import IdempotencyException, IdempotencyLedger, RunStatus
+
+if TYPE_CHECKING:
+    from types_boto3_dynamodb import DynamoDBClient
+
+# a little longer than the Lambdas' 30 second timeout, so a claim only expires when its run is gone, and the retry of
+# a run that timed out or crashed isn't turned away for long
+DEFAULT_IN_PROGRESS_SECONDS = 60
+# longer than SQS keeps a message, so every duplicate delivery still finds the completed run
+DEFAULT_COMPLETED_SECONDS = 15 * 24 * 60 * 60
+
+
+class DynamoDbIdempotencyLedger(IdempotencyLedger):
+    """Keeps the ledger in the DynamoDB table in `IDEMPOTENCY_TABLE`, with one item per key.
+
+    Claims are conditional writes, so only one run holds a key at a time.  `expires_at` is the table's TTL attribute,
+    but DynamoDB deletes expired items lazily, so the conditions check it too.
+    """
+
+    def __init__(self) -> None:
+        self.dynamodb_client: DynamoDBClient = clients.client("dynamodb")
+        self.table = os.getenv("IDEMPOTENCY_TABLE")
+        self.in_progress_seconds = int(os.getenv("IDEMPOTENCY_IN_PROGRESS_SECONDS", DEFAULT_IN_PROGRESS_SECONDS))
+        self.completed_seconds = int(os.getenv("IDEMPOTENCY_COMPLETED_SECONDS", DEFAULT_COMPLETED_SECONDS))
+        self.clock: Callable[[], float] = time.time
+
+    def start(self, key: str) -> str | RunStatus:
+        now = int(self.clock())
+        token = str(uuid.uuid4())
+
+        try:
+            self.dynamodb_client.put_item(
+                TableName=self.table,
+                Item={
+                    "idempotency_key": {"S": key},
+                    "status": {"S": RunStatus.IN_PROGRESS},
+                    "token": {"S": token},
+                    "expires_at": {"N": str(now + self.in_progress_seconds)},
+                },
+                ConditionExpression="attribute_not_exists(idempotency_key) OR expires_at < :now",
+                ExpressionAttributeValues={":now": {"N": str(now)}},
+                ReturnValuesOnConditionCheckFailure="ALL_OLD",
+            )
+        except self.dynamodb_client.exceptions.ConditionalCheckFailedException as e:
+            # a claim released since is treated as in progress too, for the retry to claim it
+            existing_item = e.response.get("Item", {})
+            if existing_item.get("status", {}).get("S") == RunStatus.COMPLETE:
+                return RunStatus.COMPLETE
+            return RunStatus.IN_PROGRESS
+        except Exception as e:
+            raise IdempotencyException(f"Failed to claim {key}") from e
+
+        return token
+
+    def complete(self, key: str, token: str):
+        try:
+            self.dynamodb_client.update_item(
+                TableName=self.table,
+                Key={"idempotency_key": {"S": key}},
+                UpdateExpression="SET #status = :complete, expires_at = :expires_at",
+                ConditionExpression="#token = :token",
+                ExpressionAttributeNames={"#status": "status", "#token": "token"},
+                ExpressionAttributeValues={
+                    ":complete": {"S": RunStatus.COMPLETE},
+                    ":expires_at": {"N": str(int(self.clock()) + self.completed_seconds)},
+                    ":token": {"S": token},
+                },
+            )
+        except self.dynamodb_client.exceptions.ConditionalCheckFailedException:
+            # the claim expired and another run took the key over, which will complete it
+            print(f"The claim on {key} expired before it was completed")
+        except Exception as e:
+            raise IdempotencyException(f"Failed to complete {key}") from e
+
+    def release(self, key: str, token: str):
+        try:
+            self.dynamodb_client.delete_item(
+                TableName=self.table,
+                Key={"idempotency_key": {"S": key}},
+                ConditionExpression="#token = :token",
+                ExpressionAttributeNames={"#token": "token"},
+                ExpressionAttributeValues={":token": {"S": token}},
+            )
+        except self.dynamodb_client.exceptions.ConditionalCheckFailedException:
+            print(f"The claim on {key} expired before it was released")
+        except Exception as e:
+            raise IdempotencyException(f"Failed to release {key}") from e
+
+
+def dynamodb_idempotency_ledger() -> IdempotencyLedger | None:
+    """The ledger in the `IDEMPOTENCY_TABLE` table, or `None` to run every delivery if it's not set."""
+    if not os.getenv("IDEMPOTENCY_TABLE"):
+        return None
+
+    return DynamoDbIdempotencyLedger()
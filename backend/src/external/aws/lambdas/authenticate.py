@@ -10,8 +10,8 @@ from src.login.user.role import Role
 from src.secret.cloud_secret_manager import CloudSecretManager
 
 appContext = context.ApplicationContext()
-appContext.register(CloudSecretManager, SecretManager())
-appContext.register(Role, Iam())
+appContext.register_provider(CloudSecretManager, SecretManager)
+appContext.register_provider(Role, Iam)
 
 setup_logger()
 
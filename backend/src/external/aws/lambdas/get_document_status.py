@@ -0,0 +1,55 @@
+import json
+import logging
+
+from src import context
+from src.database.database import Database
+from src.documents import get_document_status
+from src.external.aws.dynamodb import DynamoDb
+from src.logging_config import setup_logger
+
+appContext = context.ApplicationContext()
+appContext.register_provider(Database, DynamoDb)
+
+setup_logger()
+
+
+def lambda_handler(event, context):
+    document_id = event.get("pathParameters", {}).get("document_id")
+    if document_id is None:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": "Missing document_id in path parameter"}),
+        }
+
+    # header names aren't case sensitive
+    headers = {name.lower(): value for name, value in (event.get("headers") or {}).items()}
+    if_none_match = headers.get("if-none-match")
+
+    try:
+        document_status = get_document_status.get_document_status(document_id)
+    except Exception as e:
+        exception_message = f"An internal error happened while trying to get the status of document {document_id}"
+        logging.error(exception_message)
+        logging.exception(e)
+        return {
+            "statusCode": 500,
+            "body": json.dumps(exception_message),
+        }
+
+    if document_status is None:
+        return {
+            "statusCode": 404,
+            "body": json.dumps(f"Document {document_id} not found"),
+        }
+
+    entity_tag = get_document_status.entity_tag(document_status)
+    response_headers = {"ETag": entity_tag, "Cache-Control": "no-cache"}
+
+    if if_none_match is not None and entity_tag in (tag.strip() for tag in if_none_match.split(",")):
+        return {"statusCode": 304, "headers": response_headers, "body": ""}
+
+    return {
+        "statusCode": 200,
+        "headers": response_headers,
+        "body": json.dumps({"document_id": document_id, "status": document_status.status}),
+    }
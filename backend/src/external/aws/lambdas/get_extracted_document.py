@@ -1,6 +1,6 @@
-import base64
 import json
 import logging
+import os
 
 from src import context
 from src.database.database import Database
@@ -11,11 +11,14 @@ from src.logging_config import setup_logger
 from src.storage import CloudStorage
 
 appContext = context.ApplicationContext()
-appContext.register(CloudStorage, S3())
-appContext.register(Database, DynamoDb())
+appContext.register_provider(CloudStorage, S3)
+appContext.register_provider(Database, DynamoDb)
 
 setup_logger()
 
+# the base64 encoded file has to fit in a Lambda response (6 MB) along with everything else, base64 adds a third
+max_inline_file_size = int(os.environ.get("MAX_INLINE_FILE_SIZE", 4 * 1024 * 1024))
+
 
 def lambda_handler(event, context):
     document_id = event.get("pathParameters", {}).get("document_id")
@@ -25,9 +28,14 @@ def lambda_handler(event, context):
             "body": json.dumps({"error": "Missing document_id in path parameter"}),
         }
 
+    query_parameters = event.get("queryStringParameters") or {}
+    inline_file = query_parameters.get("inline_file", "true").lower() != "false"
+
     try:
         logging.info("Starting document retrieval...")
-        document_info, storage_access_url, document_data = get_document.get_document(document_id)
+        document_info, storage_access_url, encoded_document = get_document.get_document(
+            document_id, inline_file, max_inline_file_size
+        )
 
         if document_info is None:
             return {
@@ -42,8 +50,8 @@ def lambda_handler(event, context):
             "document_type": document_info.document_type,
             "extracted_data": document_info.extracted_data,
             "signed_url": storage_access_url,
-            "base64_encoded_file": base64.b64encode(document_data).decode("utf-8"),
         }
+        body = response_body(response, encoded_document)
     except Exception as e:
         exception_message = f"An internal error happened while trying to get document {document_id}"
         logging.error(exception_message)
@@ -54,4 +62,13 @@ def lambda_handler(event, context):
         }
 
     logging.info("Finished retrieving document.")
-    return {"statusCode": 200, "body": json.dumps(response)}
+    return {"statusCode": 200, "body": body}
+
+
+def response_body(response: dict, encoded_document: str | None) -> str:
+    if encoded_document is None:
+        return json.dumps(response)
+
+    # base64 has no characters that need escaping in JSON, so the document is put into the JSON as is instead of
+    # having json.dumps make more copies of the largest part of the response
+    return "".join([json.dumps(response)[:-1], ', "base64_encoded_file": "', encoded_document, '"}'])
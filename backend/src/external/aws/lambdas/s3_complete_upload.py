@@ -0,0 +1,53 @@
+import json
+import logging
+
+from src import context
+from src.database.database import Database
+from src.documents.upload_document import complete_direct_upload
+from src.external.aws.dynamodb import DynamoDb
+from src.external.aws.s3 import S3
+from src.logging_config import setup_logger
+from src.storage import CloudStorage
+
+appContext = context.ApplicationContext()
+appContext.register_provider(CloudStorage, S3)
+appContext.register_provider(Database, DynamoDb)
+
+setup_logger()
+
+
+def lambda_handler(event, context):
+    try:
+        body = json.loads(event.get("body") or "{}")
+        document_id = event.get("pathParameters", {}).get("document_id")
+        upload_id = body.get("upload_id")
+        part_etags = body.get("part_etags")
+
+        if not document_id or not upload_id or not part_etags:
+            error_message = "Missing document_id, upload_id or part_etags in request"
+            logging.error(error_message)
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"error": error_message}),
+            }
+
+        try:
+            complete_direct_upload(document_id, upload_id, part_etags)
+        except FileNotFoundError as e:
+            logging.error(str(e))
+            return {
+                "statusCode": 404,
+                "body": json.dumps({"error": str(e)}),
+            }
+
+        return {
+            "statusCode": 200,
+            "body": json.dumps({"message": "File uploaded successfully.", "documentId": document_id}),
+        }
+
+    except Exception as e:
+        logging.exception(e)
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"error": str(e)}),
+        }
@@ -0,0 +1,60 @@
+import json
+import logging
+import os
+
+from src import context
+from src.database.database import Database
+from src.documents import write_document
+from src.documents.upload_document import start_direct_upload
+from src.external.aws.dynamodb import DynamoDb
+from src.external.aws.s3 import S3
+from src.logging_config import setup_logger
+from src.storage import CloudStorage
+
+appContext = context.ApplicationContext()
+appContext.register_provider(CloudStorage, S3)
+appContext.register_provider(Database, DynamoDb)
+
+setup_logger()
+
+
+def lambda_handler(event, context):
+    try:
+        body = json.loads(event.get("body") or "{}")
+        file_name = body.get("file_name")
+        file_size = body.get("file_size")
+
+        if not file_name or not isinstance(file_size, int):
+            error_message = "Missing file_name or file_size in request"
+            logging.error(error_message)
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"error": error_message}),
+            }
+
+        bucket_name = os.environ.get("S3_BUCKET_NAME", "ocr-poc-flex")
+        default_folder = "input/"
+        try:
+            document_id, key, upload = start_direct_upload(file_name, file_size, bucket_name, default_folder)
+        except ValueError as e:
+            logging.error(str(e))
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"error": str(e)}),
+            }
+
+        # the document is recorded before it is uploaded, like the upload through the API
+        s3_url = f"s3://{bucket_name}/{key}"
+        write_document.write_document(document_id, s3_url)
+
+        return {
+            "statusCode": 200,
+            "body": json.dumps({"documentId": document_id, **upload}),
+        }
+
+    except Exception as e:
+        logging.exception(e)
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"error": str(e)}),
+        }
@@ -12,8 +12,8 @@ from src.logging_config import setup_logger
 from src.storage import CloudStorage
 
 appContext = context.ApplicationContext()
-appContext.register(CloudStorage, S3())
-appContext.register(Database, DynamoDb())
+appContext.register_provider(CloudStorage, S3)
+appContext.register_provider(Database, DynamoDb)
 
 setup_logger()
 
@@ -1,43 +1,72 @@
 import json
 import logging
-import os
 
-import boto3
-from types_boto3_sqs import SQSClient
+from aws_lambda_typing import context as lambda_context
+from aws_lambda_typing import events
 
 from src.context import ApplicationContext
 from src.database.database import Database
 from src.documents import write_document
 from src.external.aws.dynamodb import DynamoDb
+from src.external.aws.dynamodb_idempotency_ledger import dynamodb_idempotency_ledger
+from src.external.aws.s3 import S3
+from src.idempotency import IdempotencyLedger
 from src.logging_config import setup_logger
-
-sqs_queue_url = os.environ["SQS_QUEUE_URL"]
+from src.message_queue import claim_check
+from src.storage import CloudStorage
 
 appContext = ApplicationContext()
-appContext.register(Database, DynamoDb())
-appContext.register(SQSClient, boto3.client("sqs"))
+appContext.register_provider(Database, DynamoDb)
+appContext.register_provider(IdempotencyLedger, dynamodb_idempotency_ledger)
+appContext.register_provider(CloudStorage, S3)
 
 setup_logger()
 
 
-def lambda_handler(event, context):
+def lambda_handler(event: events.SQSEvent, context: lambda_context.Context):
+    """Writes every message in the batch to the database.
+
+    Only the messages that failed are reported back in `batchItemFailures`, so SQS deletes the rest and redelivers
+    just the failed ones.
+    """
     logging.info("Process to write from SQS to Dynamo has started...")
+
+    failed_message_ids = []
+    updates = []
+    document_versions = []
+    answered_queries = []
+    update_message_ids = []
+
     for record in event["Records"]:
         try:
-            message_body = json.loads(record["body"])
+            # large messages are sent as a claim check pointing to the message
+            message_body = json.loads(claim_check.resolve(record["body"]))
 
             document_url = message_body["document_url"]
             document_type = message_body.get("document_type")
             extracted_data = message_body.get("extracted_data", {})
-
-            write_document.update_document(document_url, document_type, extracted_data)
-
-            sqs_client = appContext.implementation(SQSClient)
-            sqs_client.delete_message(QueueUrl=sqs_queue_url, ReceiptHandle=record["receiptHandle"])
         except Exception as e:
-            exception_message = "An internal error happened while trying to save a document to the database"
-            logging.error(exception_message)
+            logging.error(f"Message {record['messageId']} isn't a document update")
             logging.exception(e)
-            raise
+            failed_message_ids.append(record["messageId"])
+            continue
+
+        updates.append((document_url, document_type, extracted_data))
+        document_versions.append(message_body.get("document_version"))
+        answered_queries.append(message_body.get("answered_queries"))
+        update_message_ids.append(record["messageId"])
+
+    try:
+        failed_indexes = write_document.update_documents(updates, document_versions, answered_queries)
+    except Exception as e:
+        exception_message = "An internal error happened while trying to save documents to the database"
+        logging.error(exception_message)
+        logging.exception(e)
+        failed_indexes = range(len(updates))
+
+    failed_message_ids.extend(update_message_ids[index] for index in failed_indexes)
+    if failed_message_ids:
+        logging.error(f"Failed to write {len(failed_message_ids)} of {len(event['Records'])} documents")
 
     logging.info("Process complete")
+    return {"batchItemFailures": [{"itemIdentifier": message_id} for message_id in failed_message_ids]}
@@ -1,53 +1,165 @@
+import functools
+import json
 import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib import parse
 
-import boto3
 from aws_lambda_typing import context as lambda_context
-from aws_lambda_typing import events
-from types_boto3_sqs import SQSClient
 
 from src import context
+from src.database.database import Database
 from src.documents import extract_text
+from src.documents.extraction_cache import ExtractionCache, extraction_cache_from_environment
+from src.external.aws.dynamodb import DynamoDb
+from src.external.aws.dynamodb_idempotency_ledger import dynamodb_idempotency_ledger
 from src.external.aws.s3 import S3
+from src.external.aws.sqs import sqs_with_claim_check
 from src.external.aws.textract import Textract
+from src.external.aws.textract_rate_limiter import TextractRateLimiter
+from src.idempotency import IdempotencyLedger, RunInProgressException
 from src.logging_config import setup_logger
-from src.ocr import Ocr, OcrException
+from src.message_queue import MessageQueue
+from src.ocr import ClassificationScope, Ocr, OcrException
 from src.storage import CloudStorage
 
+
+def warmed_textract() -> Textract:
+    """Creates the OCR engine with the first document instead of at import, where it would slow the cold start."""
+    textract = Textract()
+    textract.warm_adapter_versions()
+    return textract
+
+
 appContext = context.ApplicationContext()
-appContext.register(Ocr, Textract())
-appContext.register(CloudStorage, S3())
-appContext.register(SQSClient, boto3.client("sqs"))
+appContext.register_provider(Ocr, warmed_textract)
+appContext.register_provider(CloudStorage, S3)
+appContext.register_provider(Database, DynamoDb)
+appContext.register_provider(IdempotencyLedger, dynamodb_idempotency_ledger)
+appContext.register_provider(MessageQueue, sqs_with_claim_check)
+appContext.register_provider(ExtractionCache, extraction_cache_from_environment)
 
 setup_logger()
 
 sqs_queue_url = os.environ["SQS_QUEUE_URL"]
+classification_scope = ClassificationScope(os.environ.get("CLASSIFICATION_SCOPE", ClassificationScope.DOCUMENT))
+single_pass_forms = os.environ.get("SINGLE_PASS_FORMS", "false").lower() == "true"
+# how many documents of one invocation are extracted at the same time
+max_concurrency = int(os.environ.get("TEXT_EXTRACTOR_MAX_CONCURRENCY", 4))
+
+
+def lambda_handler(event: dict, context: lambda_context.Context):
+    """Extracts the text of every document in the event, which can come straight from S3, through SQS, or from
+    EventBridge.
+
+    Every document is processed even when others fail.  Failed SQS messages are reported in `batchItemFailures` so
+    only they are redelivered.  Other events are retried as a whole, so a failure is raised once every document is
+    done.
 
+    Invoking it with `{"reextract": ["s3://<bucket>/input/<file>", ...]}` extracts the documents again, even the ones
+    that were extracted before, like after a form's queries changed.  Only their new or changed queries go through OCR.
+    """
+    reextract = "reextract" in event
+    if reextract:
+        documents, unreadable_message_ids = [(None, s3_url) for s3_url in event["reextract"]], []
+    else:
+        documents, unreadable_message_ids = documents_in_event(event)
+    logging.info(f"Processing {len(documents)} documents")
 
-def lambda_handler(event: events.S3Event, context: lambda_context.Context):
-    record = event["Records"][0]
-    bucket_name = record["s3"]["bucket"]["name"]
-    document_key = record["s3"]["object"]["key"]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(documents)))) as executor:
+        succeeded = list(
+            executor.map(functools.partial(process_document, reextract=reextract), [s3_url for _, s3_url in documents])
+        )
 
-    s3_url = f"s3://{bucket_name}/{document_key}"
+    failed_documents = [document for document, ok in zip(documents, succeeded, strict=True) if not ok]
+    logging.info(f"Processed {len(documents) - len(failed_documents)} of {len(documents)} documents successfully")
+    logging.info(f"Textract calls since the Lambda started: {TextractRateLimiter().metrics()}")
+
+    if is_sqs_event(event):
+        # a message with several documents fails if any of them do
+        failed_message_ids = dict.fromkeys(
+            [*unreadable_message_ids, *(message_id for message_id, _ in failed_documents)]
+        )
+        return {"batchItemFailures": [{"itemIdentifier": message_id} for message_id in failed_message_ids]}
+
+    if failed_documents:
+        raise Exception(f"Failed to process {len(failed_documents)} of {len(documents)} documents")
+
+
+def process_document(s3_url: str, reextract: bool = False) -> bool:
     logging.info(f"Processing {s3_url}")
+    start = time.perf_counter()
 
     try:
-        extract_text.extract_text(s3_url, sqs_queue_url)
+        extract_text.extract_text(s3_url, sqs_queue_url, classification_scope, single_pass_forms, reextract=reextract)
     except FileNotFoundError as e:
         exception_message = f"Failed to find the file {s3_url}"
         logging.error(exception_message)
         logging.exception(e)
-        raise
+        return False
+    except RunInProgressException as e:
+        # the run extracting it can still fail, so this one fails too, for the notification to be retried later
+        logging.warning(f"{s3_url} is already being extracted: {e}")
+        return False
     except OcrException as e:
         exception_message = f"Failed OCR of {s3_url}"
         logging.error(exception_message)
         logging.exception(e)
-        raise
+        return False
     except Exception as e:
-        exception_message = "Failed to send message to queue"
+        exception_message = f"Failed to send message to queue for {s3_url}"
         logging.error(exception_message)
         logging.exception(e)
-        raise
+        return False
+    finally:
+        logging.info(f"Spent {time.perf_counter() - start:.3f} seconds on {s3_url}")
+
+    logging.info(f"Document {s3_url} processed successfully and sent to SQS")
+    return True
+
+
+def is_sqs_event(event: dict) -> bool:
+    return any(record.get("eventSource") == "aws:sqs" for record in event.get("Records", []))
+
+
+def documents_in_event(event: dict) -> tuple[list[tuple[str | None, str]], list[str]]:
+    """Finds the S3 URL of every document in the event, along with the ID of the SQS message it came in.
+
+    Also returns the IDs of the SQS messages that couldn't be read.
+    """
+    if "Records" not in event:
+        return [(None, url) for url in _documents_in_notification(event)], []
+
+    documents = []
+    unreadable_message_ids = []
+    for record in event["Records"]:
+        if record.get("eventSource") != "aws:sqs":
+            documents.extend((None, url) for url in _documents_in_notification({"Records": [record]}))
+            continue
+
+        try:
+            urls = _documents_in_notification(json.loads(record["body"]))
+        except Exception as e:
+            logging.error(f"Message {record['messageId']} isn't an S3 or EventBridge notification")
+            logging.exception(e)
+            unreadable_message_ids.append(record["messageId"])
+            continue
+
+        documents.extend((record["messageId"], url) for url in urls)
+
+    return documents, unreadable_message_ids
+
+
+def _documents_in_notification(notification: dict) -> list[str]:
+    if notification.get("detail-type") == "Object Created":
+        # EventBridge
+        detail = notification["detail"]
+        return [f"s3://{detail['bucket']['name']}/{detail['object']['key']}"]
 
-    logging.info("Document processed successfully and sent to SQS")
+    # S3 event notifications URL encode the object key, and S3 test events have no records
+    return [
+        f"s3://{record['s3']['bucket']['name']}/{parse.unquote_plus(record['s3']['object']['key'])}"
+        for record in notification.get("Records", [])
+        if "s3" in record
+    ]
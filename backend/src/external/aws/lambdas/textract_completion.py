@@ -0,0 +1,48 @@
+import logging
+import os
+
+from aws_lambda_typing import context as lambda_context
+from aws_lambda_typing import events
+
+from src import context
+from src.database.database import Database
+from src.documents import complete_extraction
+from src.documents.extraction_cache import ExtractionCache, extraction_cache_from_environment
+from src.external.aws.dynamodb import DynamoDb
+from src.external.aws.s3 import S3
+from src.external.aws.sqs import sqs_with_claim_check
+from src.external.aws.textract import Textract
+from src.external.aws.textract_rate_limiter import TextractRateLimiter
+from src.logging_config import setup_logger
+from src.message_queue import MessageQueue
+from src.ocr import Ocr
+from src.storage import CloudStorage
+
+appContext = context.ApplicationContext()
+appContext.register_provider(Ocr, Textract)
+appContext.register_provider(Database, DynamoDb)
+appContext.register_provider(MessageQueue, sqs_with_claim_check)
+appContext.register_provider(CloudStorage, S3)
+appContext.register_provider(ExtractionCache, extraction_cache_from_environment)
+
+setup_logger()
+
+sqs_queue_url = os.environ["SQS_QUEUE_URL"]
+
+
+def lambda_handler(event: events.SQSEvent, context: lambda_context.Context):
+    logging.info("Processing Textract completion notifications...")
+    for record in event["Records"]:
+        job_id, job_status, job_tag = Textract.parse_completion_notification(record["body"])
+        logging.info(f"Job {job_id} for document {job_tag} finished with status {job_status}")
+
+        try:
+            complete_extraction.complete_extraction(job_id, job_status, job_tag, sqs_queue_url)
+        except Exception as e:
+            exception_message = f"Failed to complete the extraction of document {job_tag}"
+            logging.error(exception_message)
+            logging.exception(e)
+            raise
+
+    logging.info(f"Textract calls since the Lambda started: {TextractRateLimiter().metrics()}")
+    logging.info("Process complete")
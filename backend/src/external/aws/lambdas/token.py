@@ -9,7 +9,7 @@ from src.login.login import generate_token, has_valid_credentials
 from src.secret.cloud_secret_manager import CloudSecretManager
 
 appContext = context.ApplicationContext()
-appContext.register(CloudSecretManager, SecretManager())
+appContext.register_provider(CloudSecretManager, SecretManager)
 
 environment = os.environ["ENVIRONMENT"]
 
@@ -1,13 +1,12 @@
 import json
 import logging
 import os
+import time
 from decimal import Decimal
 
-import boto3
-
+from src.external.aws import clients
 from src.logging_config import setup_logger
 
-dynamodb = boto3.resource("dynamodb")
 DYNAMODB_TABLE = os.getenv("DYNAMODB_TABLE")
 
 setup_logger()
@@ -44,11 +43,11 @@ def lambda_handler(event, context):
 
         cleaned_data = convert_to_dynamodb_format(new_extracted_data)
 
-        table = dynamodb.Table(DYNAMODB_TABLE)
+        table = clients.resource("dynamodb").Table(DYNAMODB_TABLE)
         response = table.update_item(
             Key={"document_id": document_id},
-            UpdateExpression="SET extracted_data = :new_data",
-            ExpressionAttributeValues={":new_data": cleaned_data},
+            UpdateExpression="SET extracted_data = :new_data, version = :version",
+            ExpressionAttributeValues={":new_data": cleaned_data, ":version": time.time_ns()},
             ReturnValues="ALL_NEW",
         )
 
@@ -0,0 +1,181 @@
+"""Extracts the data of archived documents again from their raw Textract responses, without calling Textract.
+
+After a fix to how responses are parsed, run it from the `backend` folder against the archive bucket
+
+    uv run python -m src.external.aws.reprocess_textract_archive --bucket <bucket>
+
+or against a local copy of the archive, like one made with `aws s3 sync s3://<bucket>/ocr-archive/ archive/`
+
+    uv run python -m src.external.aws.reprocess_textract_archive --directory archive/ --dry-run
+
+Each document is parsed from the latest scan archived for it, in a pool of processes, and written like a freshly
+extracted document is, overwriting what's stored for it (including any changes made to it by hand).
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any
+
+from src import context
+from src.database.database import Database
+from src.documents import write_document
+from src.external.aws.dynamodb import DynamoDb
+from src.external.aws.s3 import S3
+from src.external.aws.textract import Textract
+from src.external.aws.textract_archive import PREFIX, QUERIES_PARSER, TextractArchive
+from src.storage import CloudStorage
+
+ARCHIVE_SUFFIX = ".jsonl.gz"
+
+
+def archived_documents_in_directory(directory: Path) -> dict[str, list[str]]:
+    """The paths of the archived jobs of every document, laid out like the archive as `<document ID>/<job file>`."""
+    archived_documents = defaultdict(list)
+    for path in sorted(directory.glob(f"*/*{ARCHIVE_SUFFIX}")):
+        archived_documents[path.parent.name].append(path.as_posix())
+    return archived_documents
+
+
+def archived_documents_in_bucket(
+    cloud_storage: CloudStorage, bucket_name: str, prefix: str = PREFIX
+) -> dict[str, list[str]]:
+    """The remote URLs of the archived jobs of every document in the bucket."""
+    archived_documents = defaultdict(list)
+    key_prefix = f"s3://{bucket_name}/{prefix}"
+    for remote_url in cloud_storage.list_files(bucket_name, prefix):
+        document_id, _, job_file = remote_url.removeprefix(key_prefix).partition("/")
+        if job_file.endswith(ARCHIVE_SUFFIX):
+            archived_documents[document_id].append(remote_url)
+    return archived_documents
+
+
+def reextract(archive_locations: list[str]) -> tuple[str, str | None, dict[str, Any], str] | None:
+    """Parses the latest scan among the archived jobs of a document.
+
+    Returns the document URL, document type, extracted data, and the parser that extracted it, or `None` if some of the
+    scan's jobs weren't archived.
+    Runs in a worker process, so it reads the archives itself instead of getting them pickled over.
+    """
+    archives = [TextractArchive.open(_read(location)) for location in archive_locations]
+
+    latest_header = max((header for header, _ in archives), key=lambda header: header["archived_at"])
+    job_ids = latest_header["job_ids"]
+    scan_responses = {header["job_id"]: responses for header, responses in archives if header["job_ids"] == job_ids}
+
+    missing_job_ids = [job_id for job_id in job_ids if job_id not in scan_responses]
+    if missing_job_ids:
+        print(f"Jobs {', '.join(missing_job_ids)} of {latest_header['document_url']} weren't archived, skipping")
+        return None
+
+    if latest_header["parser"] == QUERIES_PARSER:
+        extracted_data = Textract._merge_extracted_data(
+            [Textract._parse_textract_queries(scan_responses[job_id]) for job_id in job_ids]
+        )
+    else:
+        extracted_data = Textract._parse_textract_forms(scan_responses[job_ids[0]])
+
+    return latest_header["document_url"], latest_header["document_type"], extracted_data, latest_header["parser"]
+
+
+def reprocess(
+    archived_documents: dict[str, list[str]], max_workers: int | None = None, dry_run: bool = False
+) -> tuple[list[str], list[str], list[str]]:
+    """Extracts every document again and writes its data with `update_document`, or prints it for a dry run.
+
+    Returns the IDs of the documents that were reprocessed, skipped, and failed.
+    """
+    reprocessed, skipped, failed = [], [], []
+
+    # forking a process that already started threads (like boto3's) can deadlock the worker
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {
+            executor.submit(reextract, archive_locations): document_id
+            for document_id, archive_locations in archived_documents.items()
+        }
+
+        for future in as_completed(futures):
+            document_id = futures[future]
+
+            try:
+                result = future.result()
+                if result is None:
+                    skipped.append(document_id)
+                    continue
+
+                document_url, document_type, extracted_data, parser = result
+                if dry_run:
+                    document = {"document_url": document_url, "document_type": document_type}
+                    print(json.dumps({**document, "extracted_data": extracted_data}))
+                    reprocessed.append(document_id)
+                    continue
+
+                answered_queries = None
+                if parser == QUERIES_PARSER:
+                    extracted_data, answered_queries = with_reused_answers(document_id, extracted_data)
+                write_document.update_document(
+                    document_url, document_type, extracted_data, answered_queries=answered_queries
+                )
+                reprocessed.append(document_id)
+            except Exception as e:
+                print(f"Failed to reprocess document {document_id}: {e}")
+                failed.append(document_id)
+
+    return reprocessed, skipped, failed
+
+
+@context.inject
+def with_reused_answers(
+    document_id: str, extracted_data: dict[str, Any], database: Database = None
+) -> tuple[dict[str, Any], dict[str, str] | None]:
+    """Adds the stored answers the scan didn't ask again, because they were reused from an earlier extraction.
+
+    Returns the extracted data, and the OCR configuration each query was answered with.
+    """
+    document_item = database.get_document(document_id, ["extracted_data", "answered_queries"])
+    if document_item is None or not document_item.answered_queries:
+        return extracted_data, None
+
+    stored_data = document_item.extracted_data or {}
+    reused_data = {query: stored_data[query] for query in document_item.answered_queries if query in stored_data}
+    return {**reused_data, **extracted_data}, document_item.answered_queries
+
+
+def _read(location: str) -> bytes:
+    if location.startswith("s3://"):
+        return S3().get_file(location)
+    return Path(location).read_bytes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extracts archived documents again from their Textract responses.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--bucket", help="the bucket the archive is in, like `TEXTRACT_ARCHIVE_BUCKET`")
+    source.add_argument("--directory", type=Path, help="a local copy of the archive")
+    parser.add_argument("--prefix", default=PREFIX, help="where the archive is in the bucket")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="how many documents to parse at once")
+    parser.add_argument("--dry-run", action="store_true", help="print the extracted data instead of writing it")
+    arguments = parser.parse_args()
+
+    if arguments.bucket is not None:
+        archived_documents = archived_documents_in_bucket(S3(), arguments.bucket, arguments.prefix)
+    else:
+        archived_documents = archived_documents_in_directory(arguments.directory)
+
+    if not arguments.dry_run:
+        context.ApplicationContext().register_provider(Database, DynamoDb)
+
+    reprocessed, skipped, failed = reprocess(archived_documents, arguments.workers, arguments.dry_run)
+    print(f"Reprocessed {len(reprocessed)} documents, skipped {len(skipped)}, and failed {len(failed)}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
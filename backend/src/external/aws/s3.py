@@ -1,14 +1,31 @@
+import base64
+import hashlib
+import mimetypes
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, BinaryIO
 from urllib import parse
 
-import boto3
-from types_boto3_s3 import S3Client
+from src.external.aws import clients
+from src.storage import CloudStorage, CloudStorageException, CloudStorageFileTooLargeException
 
-from src.storage import CloudStorage, CloudStorageException
+if TYPE_CHECKING:
+    from types_boto3_s3 import S3Client
+
+# a multiple of 3 bytes, so every chunk base64 encodes without padding
+BASE64_CHUNK_SIZE = 3 * 256 * 1024
+
+UPLOAD_URL_EXPIRATION_SECONDS = 3600
+
+# the metadata key an uploaded file's SHA-256 is stored under
+CONTENT_HASH_METADATA_KEY = "sha256"
+HASH_CHUNK_SIZE = 1024 * 1024
+# what S3 stores as the content type of a file uploaded without one
+UNKNOWN_CONTENT_TYPES = frozenset({"binary/octet-stream", "application/octet-stream"})
 
 
 class S3(CloudStorage):
     def __init__(self) -> None:
-        self.s3_client: S3Client = boto3.client("s3")
+        self.s3_client: S3Client = clients.client("s3")
 
     @staticmethod
     def parse_s3_url(s3_url: str) -> tuple[str, str]:
@@ -36,6 +53,82 @@ class S3(CloudStorage):
         except Exception as e:
             raise CloudStorageException(f"Failed to upload into 's3://{bucket_name}/{key}'.") from e
 
+    def content_type(self, remote_url: str) -> str | None:
+        try:
+            bucket_name, object_key = self.parse_s3_url(remote_url)
+            head = self.s3_client.head_object(Bucket=bucket_name, Key=object_key)
+        except Exception as e:
+            raise CloudStorageException(f"Failed to get the content type of the file at {remote_url}") from e
+
+        content_type = head.get("ContentType")
+        if content_type and content_type not in UNKNOWN_CONTENT_TYPES:
+            return content_type
+
+        # uploads don't set a content type, so it's usually guessed from the name the file was uploaded with
+        original_filename = head.get("Metadata", {}).get("original_filename")
+        content_type, _ = mimetypes.guess_type(original_filename or object_key)
+        return content_type
+
+    def list_files(self, bucket_name: str, prefix: str) -> Iterator[str]:
+        try:
+            paginator = self.s3_client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+                for s3_object in page.get("Contents", []):
+                    yield f"s3://{bucket_name}/{s3_object['Key']}"
+        except Exception as e:
+            raise CloudStorageException(f"Failed to list the files under 's3://{bucket_name}/{prefix}'") from e
+
+    def upload_form(self, bucket_name: str, key: str, metadata: dict[str, str], max_size: int) -> dict:
+        try:
+            metadata_fields = {f"x-amz-meta-{name}": value for name, value in metadata.items()}
+            presigned_post = self.s3_client.generate_presigned_post(
+                Bucket=bucket_name,
+                Key=key,
+                Fields=metadata_fields,
+                Conditions=[
+                    *({name: value} for name, value in metadata_fields.items()),
+                    ["content-length-range", 1, max_size],
+                ],
+                ExpiresIn=UPLOAD_URL_EXPIRATION_SECONDS,
+            )
+        except Exception as e:
+            raise CloudStorageException(f"Failed to generate an upload form for 's3://{bucket_name}/{key}'") from e
+
+        return {"url": presigned_post["url"], "fields": presigned_post["fields"]}
+
+    def start_multipart_upload(self, bucket_name: str, key: str, metadata: dict[str, str]) -> str:
+        try:
+            response = self.s3_client.create_multipart_upload(Bucket=bucket_name, Key=key, Metadata=metadata)
+        except Exception as e:
+            raise CloudStorageException(f"Failed to start a multipart upload into 's3://{bucket_name}/{key}'") from e
+
+        return response["UploadId"]
+
+    def multipart_upload_part_urls(self, bucket_name: str, key: str, upload_id: str, part_count: int) -> list[str]:
+        try:
+            # S3 part numbers start at 1
+            return [
+                self.s3_client.generate_presigned_url(
+                    "upload_part",
+                    Params={"Bucket": bucket_name, "Key": key, "UploadId": upload_id, "PartNumber": part_number},
+                    ExpiresIn=UPLOAD_URL_EXPIRATION_SECONDS,
+                )
+                for part_number in range(1, part_count + 1)
+            ]
+        except Exception as e:
+            raise CloudStorageException(f"Failed to generate part upload URLs for 's3://{bucket_name}/{key}'") from e
+
+    def complete_multipart_upload(self, remote_url: str, upload_id: str, part_etags: list[str]):
+        parts = [{"PartNumber": part_number, "ETag": etag} for part_number, etag in enumerate(part_etags, start=1)]
+
+        try:
+            bucket_name, object_key = self.parse_s3_url(remote_url)
+            self.s3_client.complete_multipart_upload(
+                Bucket=bucket_name, Key=object_key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+            )
+        except Exception as e:
+            raise CloudStorageException(f"Failed to complete the multipart upload into {remote_url}") from e
+
     def file_exists_and_allowed_to_access(self, remote_url: str) -> bool:
         bucket_name, object_key = self.parse_s3_url(remote_url)
 
@@ -65,3 +158,80 @@ class S3(CloudStorage):
             return s3_object["Body"].read()
         except Exception as e:
             raise CloudStorageException(f"Failed to get the file at {remote_url}") from e
+
+    def get_file_base64(self, remote_url: str, max_size: int | None = None) -> str:
+        try:
+            bucket_name, object_key = self.parse_s3_url(remote_url)
+            s3_object = self.s3_client.get_object(Bucket=bucket_name, Key=object_key)
+        except Exception as e:
+            raise CloudStorageException(f"Failed to get the file at {remote_url}") from e
+
+        body = s3_object["Body"]
+        if max_size is not None and s3_object["ContentLength"] > max_size:
+            body.close()
+            raise CloudStorageFileTooLargeException(
+                f"The file at {remote_url} is {s3_object['ContentLength']} bytes, more than the {max_size} allowed"
+            )
+
+        try:
+            return "".join(_base64_chunks(body, BASE64_CHUNK_SIZE))
+        except Exception as e:
+            raise CloudStorageException(f"Failed to get the file at {remote_url}") from e
+        finally:
+            body.close()
+
+    def content_hash(self, remote_url: str) -> str:
+        try:
+            bucket_name, object_key = self.parse_s3_url(remote_url)
+            head = self.s3_client.head_object(Bucket=bucket_name, Key=object_key)
+            stored_hash = head.get("Metadata", {}).get(CONTENT_HASH_METADATA_KEY)
+            if stored_hash:
+                return stored_hash
+
+            s3_object = self.s3_client.get_object(Bucket=bucket_name, Key=object_key)
+        except Exception as e:
+            raise CloudStorageException(f"Failed to get the file at {remote_url}") from e
+
+        body = s3_object["Body"]
+        try:
+            content_hash = hashlib.sha256()
+            while chunk := body.read(HASH_CHUNK_SIZE):
+                content_hash.update(chunk)
+            return content_hash.hexdigest()
+        except Exception as e:
+            raise CloudStorageException(f"Failed to get the file at {remote_url}") from e
+        finally:
+            body.close()
+
+    def object_version(self, remote_url: str) -> str:
+        try:
+            bucket_name, object_key = self.parse_s3_url(remote_url)
+            head = self.s3_client.head_object(Bucket=bucket_name, Key=object_key)
+        except Exception as e:
+            raise CloudStorageException(f"Failed to get the version of the file at {remote_url}") from e
+
+        # objects in an unversioned bucket have no version ID (or the ID "null"), and uploading the same bytes again
+        # keeps the ETag, but not the time it was last written
+        version_id = head.get("VersionId")
+        if version_id and version_id != "null":
+            return version_id
+        entity_tag = head["ETag"].strip('"')
+        return f"{head['LastModified'].isoformat()}/{entity_tag}"
+
+
+def _base64_chunks(stream: BinaryIO, chunk_size: int) -> Iterator[str]:
+    """Reads the stream a chunk at a time and base64 encodes each chunk.
+
+    A read can return fewer bytes than asked for, so whatever doesn't fill a group of 3 bytes is carried over to the
+    next chunk.
+    """
+    leftover = b""
+
+    while chunk := stream.read(chunk_size):
+        chunk = leftover + chunk
+        encodable_length = len(chunk) - len(chunk) % 3
+        leftover = chunk[encodable_length:]
+        yield base64.b64encode(chunk[:encodable_length]).decode("ascii")
+
+    if leftover:
+        yield base64.b64encode(leftover).decode("ascii")
@@ -1,13 +1,16 @@
-import boto3
-from types_boto3_secretsmanager import SecretsManagerClient
+from typing import TYPE_CHECKING
 
+from src.external.aws import clients
 from src.secret.cloud_secret_manager import CloudSecretManager
 from src.secret.exception import CloudSecretManagerException
 
+if TYPE_CHECKING:
+    from types_boto3_secretsmanager import SecretsManagerClient
+
 
 class SecretManager(CloudSecretManager):
     def __init__(self) -> None:
-        self.client: SecretsManagerClient = boto3.client("secretsmanager")
+        self.client: SecretsManagerClient = clients.client("secretsmanager")
 
     def get_secret(self, secret_id: str) -> str:
         try:
@@ -0,0 +1,31 @@
+import os
+from typing import TYPE_CHECKING
+
+from src.external.aws import clients
+from src.external.aws.s3 import S3
+from src.message_queue import ClaimCheckMessageQueue, MessageQueue, MessageQueueException
+from src.message_queue.claim_check import DEFAULT_THRESHOLD_BYTES
+
+if TYPE_CHECKING:
+    from types_boto3_sqs import SQSClient
+
+
+class Sqs(MessageQueue):
+    def __init__(self) -> None:
+        self.sqs_client: SQSClient = clients.client("sqs")
+
+    def send_message(self, queue_url: str, message: str):
+        try:
+            self.sqs_client.send_message(QueueUrl=queue_url, MessageBody=message)
+        except Exception as e:
+            raise MessageQueueException(f"Failed to send a message to {queue_url}") from e
+
+
+def sqs_with_claim_check() -> MessageQueue:
+    """SQS, sending large messages through the S3 bucket in `CLAIM_CHECK_BUCKET` if it's set."""
+    bucket_name = os.environ.get("CLAIM_CHECK_BUCKET")
+    if not bucket_name:
+        return Sqs()
+
+    threshold_bytes = int(os.environ.get("CLAIM_CHECK_THRESHOLD_BYTES", DEFAULT_THRESHOLD_BYTES))
+    return ClaimCheckMessageQueue(Sqs(), S3(), bucket_name, threshold_bytes)
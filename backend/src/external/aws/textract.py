@@ -1,129 +1,533 @@
 import asyncio
+import functools
+import json
+import math
 import os
 import statistics
-from typing import Any
+import threading
+import uuid
+from collections import Counter
+from collections.abc import Callable, Collection, Iterable, Iterator, Mapping
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
 
-import boto3
 import iterator_chain
-from types_boto3_textract import TextractClient
 
+from src.external.aws import clients
 from src.external.aws.s3 import S3
+from src.external.aws.textract_adapter_versions import AdapterVersionCache, adapter_ids_from_environment
+from src.external.aws.textract_archive import FORMS_PARSER, QUERIES_PARSER, textract_archive_from_environment
+from src.external.aws.textract_query_planner import (
+    ALL_PAGES,
+    QUERIES_PER_ADAPTER,
+    QueryPlan,
+    form_adapter_ids,
+    plan_queries,
+)
+from src.external.aws.textract_rate_limiter import TextractRateLimiter
 from src.forms.form import Form
-from src.ocr import Ocr, OcrException
+from src.ocr import ClassificationScope, Ocr, OcrException
+from src.storage import CloudStorage, CloudStorageException
 
+if TYPE_CHECKING:
+    from types_boto3_textract import TextractClient
+
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_HEADER_FRACTION = 0.25
+# images in these formats only ever have one page, so they can be analyzed synchronously, in one round trip instead of
+# a job that has to be polled, but only with up to 15 queries at once (single page PDFs and TIFFs could be too, but
+# their page count isn't known without reading them)
+SYNC_CONTENT_TYPES = frozenset({"image/jpeg", "image/png"})
+SYNC_MAX_QUERIES_PER_PAGE = 15
+# what a synchronous analysis fails with for a document only a job can analyze, like a mislabeled multi-page TIFF
+SYNC_UNSUPPORTED_ERROR_CODES = frozenset({"UnsupportedDocumentException", "DocumentTooLargeException"})
+SYNC_MODE = "sync"
+ASYNC_MODE = "async"
 
-class Textract(Ocr):
-    def __init__(self) -> None:
-        self.textract_client: TextractClient = boto3.client("textract")
 
-    def scan(self, s3_url: str, form: Form | None) -> dict[str, dict[str, str | float]]:
+class Textract(Ocr):
+    def __init__(self, max_concurrency: int | None = None) -> None:
+        # the maximum number of Textract calls in flight at once for a Lambda invocation, across all the documents it
+        # scans at the same time, which share this instance
+        self.max_concurrency = max_concurrency or int(
+            os.environ.get("TEXTRACT_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)
+        )
+        self._calls_in_flight = threading.BoundedSemaphore(self.max_concurrency)
+        self.poll_interval_seconds = 1
+        # the top fraction of the first page that is read when classifying with `ClassificationScope.HEADER`
+        self.header_fraction = float(os.environ.get("CLASSIFICATION_HEADER_FRACTION", DEFAULT_HEADER_FRACTION))
+        # boto3 doesn't retry, every call goes through the rate limiter instead (see `_call`), which paces the calls to
+        # each API for the whole process, and retries the throttled ones and the ones that failed with transient errors
+        self.textract_client: TextractClient = clients.client(
+            "textract",
+            max_pool_connections=max(self.max_concurrency, clients.DEFAULT_MAX_POOL_CONNECTIONS),
+            max_attempts=1,
+        )
+        self.rate_limiter = TextractRateLimiter()
+        # when configured, the raw responses of every scan are kept so their data can be extracted again later
+        self.archive = textract_archive_from_environment()
+        # tells whether a document is a single page image, which is analyzed synchronously
+        self.cloud_storage: CloudStorage = S3()
+        # the synchronous plans `start_scan` made for the `scan` that follows it, so the document is only looked up once
+        self._synchronous_plans: dict[tuple[str, str, frozenset[str]], QueryPlan] = {}
+        # how many query scans were analyzed synchronously and with jobs, over the life of the process
+        self.analysis_modes: Counter[str] = Counter()
+
+        # when configured, query jobs can be started with a notification channel so a separate completion handler
+        # picks up the results instead of this process polling for them
+        notification_topic_arn = os.environ.get("TEXTRACT_NOTIFICATION_TOPIC_ARN")
+        notification_role_arn = os.environ.get("TEXTRACT_NOTIFICATION_ROLE_ARN")
+        self.notification_channel = (
+            {"SNSTopicArn": notification_topic_arn, "RoleArn": notification_role_arn}
+            if notification_topic_arn and notification_role_arn
+            else None
+        )
+
+    def scan(
+        self, s3_url: str, form: Form | None, skipped_queries: Collection[str] = ()
+    ) -> dict[str, dict[str, str | float]]:
         try:
             # Parse the S3 URL
             bucket_name, object_key = S3.parse_s3_url(s3_url)
 
             if form is None or form.queries() is None or len(form.queries()) == 0:
                 print("Attempting AnalyzeDocument with forms and tables")
-                response = self.textract_client.analyze_document(
+                response = self._call(
+                    "analyze_document",
                     Document={"S3Object": {"Bucket": bucket_name, "Name": object_key}},
                     FeatureTypes=["FORMS"],
                 )
                 print("Parsing result")
-                extracted_data = self._parse_textract_forms(response)
+                job_id = f"analyze-document-{uuid.uuid4()}"
+                responses = self._archived([response], s3_url, form, FORMS_PARSER, job_id, [job_id])
+                extracted_data = self._parse_textract_forms(responses)
             else:
-                print("Attempting AnalyzeDocument with queries")
-                response_list = asyncio.run(self._paginated_textract_with_queries(form, bucket_name, object_key))
-                print("Parsing result")
-                extracted_data = (
-                    iterator_chain.from_iterable(response_list)
-                    .map(self._parse_textract_queries)
-                    .reduce(lambda a_dict, b_dict: {**a_dict, **b_dict}, initial={})
+                extracted_data = None
+                plan_key = (s3_url, form.identifier(), frozenset(skipped_queries))
+                query_plan = self._synchronous_plans.pop(plan_key, None) or self._synchronous_plan(
+                    s3_url, form, skipped_queries
                 )
+                if query_plan is not None:
+                    extracted_data = self._analyze_queries_synchronously(
+                        query_plan, form, bucket_name, object_key, s3_url
+                    )
+
+                if extracted_data is None:
+                    self._count_analysis_mode(ASYNC_MODE, s3_url)
+                    print("Attempting AnalyzeDocument with queries")
+                    extracted_data_list = asyncio.run(
+                        self._paginated_textract_with_queries(form, bucket_name, object_key, s3_url, skipped_queries)
+                    )
+                    extracted_data = self._merge_extracted_data(extracted_data_list)
 
             return extracted_data
 
         except Exception as e:
             raise OcrException(f"Unable to OCR the image {s3_url}") from e
 
-    def extract_raw_text(self, s3_url: str) -> list[str]:
+    def extract_raw_text(self, s3_url: str, scope: ClassificationScope = ClassificationScope.DOCUMENT) -> list[str]:
         try:
             bucket_name, object_key = S3.parse_s3_url(s3_url)
 
-            response = self.textract_client.detect_document_text(
-                Document={"S3Object": {"Bucket": bucket_name, "Name": object_key}}
+            response = self._call(
+                "detect_document_text", Document={"S3Object": {"Bucket": bucket_name, "Name": object_key}}
             )
 
-            return (
-                iterator_chain.from_iterable(response.get("Blocks", []))
-                .filter(lambda block: block["BlockType"] == "LINE")
-                .filter(lambda block: "Text" in block)
-                .map(lambda block: block["Text"])
-                .list()
-            )
+            return self._lines_in_scope(response, scope, self.header_fraction)
 
         except Exception as e:
             raise OcrException(f"Failure while trying to detect the document type of {s3_url}") from e
 
-    async def _paginated_textract_with_queries(self, form, bucket_name, object_key) -> list[Any]:
-        queries_config = [{"Text": query, "Pages": ["*"]} for query in form.queries()]
-        paginated_queries_config = Textract._split_list_by_30(queries_config)
-
-        tasks = [
-            asyncio.create_task(
-                self._call_textract_with_queries(
-                    bucket_name,
-                    object_key,
-                    sub_queries_config,
-                    os.environ.get(f"TEXTRACT_ADAPTER_ID_{form.identifier()}_{index}"),
-                )
+    def extract_raw_text_and_forms(
+        self, s3_url: str, scope: ClassificationScope = ClassificationScope.DOCUMENT
+    ) -> tuple[list[str], dict[str, dict[str, str | float]]]:
+        try:
+            bucket_name, object_key = S3.parse_s3_url(s3_url)
+
+            print("Attempting AnalyzeDocument with forms for both classification and extraction")
+            response = self._call(
+                "analyze_document",
+                Document={"S3Object": {"Bucket": bucket_name, "Name": object_key}},
+                FeatureTypes=["FORMS"],
             )
-            for index, sub_queries_config in enumerate(paginated_queries_config, start=0)
-        ]
-        results_list = await asyncio.gather(*tasks)
 
-        return results_list
+            # AnalyzeDocument returns the same LINE blocks that DetectDocumentText does
+            return self._parse_lines_and_forms(response, scope, self.header_fraction)
+
+        except Exception as e:
+            raise OcrException(f"Failure while trying to detect the document type of {s3_url}") from e
 
     @staticmethod
-    def _split_list_by_30(the_list: list[Any]) -> list[list[Any]]:
-        sublist_size = 30
-        return [the_list[i : i + sublist_size] for i in range(0, len(the_list), sublist_size)]
+    def _lines_in_scope(textract_response, scope: ClassificationScope, header_fraction: float) -> list[str]:
+        in_scope = Textract._line_in_scope(scope, header_fraction)
+        return [block["Text"] for block in textract_response.get("Blocks", []) if in_scope(block)]
 
-    async def _call_textract_with_queries(self, bucket_name, object_key, queries_config, adapter_id):
-        print("Initiating document analysis")
-        if adapter_id is not None:
-            initiate_response = self.textract_client.start_document_analysis(
-                DocumentLocation={"S3Object": {"Bucket": bucket_name, "Name": object_key}},
-                FeatureTypes=["QUERIES"],
-                QueriesConfig={"Queries": queries_config},
-                AdaptersConfig={
-                    "Adapters": [
-                        {
-                            "AdapterId": adapter_id,
-                            "Pages": ["*"],
-                            "Version": self._get_latest_adapter_version(adapter_id),
-                        }
-                    ]
-                },
+    @staticmethod
+    def _line_in_scope(scope: ClassificationScope, header_fraction: float) -> Callable[[Any], bool]:
+        def in_scope(block) -> bool:
+            if block["BlockType"] != "LINE" or "Text" not in block:
+                return False
+
+            if scope == ClassificationScope.DOCUMENT:
+                return True
+
+            # synchronous responses only cover a single page and may leave out the page number
+            if block.get("Page", 1) != 1:
+                return False
+
+            if scope == ClassificationScope.HEADER:
+                return block["Geometry"]["BoundingBox"]["Top"] < header_fraction
+
+            return True
+
+        return in_scope
+
+    def start_scan(
+        self, s3_url: str, form: Form | None, job_tag: str, skipped_queries: Collection[str] = ()
+    ) -> list[str] | None:
+        if self.notification_channel is None or form is None or not form.queries():
+            return None
+
+        try:
+            bucket_name, object_key = S3.parse_s3_url(s3_url)
+
+            query_plan = self._synchronous_plan(s3_url, form, skipped_queries)
+            if query_plan is not None:
+                # it's quicker to analyze it synchronously with `scan` than to wait on a notification
+                self._synchronous_plans[(s3_url, form.identifier(), frozenset(skipped_queries))] = query_plan
+                return None
+
+            self._count_analysis_mode(ASYNC_MODE, s3_url)
+            print("Starting document analysis with queries that notifies on completion")
+            return asyncio.run(
+                self._start_jobs_with_notification(form, bucket_name, object_key, job_tag, skipped_queries)
             )
-        else:
-            # Can't seem to set `AdaptersConfig` to `None` if the size of `adapters_config` is 0.  Best thing to do is
-            # just not pass it in.
-            initiate_response = self.textract_client.start_document_analysis(
-                DocumentLocation={"S3Object": {"Bucket": bucket_name, "Name": object_key}},
-                FeatureTypes=["QUERIES"],
-                QueriesConfig={"Queries": queries_config},
+
+        except Exception as e:
+            raise OcrException(f"Unable to start OCR of the image {s3_url}") from e
+
+    def finish_scan(
+        self, job_ids: list[str], s3_url: str | None = None, form: Form | None = None
+    ) -> dict[str, dict[str, str | float]] | None:
+        try:
+            extracted_data_list = asyncio.run(self._get_job_results(job_ids, s3_url, form))
+            if extracted_data_list is None:
+                return None
+
+            return self._merge_extracted_data(extracted_data_list)
+
+        except OcrException:
+            raise
+        except Exception as e:
+            raise OcrException(f"Unable to get the results of jobs {', '.join(job_ids)}") from e
+
+    def _synchronous_plan(self, s3_url: str, form: Form, skipped_queries: Collection[str]) -> QueryPlan | None:
+        """The calls to analyze the document synchronously with, or `None` if it's analyzed with jobs.
+
+        Only a single page image is analyzed synchronously, and only if that takes no more calls than jobs (each of
+        which is billed for the page), since a call answers half as many queries on a page as a job does.  A W2's 35
+        queries take 3 calls but only 2 jobs, for example.
+        """
+        try:
+            content_type = self.cloud_storage.content_type(s3_url)
+        except CloudStorageException as e:
+            print(f"Couldn't tell whether {s3_url} is a single page image, so it is analyzed with jobs: {e}")
+            return None
+
+        if content_type not in SYNC_CONTENT_TYPES:
+            return None
+
+        query_plan = plan_queries(form, skipped_queries, max_queries_per_page=SYNC_MAX_QUERIES_PER_PAGE, page_count=1)
+        job_count = len(plan_queries(form, skipped_queries, page_count=1).jobs)
+        if len(query_plan.jobs) > job_count:
+            print(f"Analyzing {s3_url} synchronously takes {len(query_plan.jobs)} calls instead of {job_count} jobs")
+            return None
+
+        return query_plan
+
+    def _analyze_queries_synchronously(
+        self, query_plan: QueryPlan, form: Form, bucket_name: str, object_key: str, s3_url: str
+    ) -> dict[str, dict[str, str | float]] | None:
+        """Answers the planned queries with `analyze_document`, or `None` if it can't analyze the document."""
+        job_ids = [f"analyze-document-{uuid.uuid4()}" for _ in query_plan.jobs]
+
+        print(f"Attempting AnalyzeDocument synchronously with queries in {len(query_plan.jobs)} calls")
+        try:
+            with self._executor() as executor:
+                responses = list(
+                    executor.map(
+                        lambda job: self._call(
+                            "analyze_document",
+                            Document={"S3Object": {"Bucket": bucket_name, "Name": object_key}},
+                            **self._query_analysis_arguments(job.queries_config(), job.adapter_pages()),
+                        ),
+                        query_plan.jobs,
+                    )
+                )
+        except Exception as e:
+            if _error_code(e) not in SYNC_UNSUPPORTED_ERROR_CODES:
+                raise
+            print(f"Couldn't analyze {s3_url} synchronously, so it is analyzed with jobs: {e}")
+            return None
+
+        self._count_analysis_mode(SYNC_MODE, s3_url)
+        print("Parsing result")
+        return self._merge_extracted_data(
+            [
+                self._parse_textract_queries(self._archived([response], s3_url, form, QUERIES_PARSER, job_id, job_ids))
+                for job_id, response in zip(job_ids, responses, strict=True)
+            ]
+        )
+
+    def _count_analysis_mode(self, mode: str, s3_url: str):
+        self.analysis_modes[mode] += 1
+        print(
+            f"Analyzing the queries of {s3_url} {mode} "
+            f"({self.analysis_modes[SYNC_MODE]} sync and {self.analysis_modes[ASYNC_MODE]} async so far)"
+        )
+
+    @staticmethod
+    def parse_completion_notification(message: str) -> tuple[str, str, str | None]:
+        """Pulls the job ID, status, and job tag out of a Textract completion notification.
+
+        The notification can arrive as the raw Textract message or wrapped in an SNS envelope.
+        """
+        notification = json.loads(message)
+        if "Message" in notification:
+            notification = json.loads(notification["Message"])
+
+        return notification["JobId"], notification["Status"], notification.get("JobTag")
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # boto3 is blocking, so every Textract call goes through a bounded executor.  That lets all the chunk jobs start
+        # at once and be polled together instead of one after the other.
+        return ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="textract")
+
+    async def _paginated_textract_with_queries(
+        self, form, bucket_name, object_key, s3_url, skipped_queries
+    ) -> list[dict[str, Any]]:
+        with self._executor() as executor:
+            job_ids = await self._start_query_jobs(executor, form, bucket_name, object_key, None, skipped_queries)
+            first_responses = await self._wait_for_jobs(executor, job_ids)
+            results_list = await self._parse_job_results(executor, job_ids, first_responses, s3_url, form)
+
+        return results_list
+
+    async def _start_jobs_with_notification(self, form, bucket_name, object_key, job_tag, skipped_queries) -> list[str]:
+        with self._executor() as executor:
+            return await self._start_query_jobs(executor, form, bucket_name, object_key, job_tag, skipped_queries)
+
+    async def _get_job_results(
+        self, job_ids: list[str], s3_url: str | None, form: Form | None
+    ) -> list[dict[str, Any]] | None:
+        with self._executor() as executor:
+            first_responses = await self._get_document_analyses(executor, job_ids)
+
+            if any(response["JobStatus"] == "IN_PROGRESS" for response in first_responses):
+                return None
+
+            failed_job_ids = [
+                job_id
+                for job_id, response in zip(job_ids, first_responses, strict=True)
+                if response["JobStatus"] not in ("SUCCEEDED", "PARTIAL_SUCCESS")
+            ]
+            if len(failed_job_ids) > 0:
+                raise OcrException(f"Document analysis jobs {', '.join(failed_job_ids)} did not succeed")
+
+            return await self._parse_job_results(executor, job_ids, first_responses, s3_url, form)
+
+    async def _start_query_jobs(
+        self, executor: Executor, form, bucket_name, object_key, job_tag=None, skipped_queries: Collection[str] = ()
+    ) -> list[str]:
+        loop = asyncio.get_running_loop()
+
+        # queries are skipped before they're planned, and keep the adapter trained for them, so a job with nothing left
+        # to answer isn't started at all
+        query_plan = plan_queries(form, skipped_queries)
+
+        start_tasks = [
+            loop.run_in_executor(
+                executor,
+                self._start_textract_with_queries,
+                bucket_name,
+                object_key,
+                job.queries_config(),
+                job.adapter_pages(),
+                job_tag,
             )
-        job_id = initiate_response["JobId"]
-        response = self.textract_client.get_document_analysis(JobId=job_id)
-        while response["JobStatus"] == "IN_PROGRESS":
-            await asyncio.sleep(1)
-            print(f"Checking if job {job_id} is complete")
-            response = self.textract_client.get_document_analysis(JobId=job_id)
+            for job in query_plan.jobs
+        ]
+        return await asyncio.gather(*start_tasks)
 
-        print(f"Completed document analysis for job {job_id}")
-        return response
+    def _start_textract_with_queries(
+        self, bucket_name, object_key, queries_config, adapter_pages: dict[str, list[str]], job_tag=None
+    ) -> str:
+        print("Initiating document analysis")
+        start_arguments = {
+            "DocumentLocation": {"S3Object": {"Bucket": bucket_name, "Name": object_key}},
+            **self._query_analysis_arguments(queries_config, adapter_pages),
+        }
+
+        if job_tag is not None:
+            start_arguments["NotificationChannel"] = self.notification_channel
+            start_arguments["JobTag"] = job_tag
+
+        initiate_response = self._call("start_document_analysis", **start_arguments)
+        return initiate_response["JobId"]
+
+    def _query_analysis_arguments(self, queries_config, adapter_pages: dict[str, list[str]]) -> dict[str, Any]:
+        arguments = {"FeatureTypes": ["QUERIES"], "QueriesConfig": {"Queries": queries_config}}
+
+        # Can't seem to set `AdaptersConfig` to `None` if the size of `adapters_config` is 0.  Best thing to do is just
+        # not pass it in.
+        if adapter_pages:
+            arguments["AdaptersConfig"] = {
+                "Adapters": [
+                    {
+                        "AdapterId": adapter_id,
+                        "Pages": pages,
+                        "Version": self._get_latest_adapter_version(adapter_id),
+                    }
+                    for adapter_id, pages in adapter_pages.items()
+                ]
+            }
+
+        return arguments
+
+    async def _get_document_analyses(self, executor: Executor, job_ids: list[str]) -> list[Any]:
+        loop = asyncio.get_running_loop()
+
+        poll_tasks = [
+            loop.run_in_executor(executor, functools.partial(self._call, "get_document_analysis", JobId=job_id))
+            for job_id in job_ids
+        ]
+        return await asyncio.gather(*poll_tasks)
+
+    async def _wait_for_jobs(self, executor: Executor, job_ids: list[str]) -> list[Any]:
+        completed_responses = {}
+        pending_job_ids = list(job_ids)
+
+        while True:
+            responses = await self._get_document_analyses(executor, pending_job_ids)
+
+            for job_id, response in zip(pending_job_ids, responses, strict=True):
+                if response["JobStatus"] != "IN_PROGRESS":
+                    print(f"Completed document analysis for job {job_id}")
+                    completed_responses[job_id] = response
+
+            pending_job_ids = [job_id for job_id in pending_job_ids if job_id not in completed_responses]
+            if len(pending_job_ids) == 0:
+                break
+
+            await asyncio.sleep(self.poll_interval_seconds)
+            print(f"Checking if jobs {', '.join(pending_job_ids)} are complete")
+
+        return [completed_responses[job_id] for job_id in job_ids]
+
+    async def _parse_job_results(
+        self,
+        executor: Executor,
+        job_ids: list[str],
+        first_responses: list[Any],
+        s3_url: str | None = None,
+        form: Form | None = None,
+    ) -> list[dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+
+        print("Parsing result")
+        parse_tasks = [
+            loop.run_in_executor(executor, self._parse_job_result, job_id, first_response, job_ids, s3_url, form)
+            for job_id, first_response in zip(job_ids, first_responses, strict=True)
+        ]
+        return await asyncio.gather(*parse_tasks)
+
+    def _parse_job_result(
+        self, job_id: str, first_response: Any, job_ids: list[str], s3_url: str | None, form: Form | None
+    ) -> dict[str, Any]:
+        pages = self._document_analysis_pages(job_id, first_response)
+        return self._parse_textract_queries(self._archived(pages, s3_url, form, QUERIES_PARSER, job_id, job_ids))
+
+    def _archived(
+        self,
+        responses: Iterable[Any],
+        s3_url: str | None,
+        form: Form | None,
+        parser: str,
+        job_id: str,
+        job_ids: list[str],
+    ) -> Iterable[Any]:
+        """The responses, which are archived as they are consumed when there's an archive and the document is known."""
+        if self.archive is None or s3_url is None:
+            return responses
+
+        return self.archive.recording(responses, s3_url, form, parser, job_id, job_ids)
+
+    def _document_analysis_pages(self, job_id: str, first_response: Any) -> Iterator[Any]:
+        """Yields every page of a job's results, only fetching the next page once the previous one is consumed."""
+        response = first_response
+        yield response
+
+        while "NextToken" in response:
+            response = self._call("get_document_analysis", JobId=job_id, NextToken=response["NextToken"])
+            yield response
+
+    def _call(self, api_name: str, **kwargs) -> Any:
+        function = getattr(self.textract_client, api_name)
+
+        # a call only takes a slot while it's in flight, not while the rate limiter holds it back
+        def call_in_flight(**function_kwargs):
+            with self._calls_in_flight:
+                return function(**function_kwargs)
+
+        return self.rate_limiter.call(api_name, call_in_flight, **kwargs)
+
+    @staticmethod
+    def _merge_extracted_data(extracted_data_list: list[dict[str, Any]]) -> dict[str, dict[str, str | float]]:
+        return iterator_chain.from_iterable(extracted_data_list).reduce(
+            lambda a_dict, b_dict: {**a_dict, **b_dict}, initial={}
+        )
+
+    def query_configurations(self, form: Form) -> dict[str, str]:
+        adapter_versions = self._chunk_adapter_versions(form)
+        query_pages = form.query_pages()
+
+        query_configurations = {}
+        for index, query in enumerate(form.queries()):
+            query_configurations[query] = adapter_versions[index // QUERIES_PER_ADAPTER]
+            # a query asked on every page keeps the configuration it was answered with before pages could be declared
+            if query in query_pages and tuple(query_pages[query]) != ALL_PAGES:
+                query_configurations[query] += f";pages={','.join(query_pages[query])}"
+
+        return query_configurations
+
+    def configuration_version(self, form: Form | None) -> str:
+        if form is None or not form.queries():
+            return "forms"
+
+        configuration_version = f"queries;{','.join(self._chunk_adapter_versions(form))}"
+        if form.query_pages():
+            configuration_version += f";pages={json.dumps(form.query_pages(), sort_keys=True)}"
+        return configuration_version
+
+    def _chunk_adapter_versions(self, form: Form) -> list[str]:
+        """The adapter and its version that each group of 30 of the form's queries is answered with, or `none`."""
+        adapter_ids = form_adapter_ids(form)
+        return [
+            f"{adapter_ids[index]}:{self._get_latest_adapter_version(adapter_ids[index])}"
+            if index in adapter_ids
+            else "none"
+            for index in range(math.ceil(len(form.queries()) / QUERIES_PER_ADAPTER))
+        ]
+
+    def warm_adapter_versions(self):
+        """Starts looking up the latest version of every adapter configured in the environment in the background."""
+        AdapterVersionCache().warm(adapter_ids_from_environment(), self._list_latest_adapter_version)
 
     def _get_latest_adapter_version(self, adapter_id) -> str:
-        response = self.textract_client.list_adapter_versions(AdapterId=adapter_id)
+        return AdapterVersionCache().get(adapter_id, self._list_latest_adapter_version)
+
+    def _list_latest_adapter_version(self, adapter_id) -> str:
+        response = self._call("list_adapter_versions", AdapterId=adapter_id)
         adapter_versions = response["AdapterVersions"]
         if not adapter_versions:
             raise ValueError("No versions found for the specified adapter.")
@@ -132,18 +536,25 @@ class Textract(Ocr):
         return latest_version["AdapterVersion"]
 
     @staticmethod
-    def _parse_textract_queries(textract_response):
+    def _parse_textract_queries(textract_responses):
+        """Parses query answers out of one response or a stream of paginated responses.
+
+        Only the parts of the blocks needed to resolve the answers are kept, so a stream of pages is consumed one page
+        at a time.
+        """
         extracted_data = {}
 
-        blocks = textract_response.get("Blocks", [])
         query_blocks = []
         query_result_blocks = {}
 
-        for block in blocks:
-            if block["BlockType"] == "QUERY":
-                query_blocks.append(block)
-            elif block["BlockType"] == "QUERY_RESULT":
-                query_result_blocks[block["Id"]] = block
+        for blocks in Textract._block_pages(textract_responses):
+            for block in blocks:
+                if block["BlockType"] == "QUERY":
+                    query_blocks.append(
+                        {"Query": {"Text": block["Query"]["Text"]}, "Relationships": block.get("Relationships", [])}
+                    )
+                elif block["BlockType"] == "QUERY_RESULT":
+                    query_result_blocks[block["Id"]] = Textract._compact_block(block)
 
         for query_block in query_blocks:
             value, confidence = Textract._get_text_and_confidence_from_relationship_blocks(
@@ -156,14 +567,52 @@ class Textract(Ocr):
 
     @staticmethod
     def _parse_textract_forms(response):
-        """Parses structured data from AnalyzeDocument response into a simple key-value format."""
-        extracted_data = {}
-        block_map = {block["Id"]: block for block in response.get("Blocks", [])}
+        """Parses structured data from AnalyzeDocument response into a simple key-value format.
+
+        Accepts one response or a stream of paginated responses, which are consumed one page at a time.
+        """
+        key_blocks = []
+        block_map = {}
+
+        for blocks in Textract._block_pages(response):
+            for block in blocks:
+                compact_block = Textract._compact_block(block)
+                block_map[block["Id"]] = compact_block
+
+                if block["BlockType"] == "KEY_VALUE_SET" and "KEY" in block.get("EntityTypes", []):
+                    key_blocks.append(compact_block)
+
+        return Textract._key_values(key_blocks, block_map)
+
+    @staticmethod
+    def _parse_lines_and_forms(
+        response, scope: ClassificationScope, header_fraction: float
+    ) -> tuple[list[str], dict[str, dict[str, str | float]]]:
+        """Reads both the lines in scope and the key-value pairs of one AnalyzeDocument response in a single walk over
+        its blocks."""
+        in_scope = Textract._line_in_scope(scope, header_fraction)
+
+        lines = []
+        key_blocks = []
+        block_map = {}
 
         for block in response.get("Blocks", []):
-            if block["BlockType"] != "KEY_VALUE_SET" or "KEY" not in block.get("EntityTypes", []):
-                continue
+            if in_scope(block):
+                lines.append(block["Text"])
+
+            # the whole response is in memory anyway, so unlike a stream of pages its blocks aren't worth compacting
+            block_map[block["Id"]] = block
+
+            if block["BlockType"] == "KEY_VALUE_SET" and "KEY" in block.get("EntityTypes", []):
+                key_blocks.append(block)
+
+        return lines, Textract._key_values(key_blocks, block_map)
 
+    @staticmethod
+    def _key_values(key_blocks: list[Any], block_map: dict[str, Any]) -> dict[str, dict[str, str | float]]:
+        extracted_data = {}
+
+        for block in key_blocks:
             key_text, key_confidence = Textract._get_text_and_confidence_from_relationship_blocks(
                 block, block_map, "CHILD"
             )
@@ -194,6 +643,25 @@ class Textract(Ocr):
 
         return extracted_data
 
+    @staticmethod
+    def _block_pages(textract_responses) -> Iterator[list[Any]]:
+        if isinstance(textract_responses, Mapping):
+            textract_responses = [textract_responses]
+
+        for textract_response in textract_responses:
+            yield textract_response.get("Blocks", [])
+
+    @staticmethod
+    def _compact_block(block: Any) -> dict[str, Any]:
+        """Keeps only the parts of a block that the parsers read so the rest of the page can be freed."""
+        compact_block = {}
+        if "Text" in block:
+            compact_block["Text"] = block["Text"]
+            compact_block["Confidence"] = block["Confidence"]
+        if "Relationships" in block:
+            compact_block["Relationships"] = block["Relationships"]
+        return compact_block
+
     @staticmethod
     def _get_text_and_confidence_from_relationship_blocks(
         block: Any, blocks: dict[str, Any], wanted_relationship: str
@@ -231,3 +699,11 @@ class Textract(Ocr):
             confidence = statistics.fmean(confidences)
 
         return " ".join(texts), confidence
+
+
+def _error_code(exception: Exception) -> str | None:
+    """The error code of a botocore `ClientError`, or of anything shaped like one."""
+    response = getattr(exception, "response", None)
+    if not isinstance(response, dict):
+        return None
+    return response.get("Error", {}).get("Code")
@@ -0,0 +1,96 @@
+import functools
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from src.context import singleton
+
+ADAPTER_ID_ENVIRONMENT_VARIABLE_PREFIX = "TEXTRACT_ADAPTER_ID_"
+DEFAULT_TTL_SECONDS = 3600
+
+
+@singleton
+class AdapterVersionCache:
+    """A process-wide cache of the latest version of each Textract adapter, keyed by adapter ID.
+
+    Adapter versions rarely change, so a looked up version is reused until its TTL runs out.  An expired version is
+    still returned while a fresh one is looked up in the background, so only the very first lookup of an adapter (or
+    the first one after `invalidate`) waits on Textract.
+    """
+
+    def __init__(self):
+        self.ttl_seconds = float(os.environ.get("TEXTRACT_ADAPTER_VERSION_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+        self.clock: Callable[[], float] = time.monotonic
+        self._versions: dict[str, tuple[str, float]] = {}
+        self._refreshes: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="adapter-version-refresh")
+
+    def get(self, adapter_id: str, lookup: Callable[[str], str]) -> str:
+        with self._lock:
+            cached = self._versions.get(adapter_id)
+            refresh = self._refreshes.get(adapter_id)
+
+        if cached is None:
+            # a warm up that's already looking the version up is waited on, one still queued is done here instead
+            if refresh is not None and not refresh.cancel():
+                try:
+                    return refresh.result()
+                except Exception:
+                    pass
+            return self._refresh(adapter_id, lookup)
+
+        version, expires_at = cached
+        if self.clock() >= expires_at:
+            self._refresh_in_background(adapter_id, lookup)
+
+        return version
+
+    def warm(self, adapter_ids: list[str], lookup: Callable[[str], str]) -> list[Future]:
+        """Looks up the latest version of each adapter in the background, so warming up doesn't hold up the caller."""
+        refreshes = []
+        for adapter_id in adapter_ids:
+            refresh = self._refresh_in_background(adapter_id, lookup)
+            refresh.add_done_callback(functools.partial(_log_failed_warm_up, adapter_id))
+            refreshes.append(refresh)
+        return refreshes
+
+    def invalidate(self, adapter_id: str | None = None):
+        with self._lock:
+            if adapter_id is None:
+                self._versions.clear()
+                self._refreshes.clear()
+            else:
+                self._versions.pop(adapter_id, None)
+                self._refreshes.pop(adapter_id, None)
+
+    def _refresh(self, adapter_id: str, lookup: Callable[[str], str]) -> str:
+        version = lookup(adapter_id)
+        with self._lock:
+            self._versions[adapter_id] = (version, self.clock() + self.ttl_seconds)
+        return version
+
+    def _refresh_in_background(self, adapter_id: str, lookup: Callable[[str], str]) -> Future:
+        with self._lock:
+            refresh = self._refreshes.get(adapter_id)
+            if refresh is None or refresh.done():
+                refresh = self._refresh_executor.submit(self._refresh, adapter_id, lookup)
+                self._refreshes[adapter_id] = refresh
+        return refresh
+
+
+def _log_failed_warm_up(adapter_id: str, refresh: Future):
+    # a failed warm up isn't fatal, the version will be looked up again when it is first needed
+    if not refresh.cancelled() and refresh.exception() is not None:
+        logging.warning(f"Failed to look up the latest version of adapter {adapter_id}: {refresh.exception()}")
+
+
+def adapter_ids_from_environment() -> list[str]:
+    return [
+        adapter_id
+        for variable_name, adapter_id in os.environ.items()
+        if variable_name.startswith(ADAPTER_ID_ENVIRONMENT_VARIABLE_PREFIX) and adapter_id
+    ]
@@ -0,0 +1,88 @@
+import gzip
+import io
+import json
+import os
+import time
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from src.documents.write_document import convert_document_url_to_id
+from src.external.aws.s3 import S3
+from src.forms.form import Form
+from src.storage import CloudStorage, CloudStorageException
+
+PREFIX = "ocr-archive/"
+# noticeably faster than gzip's default of 9 on large responses, for a few percent bigger archives
+COMPRESS_LEVEL = 6
+
+QUERIES_PARSER = "queries"
+FORMS_PARSER = "forms"
+
+
+class TextractArchive:
+    """The raw Textract responses of every scan, so the data can be extracted again without another OCR pass.
+
+    The responses of each job are gzipped JSON lines stored under `<prefix><document ID>/<job ID>.jsonl.gz`.  The first
+    line is a header with the document, its type, which parser reads the responses, the job, and every job of the same
+    scan (a scan asks its queries in as many jobs as its query plan has).  Each line after it is one page of responses.
+    """
+
+    def __init__(self, cloud_storage: CloudStorage, bucket_name: str, prefix: str = PREFIX):
+        self.cloud_storage = cloud_storage
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+
+    def key(self, document_id: str, job_id: str) -> str:
+        return f"{self.prefix}{document_id}/{job_id}.jsonl.gz"
+
+    def recording(
+        self,
+        responses: Iterable[Any],
+        document_url: str,
+        form: Form | None,
+        parser: str,
+        job_id: str,
+        job_ids: list[str],
+    ) -> Iterator[Any]:
+        """Yields the responses unchanged, compressing each one as it goes, and archives them once all were consumed.
+
+        Only the compressed responses are kept in memory, so a stream of pages is still consumed one page at a time.
+        """
+        header = {
+            "document_url": document_url,
+            "document_type": form.identifier() if form is not None else None,
+            "parser": parser,
+            "job_id": job_id,
+            "job_ids": job_ids,
+            "archived_at": time.time(),
+        }
+
+        archived = io.BytesIO()
+        with gzip.GzipFile(fileobj=archived, mode="wb", compresslevel=COMPRESS_LEVEL) as archive_file:
+            archive_file.write(json.dumps(header).encode() + b"\n")
+            for response in responses:
+                archive_file.write(json.dumps(response).encode() + b"\n")
+                yield response
+
+        key = self.key(convert_document_url_to_id(document_url), job_id)
+        try:
+            self.cloud_storage.put_object(self.bucket_name, key, archived.getvalue(), {})
+        except CloudStorageException as e:
+            # the scan itself succeeded, so a missing archive only means it can't be reprocessed later
+            print(f"Failed to archive the responses of job {job_id} for {document_url}: {e}")
+
+    @staticmethod
+    def open(archived: bytes) -> tuple[dict[str, Any], Iterator[Any]]:
+        """The header of an archive and its responses, which are decompressed one page at a time."""
+        lines = gzip.GzipFile(fileobj=io.BytesIO(archived))
+        header = json.loads(next(lines))
+        return header, (json.loads(line) for line in lines)
+
+
+def textract_archive_from_environment() -> TextractArchive | None:
+    """The archive in the `TEXTRACT_ARCHIVE_BUCKET` bucket, or `None` to not keep the raw responses."""
+    bucket_name = os.environ.get("TEXTRACT_ARCHIVE_BUCKET")
+    if not bucket_name:
+        return None
+
+    return TextractArchive(S3(), bucket_name)
@@ -0,0 +1,215 @@
+"""Plans which Textract document analysis jobs ask which of a form's queries.
+
+Inspect the plan of a form from the `backend` folder, with the adapters of the environment, with
+
+    uv run python -m src.external.aws.textract_query_planner W2
+"""
+
+import json
+import math
+import os
+import sys
+from collections import Counter
+from collections.abc import Collection, Iterable, Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+from src.external.aws.textract_adapter_versions import ADAPTER_ID_ENVIRONMENT_VARIABLE_PREFIX
+from src.forms import form_registry
+from src.forms.form import Form
+
+# Textract answers at most 30 queries on any one page of a document analysis job
+MAX_QUERIES_PER_PAGE = 30
+# the adapter `TEXTRACT_ADAPTER_ID_<form>_<index>` is trained for the index-th 30 queries the form declares
+QUERIES_PER_ADAPTER = 30
+ALL_PAGES = ("*",)
+
+# the first and last page of a range of pages, where the last page of an open range is infinite
+PageRange = tuple[int, float]
+
+
+@dataclass(frozen=True)
+class PlannedQuery:
+    text: str
+    pages: tuple[str, ...]
+    adapter_index: int
+    adapter_id: str | None
+
+
+@dataclass
+class QueryJob:
+    queries: list[PlannedQuery] = field(default_factory=list)
+
+    def queries_config(self) -> list[dict[str, Any]]:
+        return [{"Text": query.text, "Pages": list(query.pages)} for query in self.queries]
+
+    def adapter_pages(self) -> dict[str, list[str]]:
+        """The pages each adapter of the job applies to, which are the pages its queries are asked on."""
+        page_ranges: dict[str, list[PageRange]] = {}
+        for query in self.queries:
+            if query.adapter_id is not None:
+                page_ranges.setdefault(query.adapter_id, []).extend(parse_pages(query.pages))
+
+        return {adapter_id: format_pages(ranges) for adapter_id, ranges in page_ranges.items()}
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"queries": self.queries_config(), "adapters": self.adapter_pages()}
+
+
+@dataclass
+class QueryPlan:
+    form_identifier: str
+    jobs: list[QueryJob]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"form": self.form_identifier, "jobs": [job.to_dict() for job in self.jobs]}
+
+
+def plan_queries(
+    form: Form,
+    skipped_queries: Collection[str] = (),
+    adapter_ids: Mapping[int, str] | None = None,
+    max_queries_per_page: int = MAX_QUERIES_PER_PAGE,
+    page_count: int | None = None,
+) -> QueryPlan:
+    """Packs the form's queries, except the skipped ones, into as few jobs as fit Textract's limits.
+
+    Each query keeps the adapter trained for it, by the index of its 30 queries among the form's (from the environment
+    unless `adapter_ids` are given).  A job asks at most `max_queries_per_page` queries on any page, and because an
+    adapter applies to every query on its pages, queries with different adapters (or none) only share a job when they
+    are asked on different pages.  Queries are placed in the first job they fit in, in the order the form declares them.
+
+    With a `page_count`, the queries that are only asked on pages past the end of the document are left out.
+    """
+    if adapter_ids is None:
+        adapter_ids = form_adapter_ids(form)
+
+    query_pages = form.query_pages()
+    queries = [
+        PlannedQuery(
+            query,
+            tuple(query_pages.get(query, ALL_PAGES)),
+            index // QUERIES_PER_ADAPTER,
+            adapter_ids.get(index // QUERIES_PER_ADAPTER),
+        )
+        for index, query in enumerate(form.queries())
+        if query not in skipped_queries
+    ]
+
+    page_ranges = [parse_pages(query.pages) for query in queries]
+    if page_count is not None:
+        queries, page_ranges = _on_pages(queries, page_ranges, page_count)
+
+    # the pages are split where any query's pages start or end, so each query covers whole segments of pages
+    segment_starts = sorted(
+        {first for ranges in page_ranges for first, _ in ranges}
+        | {last + 1 for ranges in page_ranges for _, last in ranges if last != math.inf}
+    )
+
+    jobs: list[QueryJob] = []
+    job_loads: list[Counter[int]] = []
+    job_adapters: list[dict[int, str | None]] = []
+
+    for query, ranges in zip(queries, page_ranges, strict=True):
+        segments = [
+            segment
+            for segment, segment_start in enumerate(segment_starts)
+            if any(first <= segment_start <= last for first, last in ranges)
+        ]
+
+        fitting_job = next(
+            (
+                position
+                for position, (load, adapters) in enumerate(zip(job_loads, job_adapters, strict=True))
+                if all(
+                    load[segment] < max_queries_per_page and adapters.get(segment, query.adapter_id) == query.adapter_id
+                    for segment in segments
+                )
+            ),
+            None,
+        )
+        if fitting_job is None:
+            fitting_job = len(jobs)
+            jobs.append(QueryJob())
+            job_loads.append(Counter())
+            job_adapters.append({})
+
+        job, load, adapters = jobs[fitting_job], job_loads[fitting_job], job_adapters[fitting_job]
+        job.queries.append(query)
+        for segment in segments:
+            load[segment] += 1
+            adapters[segment] = query.adapter_id
+
+    return QueryPlan(form.identifier(), jobs)
+
+
+def _on_pages(
+    queries: list[PlannedQuery], page_ranges: list[list[PageRange]], page_count: int
+) -> tuple[list[PlannedQuery], list[list[PageRange]]]:
+    kept = [
+        (query, ranges)
+        for query, ranges in zip(queries, page_ranges, strict=True)
+        if any(first <= page_count for first, _ in ranges)
+    ]
+    return [query for query, _ in kept], [ranges for _, ranges in kept]
+
+
+def form_adapter_ids(form: Form) -> dict[int, str]:
+    """The adapter of each group of 30 of the form's queries that has one."""
+    adapter_ids = {}
+    for index in range(math.ceil(len(form.queries()) / QUERIES_PER_ADAPTER)):
+        adapter_id = os.environ.get(f"{ADAPTER_ID_ENVIRONMENT_VARIABLE_PREFIX}{form.identifier()}_{index}")
+        if adapter_id:
+            adapter_ids[index] = adapter_id
+    return adapter_ids
+
+
+def parse_pages(pages: Iterable[str]) -> list[PageRange]:
+    """Parses Textract's pages, like `"2"`, `"2-4"`, `"2-*"`, or `"*"`, into ranges of pages."""
+    page_ranges = []
+    for page in pages:
+        first, separator, last = page.partition("-")
+        if page == "*":
+            page_ranges.append((1, math.inf))
+        elif not separator and first.isdigit() and int(first) >= 1:
+            page_ranges.append((int(first), int(first)))
+        elif separator and first.isdigit() and int(first) >= 1 and last == "*":
+            page_ranges.append((int(first), math.inf))
+        elif separator and first.isdigit() and last.isdigit() and 1 <= int(first) <= int(last):
+            page_ranges.append((int(first), int(last)))
+        else:
+            raise ValueError(f"Invalid pages {page!r}, expected a page like '2', '2-4', '2-*', or '*'")
+    return page_ranges
+
+
+def format_pages(page_ranges: Iterable[PageRange]) -> list[str]:
+    """Merges the ranges of pages, and formats them as Textract's pages."""
+    merged: list[list[float]] = []
+    for first, last in sorted(page_ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+
+    pages = []
+    for first, last in merged:
+        if first == 1 and last == math.inf:
+            pages.append("*")
+        elif last == math.inf:
+            pages.append(f"{first}-*")
+        elif first == last:
+            pages.append(f"{first}")
+        else:
+            pages.append(f"{first}-{int(last)}")
+    return pages
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit(f"Usage: {sys.argv[0]} <form identifier>")
+
+    print(json.dumps(plan_queries(form_registry().form(sys.argv[1])).to_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
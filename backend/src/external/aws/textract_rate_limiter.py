@@ -0,0 +1,198 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from src.context import singleton
+
+# Textract's default quotas in the largest regions, see https://docs.aws.amazon.com/general/latest/gr/textract.html
+DEFAULT_TRANSACTIONS_PER_SECOND = {
+    "analyze_document": 10,
+    "detect_document_text": 10,
+    "start_document_analysis": 10,
+    "get_document_analysis": 10,
+    "list_adapter_versions": 5,
+}
+DEFAULT_MAX_ATTEMPTS = 6
+DEFAULT_BACKOFF_SECONDS = 0.2
+MAX_BACKOFF_SECONDS = 5
+
+THROTTLING_ERROR_CODES = {
+    "ThrottlingException",
+    "ProvisionedThroughputExceededException",
+    "LimitExceededException",
+    "TooManyRequestsException",
+}
+# errors boto3's standard retry mode retries besides throttles, which the limiter retries in its place
+TRANSIENT_ERROR_CODES = {
+    "InternalServerError",
+    "InternalFailure",
+    "ServiceUnavailable",
+    "ServiceUnavailableException",
+    "RequestTimeout",
+    "RequestTimeoutException",
+    "PriorRequestNotComplete",
+}
+
+# after a throttle the rate drops to this fraction, and it climbs back by this fraction of the quota with every success
+RATE_DECREASE_FACTOR = 0.5
+RATE_INCREASE_FRACTION = 0.05
+MIN_RATE_FRACTION = 0.1
+
+
+class TokenBucket:
+    """Hands out calls at a steady rate, allowing a burst up to its capacity.
+
+    A call that finds the bucket empty reserves the next token and waits for it, so concurrent callers are served in
+    the order they arrived.  The rate adapts: it drops when the service throttles anyway and climbs back to the quota
+    as calls succeed.
+    """
+
+    def __init__(
+        self,
+        transactions_per_second: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.max_rate = transactions_per_second
+        self.rate = transactions_per_second
+        self.capacity = max(1.0, transactions_per_second)
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.capacity
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Takes a token, waiting for one if needed, and returns how many seconds it waited."""
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            wait_seconds = max(0.0, -self._tokens / self.rate)
+
+        if wait_seconds > 0:
+            self.sleep(wait_seconds)
+        return wait_seconds
+
+    def throttled(self):
+        with self._lock:
+            self._refill()
+            self.rate = max(self.max_rate * MIN_RATE_FRACTION, self.rate * RATE_DECREASE_FACTOR)
+
+    def succeeded(self):
+        with self._lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.max_rate * RATE_INCREASE_FRACTION)
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+
+@singleton
+class TextractRateLimiter:
+    """A process-wide limiter with a separate budget for each Textract API.
+
+    The quota is shared by the whole account, so the budget of an API is set with `TEXTRACT_TPS_<API NAME>` (like
+    `TEXTRACT_TPS_ANALYZE_DOCUMENT`) to its quota divided by the number of Lambdas that call it at once.  A throttled
+    call, or one that failed with a transient error (a 5xx, or a connection that failed or timed out), is retried with
+    exponential backoff and full jitter, and the metrics keep how long calls waited for capacity.  Only throttles slow
+    the API's budget down.
+    """
+
+    def __init__(self):
+        self.max_attempts = int(os.environ.get("TEXTRACT_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS))
+        self.backoff_seconds = float(os.environ.get("TEXTRACT_BACKOFF_SECONDS", DEFAULT_BACKOFF_SECONDS))
+        self.clock: Callable[[], float] = time.monotonic
+        self.sleep: Callable[[float], None] = time.sleep
+        self._buckets: dict[str, TokenBucket] = {}
+        self._metrics: dict[str, dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def call(self, api_name: str, function: Callable[..., Any], **kwargs) -> Any:
+        bucket = self._bucket(api_name)
+        last_exception = None
+
+        for attempt in range(self.max_attempts):
+            if attempt > 0:
+                backoff_seconds = random.uniform(0, min(MAX_BACKOFF_SECONDS, self.backoff_seconds * 2 ** (attempt - 1)))
+                self._record(api_name, backoff_seconds=backoff_seconds)
+                self.sleep(backoff_seconds)
+
+            wait_seconds = bucket.acquire()
+            self._record(api_name, calls=1, wait_seconds=wait_seconds)
+
+            try:
+                response = function(**kwargs)
+            except Exception as e:
+                if is_throttling_error(e):
+                    logging.warning(f"Textract throttled {api_name} on attempt {attempt + 1}")
+                    self._record(api_name, throttles=1)
+                    bucket.throttled()
+                elif is_transient_error(e):
+                    logging.warning(f"Textract {api_name} failed on attempt {attempt + 1} with a transient error: {e}")
+                    self._record(api_name, transient_errors=1)
+                else:
+                    raise
+
+                last_exception = e
+                continue
+
+            bucket.succeeded()
+            return response
+
+        logging.error(f"Textract {api_name} was throttled or failed transiently {self.max_attempts} times in a row")
+        raise last_exception
+
+    def metrics(self) -> dict[str, dict[str, float]]:
+        """The calls, throttles, transient errors, and seconds spent waiting and backing off of each API so far."""
+        with self._lock:
+            return {api_name: dict(api_metrics) for api_name, api_metrics in self._metrics.items()}
+
+    def reset_metrics(self):
+        with self._lock:
+            self._metrics.clear()
+
+    def _bucket(self, api_name: str) -> TokenBucket:
+        with self._lock:
+            if api_name not in self._buckets:
+                transactions_per_second = float(
+                    os.environ.get(f"TEXTRACT_TPS_{api_name.upper()}", DEFAULT_TRANSACTIONS_PER_SECOND.get(api_name, 1))
+                )
+                self._buckets[api_name] = TokenBucket(transactions_per_second, self.clock, self.sleep)
+            return self._buckets[api_name]
+
+    def _record(self, api_name: str, **increments: float):
+        with self._lock:
+            api_metrics = self._metrics.setdefault(
+                api_name,
+                {"calls": 0, "throttles": 0, "transient_errors": 0, "wait_seconds": 0.0, "backoff_seconds": 0.0},
+            )
+            for name, increment in increments.items():
+                api_metrics[name] += increment
+
+
+def is_throttling_error(exception: Exception) -> bool:
+    """Whether the exception is a botocore `ClientError` (or anything shaped like one) for a throttled call."""
+    response = getattr(exception, "response", None)
+    if not isinstance(response, dict):
+        return False
+    return response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES
+
+
+def is_transient_error(exception: Exception) -> bool:
+    """Whether the exception is a 5xx error, or a connection that failed or timed out, which a retry can get past."""
+    response = getattr(exception, "response", None)
+    if isinstance(response, dict):
+        error_code = response.get("Error", {}).get("Code")
+        status_code = response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+        return error_code in TRANSIENT_ERROR_CODES or status_code >= 500
+
+    # botocore is only imported once a call failed, by which point boto3 already loaded it
+    from botocore.exceptions import ConnectionError, HTTPClientError
+
+    return isinstance(exception, ConnectionError | HTTPClientError)
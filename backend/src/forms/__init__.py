@@ -1,27 +1,12 @@
-import importlib
-import inspect
-import os
-import pkgutil
+import functools
 
 from src.forms.form import Form
+from src.forms.registry import FormRegistry
 
 
-def find_form_implementations() -> list[Form]:
-    implementations = []
+@functools.cache
+def form_registry() -> FormRegistry:
+    return FormRegistry.load()
 
-    # Iterate over all modules in the package
-    for _, module_name, _ in pkgutil.iter_modules([os.path.dirname(__file__)]):
-        # Import the module
-        module = importlib.import_module(f"{__name__}.{module_name}")
 
-        # Iterate over all classes in the module
-        for _, clazz in inspect.getmembers(module, inspect.isclass):
-            # Check if the class is a subclass of the base class and is not the base class itself
-            if issubclass(clazz, Form) and clazz is not Form:
-                instantiation = clazz()
-                implementations.append(instantiation)
-
-    return implementations
-
-
-supported_forms = find_form_implementations()
+__all__ = ["Form", "FormRegistry", "form_registry"]
@@ -0,0 +1,29 @@
+from src.forms.form import Form
+
+
+class DataForm(Form):
+    """A form defined entirely by data instead of by its own subclass of `Form`."""
+
+    def __init__(
+        self,
+        identifier: str,
+        form_matches: str | list[str],
+        queries: list[str],
+        query_pages: dict[str, list[str]] | None = None,
+    ):
+        self._identifier = identifier
+        self._form_matches = form_matches
+        self._queries = queries
+        self._query_pages = query_pages or {}
+
+    def identifier(self) -> str:
+        return self._identifier
+
+    def form_matches(self) -> str | list[str]:
+        return self._form_matches
+
+    def queries(self) -> list[str]:
+        return self._queries
+
+    def query_pages(self) -> dict[str, list[str]]:
+        return self._query_pages
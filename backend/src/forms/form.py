@@ -7,9 +7,17 @@ class Form(ABC):
         pass
 
     @abstractmethod
-    def form_matches(self) -> str:
+    def form_matches(self) -> str | list[str]:
+        """The text, or list of alternative texts, that identifies a document as this form."""
         pass
 
     @abstractmethod
     def queries(self) -> list[str]:
         pass
+
+    def query_pages(self) -> dict[str, list[str]]:
+        """The pages each query is asked on, like `["1"]`, `["2-3"]`, or `["4-*"]`.
+
+        Queries that aren't listed are asked on every page (`["*"]`).
+        """
+        return {}
@@ -0,0 +1,121 @@
+import re
+from collections import deque
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+_SEPARATORS = re.compile(r"[^0-9a-z]+")
+_LETTER_DIGIT_BOUNDARIES = re.compile(r"(?<=[a-z])(?=[0-9])|(?<=[0-9])(?=[a-z])")
+
+
+def normalize(text: str) -> str:
+    """Normalizes text so common OCR noise doesn't stop a pattern from matching.
+
+    Case is ignored, and hyphens, punctuation, and runs of whitespace all become a single space.  Letters and digits
+    are split apart so `W2`, `W-2`, and `w 2` all normalize to `w 2`.  The result is padded with a space on both sides
+    so patterns only match whole words.
+    """
+    text = _LETTER_DIGIT_BOUNDARIES.sub(" ", text.casefold())
+    words = _SEPARATORS.sub(" ", text).strip()
+    return f" {words} "
+
+
+@dataclass(frozen=True)
+class FormCandidate[T]:
+    form: T
+    score: int
+    first_line: int
+
+
+class FormMatcher[T]:
+    """Finds which forms a document's lines match, using an Aho-Corasick automaton built once from every pattern.
+
+    All the patterns are searched for in a single pass over each line.  Each line a form's pattern shows up in adds one
+    to that form's score, and the search stops as soon as a form's score reaches `decisive_score`.
+    """
+
+    def __init__(self, form_patterns: Iterable[tuple[T, str | list[str]]], decisive_score: int = 1):
+        self.decisive_score = decisive_score
+
+        self._forms: list[T] = []
+        # the automaton's states: the transitions out of each state, the state to fall back to when a character has no
+        # transition, and the forms whose pattern ends at each state
+        self._transitions: list[dict[str, int]] = [{}]
+        self._fallbacks: list[int] = [0]
+        self._outputs: list[set[int]] = [set()]
+
+        for form in form_patterns:
+            self._add_form(*form)
+
+        self._link_fallbacks()
+
+    def match(self, lines: Iterable[str]) -> list[FormCandidate[T]]:
+        """Returns the candidate forms, best first."""
+        scores: dict[int, int] = {}
+        first_lines: dict[int, int] = {}
+
+        for line_number, line in enumerate(lines):
+            for form_index in self._search(normalize(line)):
+                scores[form_index] = scores.get(form_index, 0) + 1
+                first_lines.setdefault(form_index, line_number)
+
+                if scores[form_index] >= self.decisive_score:
+                    return self._candidates(scores, first_lines)
+
+        return self._candidates(scores, first_lines)
+
+    def _add_form(self, form: T, patterns: str | list[str]):
+        form_index = len(self._forms)
+        self._forms.append(form)
+
+        if isinstance(patterns, str):
+            patterns = [patterns]
+
+        for pattern in patterns:
+            state = 0
+            for character in normalize(pattern):
+                next_state = self._transitions[state].get(character)
+                if next_state is None:
+                    next_state = len(self._transitions)
+                    self._transitions.append({})
+                    self._fallbacks.append(0)
+                    self._outputs.append(set())
+                    self._transitions[state][character] = next_state
+                state = next_state
+
+            self._outputs[state].add(form_index)
+
+    def _link_fallbacks(self):
+        queue = deque(self._transitions[0].values())
+
+        while queue:
+            state = queue.popleft()
+
+            for character, next_state in self._transitions[state].items():
+                queue.append(next_state)
+
+                fallback = self._fallbacks[state]
+                while fallback != 0 and character not in self._transitions[fallback]:
+                    fallback = self._fallbacks[fallback]
+                fallback = self._transitions[fallback].get(character, 0)
+                if fallback == next_state:
+                    fallback = 0
+
+                self._fallbacks[next_state] = fallback
+                self._outputs[next_state] |= self._outputs[fallback]
+
+    def _search(self, text: str) -> set[int]:
+        found = set()
+        state = 0
+
+        for character in text:
+            while state != 0 and character not in self._transitions[state]:
+                state = self._fallbacks[state]
+            state = self._transitions[state].get(character, 0)
+
+            found |= self._outputs[state]
+
+        return found
+
+    def _candidates(self, scores: dict[int, int], first_lines: dict[int, int]) -> list[FormCandidate[T]]:
+        ranked = sorted(scores, key=lambda form_index: (-scores[form_index], first_lines[form_index]))
+        return [FormCandidate(self._forms[index], scores[index], first_lines[index]) for index in ranked]
@@ -0,0 +1,117 @@
+import hashlib
+import importlib
+import inspect
+import json
+import pkgutil
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from src.forms.data_form import DataForm
+from src.forms.form import Form
+from src.forms.matcher import FormMatcher
+
+FORMS_FOLDER = Path(__file__).parent
+MANIFEST_FILE = FORMS_FOLDER.joinpath("manifest.json")
+DEFINITIONS_FOLDER = FORMS_FOLDER.joinpath("definitions")
+
+
+@dataclass(frozen=True)
+class FormEntry:
+    identifier: str
+    form_matches: str | list[str]
+    module: str | None = None
+    class_name: str | None = None
+    queries: list[str] | None = None
+    query_pages: dict[str, list[str]] | None = None
+
+    def to_dict(self) -> dict:
+        return {k: v for k, v in asdict(self).items() if v is not None}
+
+
+class FormRegistry:
+    """Knows every supported form by its identifier and match patterns, but only loads a form when it is asked for.
+
+    The entries come from a manifest that `build.py` generates, so a cold start reads one small JSON file instead of
+    importing and instantiating every form.  Without a manifest (e.g. while developing), the forms are discovered the
+    same way the build does.
+    """
+
+    def __init__(self, entries: list[FormEntry]):
+        self._entries = {entry.identifier: entry for entry in entries}
+        self._forms: dict[str, Form] = {}
+        self._matcher: FormMatcher[str] | None = None
+
+    @classmethod
+    def load(cls, manifest_file: Path = MANIFEST_FILE) -> "FormRegistry":
+        if not manifest_file.exists():
+            return cls.discover()
+
+        manifest = json.loads(manifest_file.read_text())
+        return cls([FormEntry(**entry) for entry in manifest["forms"]])
+
+    @classmethod
+    def discover(cls, package_name: str = __package__, definitions_folder: Path = DEFINITIONS_FOLDER) -> "FormRegistry":
+        """Finds every `Form` implementation in the package and every form defined in the definitions folder.
+
+        This imports every form module, so it is meant for build time.
+        """
+        entries = []
+
+        package = importlib.import_module(package_name)
+        for _, module_name, _ in pkgutil.iter_modules(package.__path__):
+            module = importlib.import_module(f"{package_name}.{module_name}")
+
+            for _, clazz in inspect.getmembers(module, inspect.isclass):
+                if not issubclass(clazz, Form) or inspect.isabstract(clazz) or clazz is DataForm:
+                    continue
+                if clazz.__module__ != module.__name__:
+                    # only count the class in the module that defines it, not everywhere it is imported
+                    continue
+
+                form = clazz()
+                entries.append(FormEntry(form.identifier(), form.form_matches(), clazz.__module__, clazz.__name__))
+
+        for definition_file in sorted(definitions_folder.glob("*.json")):
+            definition = json.loads(definition_file.read_text())
+            entries.append(
+                FormEntry(
+                    definition["identifier"],
+                    definition["form_matches"],
+                    queries=definition["queries"],
+                    query_pages=definition.get("query_pages"),
+                )
+            )
+
+        return cls(entries)
+
+    def write_manifest(self, manifest_file: Path = MANIFEST_FILE):
+        manifest = {"forms": [entry.to_dict() for entry in self._entries.values()]}
+        manifest_file.write_text(json.dumps(manifest, indent=2))
+
+    def version(self) -> str:
+        """Changes whenever a form is added or removed, or how a form is identified changes."""
+        matching = [[entry.identifier, entry.form_matches] for entry in self._entries.values()]
+        return hashlib.sha256(json.dumps(matching).encode()).hexdigest()[:16]
+
+    def identifiers(self) -> list[str]:
+        return list(self._entries)
+
+    def form(self, identifier: str) -> Form:
+        if identifier not in self._forms:
+            self._forms[identifier] = self._load_form(identifier)
+        return self._forms[identifier]
+
+    def matcher(self) -> FormMatcher[str]:
+        """A matcher that identifies forms by their identifier without loading them."""
+        if self._matcher is None:
+            self._matcher = FormMatcher((entry.identifier, entry.form_matches) for entry in self._entries.values())
+        return self._matcher
+
+    def _load_form(self, identifier: str) -> Form:
+        entry = self._entries[identifier]
+
+        if entry.module is None:
+            return DataForm(entry.identifier, entry.form_matches, entry.queries, entry.query_pages)
+
+        module = importlib.import_module(entry.module)
+        return getattr(module, entry.class_name)()
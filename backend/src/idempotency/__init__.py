@@ -0,0 +1,4 @@
+from .exception import IdempotencyException, RunInProgressException
+from .idempotency_ledger import IdempotencyLedger, RunStatus
+
+__all__ = ["IdempotencyException", "IdempotencyLedger", "RunInProgressException", "RunStatus"]
@@ -0,0 +1,8 @@
+class IdempotencyException(Exception):
+    pass
+
+
+class RunInProgressException(IdempotencyException):
+    """Another run holds the key, so this delivery has to be retried once that run is done or its claim expired."""
+
+    pass
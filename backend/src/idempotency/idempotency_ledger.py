@@ -0,0 +1,59 @@
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from enum import StrEnum
+
+from src.idempotency.exception import RunInProgressException
+
+
+class RunStatus(StrEnum):
+    """Where another run of a key is at, when a run can't claim it."""
+
+    IN_PROGRESS = "in_progress"
+    COMPLETE = "complete"
+
+
+class IdempotencyLedger(ABC):
+    """Records which runs of an operation started and finished, so a duplicate delivery doesn't run it again.
+
+    A run claims its key with `start` and finishes with `complete`, or gives the key up with `release` when it fails so
+    a retry can claim it.  A claim that is neither completed nor released expires, so a run that crashed is retried.
+    """
+
+    @abstractmethod
+    def start(self, key: str) -> str | RunStatus:
+        """Claims the key for a new run.
+
+        Returns a token that identifies the claim, or the status of the run that has the key in progress or completed
+        it.  Only a completed key is done, the delivery of one in progress has to be retried later, because that run
+        can still fail or crash.
+        """
+        pass
+
+    @abstractmethod
+    def complete(self, key: str, token: str):
+        pass
+
+    @abstractmethod
+    def release(self, key: str, token: str):
+        pass
+
+    def run_once(self, key: str, run: Callable[[], None]) -> bool:
+        """Runs `run` unless a run with the same key completed.
+
+        Returns whether it ran, and raises `RunInProgressException` if a run with the same key is in progress.
+        """
+        token = self.start(key)
+        if token is RunStatus.COMPLETE:
+            print(f"{key} is already done, skipping it")
+            return False
+        if token is RunStatus.IN_PROGRESS:
+            raise RunInProgressException(f"{key} is already in progress")
+
+        try:
+            run()
+        except Exception:
+            self.release(key, token)
+            raise
+
+        self.complete(key, token)
+        return True
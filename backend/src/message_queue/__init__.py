@@ -0,0 +1,5 @@
+from .claim_check import ClaimCheckMessageQueue
+from .exception import MessageQueueException
+from .message_queue import MessageQueue
+
+__all__ = ["ClaimCheckMessageQueue", "MessageQueue", "MessageQueueException"]
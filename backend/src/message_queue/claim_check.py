@@ -0,0 +1,65 @@
+import gzip
+import uuid
+
+from src import context
+from src.message_queue.message_queue import MessageQueue
+from src.storage import CloudStorage
+
+CLAIM_CHECK_FOLDER = "claim-check/"
+# SQS messages can be at most 256 KiB, this leaves room for the message attributes
+DEFAULT_THRESHOLD_BYTES = 192 * 1024
+
+_CLAIM_CHECK_PREFIX = '{"claim_check": "'
+_CLAIM_CHECK_SUFFIX = '"}'
+
+
+class ClaimCheckMessageQueue(MessageQueue):
+    """Sends messages that are too large for the queue through cloud storage instead.
+
+    A message larger than the threshold is compressed and stored, and the queue only gets a claim check pointing to
+    it, which `resolve` turns back into the message.  Smaller messages are sent as is.
+    """
+
+    def __init__(
+        self,
+        message_queue: MessageQueue,
+        cloud_storage: CloudStorage,
+        bucket_name: str,
+        threshold_bytes: int = DEFAULT_THRESHOLD_BYTES,
+    ):
+        self.message_queue = message_queue
+        self.cloud_storage = cloud_storage
+        self.bucket_name = bucket_name
+        self.threshold_bytes = threshold_bytes
+
+    def send_message(self, queue_url: str, message: str):
+        encoded_message = message.encode("utf-8")
+        if len(encoded_message) <= self.threshold_bytes:
+            self.message_queue.send_message(queue_url, message)
+            return
+
+        key = f"{CLAIM_CHECK_FOLDER}{uuid.uuid4()}.json.gz"
+        self.cloud_storage.put_object(
+            self.bucket_name, key, gzip.compress(encoded_message), {"content_encoding": "gzip"}
+        )
+        print(f"Message of {len(encoded_message)} bytes stored at {key}")
+
+        self.message_queue.send_message(queue_url, claim_check(f"s3://{self.bucket_name}/{key}"))
+
+
+def claim_check(remote_url: str) -> str:
+    return f"{_CLAIM_CHECK_PREFIX}{remote_url}{_CLAIM_CHECK_SUFFIX}"
+
+
+def is_claim_check(message: str) -> bool:
+    return message.startswith(_CLAIM_CHECK_PREFIX) and message.endswith(_CLAIM_CHECK_SUFFIX)
+
+
+@context.inject
+def resolve(message: str, cloud_storage: CloudStorage = None) -> str:
+    """Gets the message a claim check points to, or returns the message itself if it was sent as is."""
+    if not is_claim_check(message):
+        return message
+
+    remote_url = message[len(_CLAIM_CHECK_PREFIX) : -len(_CLAIM_CHECK_SUFFIX)]
+    return gzip.decompress(cloud_storage.get_file(remote_url)).decode("utf-8")
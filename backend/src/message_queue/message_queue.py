@@ -0,0 +1,7 @@
+from abc import ABC, abstractmethod
+
+
+class MessageQueue(ABC):
+    @abstractmethod
+    def send_message(self, queue_url: str, message: str):
+        pass
@@ -1,4 +1,5 @@
+from .classification_scope import ClassificationScope
 from .exception import OcrException
 from .ocr import Ocr
 
-__all__ = ["Ocr", "OcrException"]
+__all__ = ["ClassificationScope", "Ocr", "OcrException"]
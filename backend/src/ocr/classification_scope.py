@@ -0,0 +1,9 @@
+from enum import StrEnum
+
+
+class ClassificationScope(StrEnum):
+    """How much of a document's text is used to identify which form it is."""
+
+    DOCUMENT = "document"
+    FIRST_PAGE = "first_page"
+    HEADER = "header"
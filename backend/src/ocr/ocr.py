@@ -1,13 +1,66 @@
 from abc import ABC, abstractmethod
+from collections.abc import Collection
 
 from src.forms.form import Form
+from src.ocr.classification_scope import ClassificationScope
 
 
 class Ocr(ABC):
     @abstractmethod
-    def extract_raw_text(self, s3_url: str) -> list[str]:
+    def extract_raw_text(self, s3_url: str, scope: ClassificationScope = ClassificationScope.DOCUMENT) -> list[str]:
         pass
 
     @abstractmethod
-    def scan(self, s3_url: str, form: Form | None) -> dict[str, dict[str, str | float]]:
+    def extract_raw_text_and_forms(
+        self, s3_url: str, scope: ClassificationScope = ClassificationScope.DOCUMENT
+    ) -> tuple[list[str], dict[str, dict[str, str | float]]]:
+        """Gets the raw text and the generic key-value extraction of a document from a single OCR pass.
+
+        The key-value extraction is what `scan` returns when no form is identified.
+        """
+        pass
+
+    @abstractmethod
+    def scan(
+        self, s3_url: str, form: Form | None, skipped_queries: Collection[str] = ()
+    ) -> dict[str, dict[str, str | float]]:
+        """Extracts the data of the document, answering the form's queries except for the `skipped_queries`."""
+        pass
+
+    @abstractmethod
+    def start_scan(
+        self, s3_url: str, form: Form | None, job_tag: str, skipped_queries: Collection[str] = ()
+    ) -> list[str] | None:
+        """Starts a scan that notifies on completion instead of waiting for it.
+
+        Returns the IDs of the started jobs, or `None` if `scan` should be used instead, because this scan can't be
+        split or is quicker to do at once.
+        """
+        pass
+
+    @abstractmethod
+    def finish_scan(
+        self, job_ids: list[str], s3_url: str | None = None, form: Form | None = None
+    ) -> dict[str, dict[str, str | float]] | None:
+        """Collects the results of the jobs started by `start_scan`.
+
+        The document and form the jobs were started for are only needed to archive the raw results.  Returns `None` if
+        any of the jobs are still in progress.
+        """
+        pass
+
+    @abstractmethod
+    def query_configurations(self, form: Form) -> dict[str, str]:
+        """Identifies the OCR configuration each of the form's queries is answered with, by the query's text.
+
+        An answer can be reused as long as the configuration of its query stays the same.
+        """
+        pass
+
+    @abstractmethod
+    def configuration_version(self, form: Form | None) -> str:
+        """Identifies the OCR configuration `scan` uses for the form, like the versions of any trained adapters.
+
+        The version changes whenever a scan of the same document could give different results.
+        """
         pass
@@ -1,4 +1,4 @@
 from .cloud_storage import CloudStorage
-from .exception import CloudStorageException
+from .exception import CloudStorageException, CloudStorageFileTooLargeException
 
-__all__ = ["CloudStorage", "CloudStorageException"]
+__all__ = ["CloudStorage", "CloudStorageException", "CloudStorageFileTooLargeException"]
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
 
 
 class CloudStorage(ABC):
@@ -14,6 +15,57 @@ class CloudStorage(ABC):
     def get_file(self, remote_url: str) -> bytes:
         pass
 
+    @abstractmethod
+    def get_file_base64(self, remote_url: str, max_size: int | None = None) -> str:
+        """Base64 encodes the file while it is downloaded, so the whole file is never in memory unencoded.
+
+        Raises `CloudStorageFileTooLargeException` if the file is larger than `max_size` bytes.
+        """
+        pass
+
+    @abstractmethod
+    def content_hash(self, remote_url: str) -> str:
+        """The hex SHA-256 of the file's content.
+
+        Uses the hash stored with the file when it was uploaded, and otherwise reads the file to compute it.
+        """
+        pass
+
+    @abstractmethod
+    def object_version(self, remote_url: str) -> str:
+        """Identifies the current version of the file, which changes whenever the file is written again."""
+        pass
+
+    @abstractmethod
+    def content_type(self, remote_url: str) -> str | None:
+        """The file's media type, like `image/png`, or `None` if it's unknown."""
+        pass
+
+    @abstractmethod
+    def list_files(self, bucket_name: str, prefix: str) -> Iterator[str]:
+        """The remote URLs of every file whose key starts with the prefix, fetched a page at a time as they're read."""
+        pass
+
     @abstractmethod
     def put_object(self, bucket_name: str, key: str, body: bytes, metadata: dict[str, str]):
         pass
+
+    @abstractmethod
+    def upload_form(self, bucket_name: str, key: str, metadata: dict[str, str], max_size: int) -> dict:
+        """A URL and the form fields to upload a file directly to storage with a single POST."""
+        pass
+
+    @abstractmethod
+    def start_multipart_upload(self, bucket_name: str, key: str, metadata: dict[str, str]) -> str:
+        """Starts an upload of a file in parts and returns the ID of the upload."""
+        pass
+
+    @abstractmethod
+    def multipart_upload_part_urls(self, bucket_name: str, key: str, upload_id: str, part_count: int) -> list[str]:
+        """URLs to upload each part of a multipart upload directly to storage with a PUT, in part order."""
+        pass
+
+    @abstractmethod
+    def complete_multipart_upload(self, remote_url: str, upload_id: str, part_etags: list[str]):
+        """Puts the uploaded parts together into the file, using the ETag returned for each part in part order."""
+        pass
@@ -1,2 +1,6 @@
 class CloudStorageException(Exception):
     pass
+
+
+class CloudStorageFileTooLargeException(CloudStorageException):
+    pass
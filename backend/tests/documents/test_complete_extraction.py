@@ -0,0 +1,173 @@
+import json
+from unittest import mock
+
+import pytest
+
+from src import context
+from src.database.data.document_item import DocumentItem
+from src.database.database import Database
+from src.documents import complete_extraction
+from src.external.aws.textract import Textract
+from src.message_queue import MessageQueue
+from src.ocr import Ocr
+
+context = context.ApplicationContext()
+
+
+class LocalNotificationQueue:
+    """Stands in for the SNS topic and SQS queue that Textract completion notifications are delivered through."""
+
+    def __init__(self):
+        self.messages = []
+
+    def publish(self, job_id, status, job_tag):
+        textract_message = {"JobId": job_id, "Status": status, "API": "StartDocumentAnalysis", "JobTag": job_tag}
+        self.messages.append(json.dumps({"Type": "Notification", "Message": json.dumps(textract_message)}))
+
+    def receive(self):
+        while len(self.messages) > 0:
+            yield self.messages.pop(0)
+
+
+class FakeTextractClient:
+    def __init__(self, notification_queue, job_tag, job_answers):
+        self.notification_queue = notification_queue
+        self.job_tag = job_tag
+        self.job_answers = job_answers
+        self.job_statuses = {job_id: "IN_PROGRESS" for job_id in job_answers}
+
+    def complete(self, job_id, status="SUCCEEDED"):
+        self.job_statuses[job_id] = status
+        self.notification_queue.publish(job_id, status, self.job_tag)
+
+    def get_document_analysis(self, JobId):
+        query, answer = self.job_answers[JobId]
+        blocks = [
+            {"BlockType": "QUERY", "Id": f"{JobId}-q", "Query": {"Text": query}},
+            {"BlockType": "QUERY_RESULT", "Id": f"{JobId}-a", "Text": answer, "Confidence": 99.0},
+        ]
+        blocks[0]["Relationships"] = [{"Type": "ANSWER", "Ids": [f"{JobId}-a"]}]
+        return {"JobStatus": self.job_statuses[JobId], "Blocks": blocks}
+
+
+def setup_function():
+    context.reset()
+
+
+def setup_pipeline(document_id, job_answers):
+    notification_queue = LocalNotificationQueue()
+    fake_textract_client = FakeTextractClient(notification_queue, document_id, job_answers)
+
+    with mock.patch("src.external.aws.clients.client", return_value=fake_textract_client):
+        context.register(Ocr, Textract())
+
+    mock_database = mock.MagicMock()
+    mock_database.get_document.return_value = DocumentItem(
+        document_id, f"s3://bucket/input/{document_id}.jpg", document_type="W2", ocr_job_ids=list(job_answers)
+    )
+    context.register(Database, mock_database)
+
+    mock_queue = mock.MagicMock()
+    context.register(MessageQueue, mock_queue)
+
+    return notification_queue, fake_textract_client, mock_queue
+
+
+def deliver_notifications(notification_queue):
+    for message in notification_queue.receive():
+        job_id, job_status, job_tag = Textract.parse_completion_notification(message)
+        complete_extraction.complete_extraction(job_id, job_status, job_tag, "https://asdf/queue/url")
+
+
+def test_complete_extraction_waits_for_every_job():
+    document_id = "DogCow"
+    notification_queue, fake_textract_client, mock_queue = setup_pipeline(
+        document_id, {"job-1": ("Who?", "Clarus"), "job-2": ("Says?", "Moof!")}
+    )
+
+    fake_textract_client.complete("job-2")
+    deliver_notifications(notification_queue)
+
+    mock_queue.send_message.assert_not_called()
+
+    fake_textract_client.complete("job-1")
+    deliver_notifications(notification_queue)
+
+    mock_queue.send_message.assert_called_once()
+    args, kwargs = mock_queue.send_message.call_args
+    message = json.loads(args[1])
+    assert message["document_url"] == f"s3://bucket/input/{document_id}.jpg"
+    assert message["document_type"] == "W2"
+    assert message["extracted_data"] == {
+        "Who?": {"value": "Clarus", "confidence": 99.0},
+        "Says?": {"value": "Moof!", "confidence": 99.0},
+    }
+
+
+def test_complete_extraction_ignores_jobs_of_a_completed_document():
+    notification_queue, fake_textract_client, mock_queue = setup_pipeline("DogCow", {"job-1": ("Who?", "Clarus")})
+    context.implementation(Database).get_document.return_value.status = "complete"
+
+    notification_queue.publish("some-other-job", "SUCCEEDED", "DogCow")
+    deliver_notifications(notification_queue)
+
+    mock_queue.send_message.assert_not_called()
+
+
+def test_complete_extraction_of_a_job_that_is_not_recorded_yet_is_delivered_again():
+    notification_queue, fake_textract_client, mock_queue = setup_pipeline("DogCow", {"job-1": ("Who?", "Clarus")})
+    document_item = context.implementation(Database).get_document.return_value
+    document_item.ocr_job_ids = None
+
+    fake_textract_client.complete("job-1")
+    message = notification_queue.messages[0]
+    with pytest.raises(complete_extraction.OcrJobNotRecordedException):
+        deliver_notifications(notification_queue)
+
+    # the jobs are recorded by the time the notification is delivered again
+    document_item.ocr_job_ids = ["job-1"]
+    notification_queue.messages.append(message)
+    deliver_notifications(notification_queue)
+
+    mock_queue.send_message.assert_called_once()
+
+
+def test_complete_extraction_failed_job_marks_the_document_as_failed():
+    notification_queue, fake_textract_client, mock_queue = setup_pipeline(
+        "DogCow", {"job-1": ("Who?", "Clarus"), "job-2": ("Says?", "Moof!")}
+    )
+    mock_database = context.implementation(Database)
+
+    fake_textract_client.complete("job-1", "FAILED")
+    deliver_notifications(notification_queue)
+
+    mock_queue.send_message.assert_not_called()
+    failed_document = mock_database.write_document.call_args.args[0]
+    assert failed_document.document_id == "DogCow"
+    assert failed_document.status == "failed"
+    assert failed_document.ocr_job_ids is None
+
+    # the other job of the document finishing is ignored
+    mock_database.get_document.return_value = failed_document
+    fake_textract_client.complete("job-2")
+    deliver_notifications(notification_queue)
+
+    mock_queue.send_message.assert_not_called()
+
+
+def test_complete_extraction_merges_the_answers_reused_when_the_jobs_started():
+    document_id = "DogCow"
+    notification_queue, fake_textract_client, mock_queue = setup_pipeline(document_id, {"job-1": ("Says?", "Moof!")})
+    document_item = context.implementation(Database).get_document.return_value
+    document_item.extracted_data = {"Who?": {"value": "Clarus", "confidence": 90.0}}
+    document_item.answered_queries = {"Who?": "none", "Says?": "none"}
+
+    fake_textract_client.complete("job-1")
+    deliver_notifications(notification_queue)
+
+    message = json.loads(mock_queue.send_message.call_args.args[1])
+    assert message["extracted_data"] == {
+        "Who?": {"value": "Clarus", "confidence": 90.0},
+        "Says?": {"value": "Moof!", "confidence": 99.0},
+    }
+    assert message["answered_queries"] == {"Who?": "none", "Says?": "none"}
@@ -0,0 +1,87 @@
+from unittest import mock
+
+from src.database.data.document_item import DocumentItem
+from src.documents.document_cache import DocumentCache
+
+document_cache = DocumentCache()
+
+now = 0.0
+
+
+def setup_function():
+    global now
+    now = 0.0
+    document_cache.invalidate()
+    document_cache.max_size = 2
+    document_cache.ttl_seconds = 60
+    document_cache.clock = lambda: now
+
+
+def teardown_function():
+    document_cache.invalidate()
+    document_cache.max_size = 0
+
+
+def complete_document(document_id):
+    return DocumentItem(document_id, f"s3://bucket/input/{document_id}.jpg", status="complete")
+
+
+def test_get_loads_a_completed_document_once_within_the_ttl():
+    load = mock.MagicMock(side_effect=complete_document)
+
+    assert document_cache.get("DogCow", load) == complete_document("DogCow")
+    assert document_cache.get("DogCow", load) == complete_document("DogCow")
+
+    load.assert_called_once_with("DogCow")
+
+
+def test_get_does_not_cache_documents_that_are_processing():
+    load = mock.MagicMock(return_value=DocumentItem("DogCow", status="processing"))
+
+    document_cache.get("DogCow", load)
+    document_cache.get("DogCow", load)
+
+    assert load.call_count == 2
+
+
+def test_get_does_not_cache_missing_documents():
+    load = mock.MagicMock(return_value=None)
+
+    assert document_cache.get("DogCow", load) is None
+    assert document_cache.get("DogCow", load) is None
+
+    assert load.call_count == 2
+
+
+def test_get_loads_again_after_the_ttl():
+    global now
+    load = mock.MagicMock(side_effect=complete_document)
+    document_cache.get("DogCow", load)
+
+    now = 61.0
+    document_cache.get("DogCow", load)
+
+    assert load.call_count == 2
+
+
+def test_least_recently_used_document_is_evicted():
+    load = mock.MagicMock(side_effect=complete_document)
+    document_cache.get("DogCow", load)
+    document_cache.get("Clarus", load)
+    document_cache.get("DogCow", load)
+
+    document_cache.get("Moof", load)
+    document_cache.get("DogCow", load)
+    document_cache.get("Clarus", load)
+
+    assert [call.args[0] for call in load.call_args_list] == ["DogCow", "Clarus", "Moof", "Clarus"]
+
+
+def test_cache_is_off_without_a_size():
+    document_cache.max_size = 0
+    load = mock.MagicMock(side_effect=complete_document)
+
+    document_cache.get("DogCow", load)
+    document_cache.get("DogCow", load)
+
+    assert load.call_count == 2
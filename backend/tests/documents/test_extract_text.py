@@ -1,11 +1,16 @@
+import json
 from unittest import mock
 
 import pytest
-from types_boto3_sqs import SQSClient
 
 from src import context
+from src.database.data.document_item import DocumentItem
+from src.database.database import Database
 from src.documents import extract_text
-from src.ocr import Ocr
+from src.forms.w2 import W2
+from src.idempotency import IdempotencyLedger, RunInProgressException, RunStatus
+from src.message_queue import MessageQueue
+from src.ocr import ClassificationScope, Ocr, OcrException
 from src.storage import CloudStorage
 
 context = context.ApplicationContext()
@@ -15,6 +20,14 @@ def setup_function():
     context.reset()
 
 
+def configured_without_adapters(form):
+    return {query: "none" for query in form.queries()}
+
+
+def answered_without_adapters(form, content_version="version-1"):
+    return {query: f"none@{content_version}" for query in form.queries()}
+
+
 def test_extract_text_bad_file():
     mock_cloud_storage = mock.MagicMock()
     mock_cloud_storage.file_exists_and_allowed_to_access.return_value = False
@@ -40,10 +53,321 @@ def test_extract_text_with_no_form_identified():
     context.register(Ocr, mock_ocr)
 
     mock_queue = mock.MagicMock()
-    context.register(SQSClient, mock_queue)
+    context.register(MessageQueue, mock_queue)
 
     extract_text.extract_text("httpssss://a_sweet/file/location.txt", "https://asdf/queue/url")
 
-    mock_ocr.scan.assert_called_with(mock.ANY, None)
+    mock_ocr.scan.assert_called_with(mock.ANY, None, mock.ANY)
+    args, kwargs = mock_queue.send_message.call_args
+    assert """"document_type": null""" in args[1]
+
+
+def test_extract_text_hands_off_to_completion_handler_when_jobs_are_started():
+    mock_cloud_storage = mock.MagicMock()
+    mock_cloud_storage.file_exists_and_allowed_to_access.return_value = True
+    mock_cloud_storage.object_version.return_value = "version-1"
+    context.register(CloudStorage, mock_cloud_storage)
+
+    mock_ocr = mock.MagicMock()
+    mock_ocr.extract_raw_text.return_value = ["Form W-2 Wage and Tax Statement"]
+    mock_ocr.start_scan.return_value = ["job-1", "job-2"]
+    mock_ocr.query_configurations.side_effect = configured_without_adapters
+    context.register(Ocr, mock_ocr)
+
+    mock_database = mock.MagicMock()
+    context.register(Database, mock_database)
+
+    mock_queue = mock.MagicMock()
+    context.register(MessageQueue, mock_queue)
+
+    extract_text.extract_text("s3://bucket/input/DogCow.jpg", "https://asdf/queue/url")
+
+    mock_ocr.scan.assert_not_called()
+    mock_queue.send_message.assert_not_called()
+    mock_database.write_document.assert_called_with(
+        DocumentItem(
+            "DogCow",
+            "s3://bucket/input/DogCow.jpg",
+            "processing",
+            "W2",
+            ocr_job_ids=["job-1", "job-2"],
+            answered_queries=answered_without_adapters(W2()),
+        )
+    )
+
+
+def test_extract_text_single_pass_reuses_the_forms_analysis_when_no_form_is_identified():
+    mock_cloud_storage = mock.MagicMock()
+    mock_cloud_storage.file_exists_and_allowed_to_access.return_value = True
+    context.register(CloudStorage, mock_cloud_storage)
+
+    expected_extracted_data = {"example key": {"value": "example value", "confidence": 1.0}}
+    mock_ocr = mock.MagicMock()
+    mock_ocr.extract_raw_text_and_forms.return_value = (["nothing", "identifying"], expected_extracted_data)
+    context.register(Ocr, mock_ocr)
+
+    mock_queue = mock.MagicMock()
+    context.register(MessageQueue, mock_queue)
+
+    extract_text.extract_text(
+        "s3://bucket/input/DogCow.jpg", "https://asdf/queue/url", ClassificationScope.FIRST_PAGE, True
+    )
+
+    mock_ocr.extract_raw_text_and_forms.assert_called_with(
+        "s3://bucket/input/DogCow.jpg", ClassificationScope.FIRST_PAGE
+    )
+    mock_ocr.extract_raw_text.assert_not_called()
+    mock_ocr.scan.assert_not_called()
+    args, kwargs = mock_queue.send_message.call_args
+    assert json.loads(args[1])["extracted_data"] == expected_extracted_data
+
+
+def test_extract_text_single_pass_still_scans_forms_with_queries():
+    mock_cloud_storage = mock.MagicMock()
+    mock_cloud_storage.file_exists_and_allowed_to_access.return_value = True
+    mock_cloud_storage.object_version.return_value = "version-1"
+    context.register(CloudStorage, mock_cloud_storage)
+
+    mock_ocr = mock.MagicMock()
+    mock_ocr.extract_raw_text_and_forms.return_value = (["Form W-2 Wage and Tax Statement"], {})
+    mock_ocr.start_scan.return_value = None
+    mock_ocr.query_configurations.side_effect = configured_without_adapters
+    mock_ocr.scan.return_value = {"1 Wages, tips, and other compensation": {"value": "1", "confidence": 1.0}}
+    context.register(Ocr, mock_ocr)
+
+    mock_queue = mock.MagicMock()
+    context.register(MessageQueue, mock_queue)
+
+    extract_text.extract_text("s3://bucket/input/DogCow.jpg", "https://asdf/queue/url", single_pass_forms=True)
+
+    mock_ocr.scan.assert_called_once()
     args, kwargs = mock_queue.send_message.call_args
-    assert """"document_type": null""" in kwargs["MessageBody"]
+    assert json.loads(args[1])["document_type"] == "W2"
+
+
+def test_extract_text_again_only_asks_new_or_changed_queries():
+    mock_cloud_storage = mock.MagicMock()
+    mock_cloud_storage.file_exists_and_allowed_to_access.return_value = True
+    mock_cloud_storage.object_version.return_value = "version-1"
+    context.register(CloudStorage, mock_cloud_storage)
+
+    queries = W2().queries()
+    mock_ocr = mock.MagicMock()
+    mock_ocr.extract_raw_text.return_value = ["Form W-2 Wage and Tax Statement"]
+    mock_ocr.start_scan.return_value = None
+    mock_ocr.query_configurations.side_effect = configured_without_adapters
+    mock_ocr.scan.return_value = {queries[1]: {"value": "new", "confidence": 99.0}}
+    context.register(Ocr, mock_ocr)
+
+    # the second query was answered with an adapter that's no longer used, and the last query is new
+    mock_database = mock.MagicMock()
+    mock_database.get_document.return_value = DocumentItem(
+        document_type="W2",
+        extracted_data={query: {"value": "old", "confidence": 90.0} for query in [*queries[:-1], "Removed query"]},
+        answered_queries={**answered_without_adapters(W2()), queries[1]: "adapter:1@version-1", queries[-1]: None},
+    )
+    context.register(Database, mock_database)
+
+    mock_queue = mock.MagicMock()
+    context.register(MessageQueue, mock_queue)
+
+    extract_text.extract_text("s3://bucket/input/DogCow.jpg", "https://asdf/queue/url")
+
+    skipped_queries = mock_ocr.scan.call_args.args[2]
+    assert set(skipped_queries) == set(queries) - {queries[1], queries[-1]}
+    message = json.loads(mock_queue.send_message.call_args.args[1])
+    assert set(message["extracted_data"]) == set(queries) - {queries[-1]}
+    assert message["extracted_data"][queries[0]]["value"] == "old"
+    assert message["extracted_data"][queries[1]]["value"] == "new"
+    assert message["answered_queries"] == answered_without_adapters(W2())
+
+
+def test_extract_text_again_without_changes_skips_ocr():
+    mock_cloud_storage = mock.MagicMock()
+    mock_cloud_storage.file_exists_and_allowed_to_access.return_value = True
+    mock_cloud_storage.object_version.return_value = "version-1"
+    context.register(CloudStorage, mock_cloud_storage)
+
+    mock_ocr = mock.MagicMock()
+    mock_ocr.extract_raw_text.return_value = ["Form W-2 Wage and Tax Statement"]
+    mock_ocr.query_configurations.side_effect = configured_without_adapters
+    context.register(Ocr, mock_ocr)
+
+    extracted_data = {query: {"value": "old", "confidence": 90.0} for query in W2().queries()}
+    mock_database = mock.MagicMock()
+    mock_database.get_document.return_value = DocumentItem(
+        document_type="W2", extracted_data=extracted_data, answered_queries=answered_without_adapters(W2())
+    )
+    context.register(Database, mock_database)
+
+    mock_queue = mock.MagicMock()
+    context.register(MessageQueue, mock_queue)
+
+    extract_text.extract_text("s3://bucket/input/DogCow.jpg", "https://asdf/queue/url")
+
+    mock_ocr.scan.assert_not_called()
+    mock_ocr.start_scan.assert_not_called()
+    assert json.loads(mock_queue.send_message.call_args.args[1])["extracted_data"] == extracted_data
+
+
+class InMemoryIdempotencyLedger(IdempotencyLedger):
+    def __init__(self):
+        self.claims = {}
+
+    def start(self, key):
+        if key in self.claims:
+            return self.claims[key]
+        self.claims[key] = RunStatus.IN_PROGRESS
+        return "token"
+
+    def complete(self, key, token):
+        self.claims[key] = RunStatus.COMPLETE
+
+    def release(self, key, token):
+        del self.claims[key]
+
+
+def test_extract_text_skips_duplicate_notifications_of_a_version():
+    mock_cloud_storage = mock.MagicMock()
+    mock_cloud_storage.file_exists_and_allowed_to_access.return_value = True
+    mock_cloud_storage.object_version.side_effect = ["version-1", "version-1", "version-2"]
+    context.register(CloudStorage, mock_cloud_storage)
+
+    mock_ocr = mock.MagicMock()
+    mock_ocr.extract_raw_text.return_value = ["nothing", "identifying"]
+    mock_ocr.scan.return_value = {}
+    context.register(Ocr, mock_ocr)
+
+    mock_queue = mock.MagicMock()
+    context.register(MessageQueue, mock_queue)
+    context.register(IdempotencyLedger, InMemoryIdempotencyLedger())
+
+    for _ in range(3):
+        extract_text.extract_text("s3://bucket/input/DogCow.jpg", "https://asdf/queue/url")
+
+    assert mock_ocr.scan.call_count == 2
+    versions = [json.loads(args[1])["document_version"] for args, _ in mock_queue.send_message.call_args_list]
+    assert versions == ["version-1", "version-2"]
+
+
+def test_extract_text_failure_lets_the_notification_be_retried():
+    mock_cloud_storage = mock.MagicMock()
+    mock_cloud_storage.file_exists_and_allowed_to_access.return_value = True
+    mock_cloud_storage.object_version.return_value = "version-1"
+    context.register(CloudStorage, mock_cloud_storage)
+
+    mock_ocr = mock.MagicMock()
+    mock_ocr.extract_raw_text.side_effect = [OcrException("throttled"), ["nothing", "identifying"]]
+    mock_ocr.scan.return_value = {}
+    context.register(Ocr, mock_ocr)
+
+    mock_queue = mock.MagicMock()
+    context.register(MessageQueue, mock_queue)
+    context.register(IdempotencyLedger, InMemoryIdempotencyLedger())
+
+    with pytest.raises(OcrException):
+        extract_text.extract_text("s3://bucket/input/DogCow.jpg", "https://asdf/queue/url")
+    extract_text.extract_text("s3://bucket/input/DogCow.jpg", "https://asdf/queue/url")
+
+    mock_queue.send_message.assert_called_once()
+
+
+def test_identify_form_uses_the_first_matching_line():
+    identified_form = extract_text.identify_form(["DD FORM 214", "Attach Form W-2 here"])
+
+    assert identified_form.identifier() == "DD214"
+
+
+def test_extract_text_does_not_reuse_answers_read_from_other_content():
+    mock_cloud_storage = mock.MagicMock()
+    mock_cloud_storage.file_exists_and_allowed_to_access.return_value = True
+    mock_cloud_storage.object_version.return_value = "version-2"
+    context.register(CloudStorage, mock_cloud_storage)
+
+    mock_ocr = mock.MagicMock()
+    mock_ocr.extract_raw_text.return_value = ["Form W-2 Wage and Tax Statement"]
+    mock_ocr.start_scan.return_value = None
+    mock_ocr.query_configurations.side_effect = configured_without_adapters
+    mock_ocr.scan.return_value = {}
+    context.register(Ocr, mock_ocr)
+
+    mock_database = mock.MagicMock()
+    mock_database.get_document.return_value = DocumentItem(
+        document_type="W2",
+        extracted_data={query: {"value": "old", "confidence": 90.0} for query in W2().queries()},
+        answered_queries=answered_without_adapters(W2(), "version-1"),
+    )
+    context.register(Database, mock_database)
+    context.register(MessageQueue, mock.MagicMock())
+
+    extract_text.extract_text("s3://bucket/input/DogCow.jpg", "https://asdf/queue/url")
+
+    assert list(mock_ocr.scan.call_args.args[2]) == []
+
+
+def test_extract_text_of_a_version_another_run_is_extracting_fails_to_be_retried():
+    mock_cloud_storage = mock.MagicMock()
+    mock_cloud_storage.file_exists_and_allowed_to_access.return_value = True
+    mock_cloud_storage.object_version.return_value = "version-1"
+    context.register(CloudStorage, mock_cloud_storage)
+
+    mock_ocr = mock.MagicMock()
+    context.register(Ocr, mock_ocr)
+    mock_queue = mock.MagicMock()
+    context.register(MessageQueue, mock_queue)
+    ledger = InMemoryIdempotencyLedger()
+    ledger.start("extract_text:s3://bucket/input/DogCow.jpg:version-1")
+    context.register(IdempotencyLedger, ledger)
+
+    with pytest.raises(RunInProgressException):
+        extract_text.extract_text("s3://bucket/input/DogCow.jpg", "https://asdf/queue/url")
+
+    mock_ocr.extract_raw_text.assert_not_called()
+    mock_queue.send_message.assert_not_called()
+
+
+def test_reextract_text_asks_the_changed_queries_of_a_version_extracted_before():
+    mock_cloud_storage = mock.MagicMock()
+    mock_cloud_storage.file_exists_and_allowed_to_access.return_value = True
+    mock_cloud_storage.object_version.return_value = "version-1"
+    context.register(CloudStorage, mock_cloud_storage)
+
+    queries = W2().queries()
+    mock_ocr = mock.MagicMock()
+    mock_ocr.extract_raw_text.return_value = ["Form W-2 Wage and Tax Statement"]
+    mock_ocr.start_scan.return_value = None
+    mock_ocr.query_configurations.side_effect = configured_without_adapters
+    mock_ocr.scan.side_effect = lambda s3_url, form, skipped_queries: {
+        query: {"value": "Moof!", "confidence": 99.0} for query in form.queries() if query not in skipped_queries
+    }
+    context.register(Ocr, mock_ocr)
+
+    mock_database = mock.MagicMock()
+    mock_database.get_document.return_value = None
+    context.register(Database, mock_database)
+    mock_queue = mock.MagicMock()
+    context.register(MessageQueue, mock_queue)
+    context.register(IdempotencyLedger, InMemoryIdempotencyLedger())
+
+    extract_text.extract_text("s3://bucket/input/DogCow.jpg", "https://asdf/queue/url")
+    extracted = json.loads(mock_queue.send_message.call_args.args[1])
+    mock_database.get_document.return_value = DocumentItem(
+        document_type="W2", extracted_data=extracted["extracted_data"], answered_queries=extracted["answered_queries"]
+    )
+
+    # the second query is now answered with an adapter
+    mock_ocr.query_configurations.side_effect = lambda form: {
+        **configured_without_adapters(form),
+        queries[1]: "adapter:1",
+    }
+    extract_text.extract_text("s3://bucket/input/DogCow.jpg", "https://asdf/queue/url")
+    assert mock_ocr.scan.call_count == 1
+
+    extract_text.extract_text("s3://bucket/input/DogCow.jpg", "https://asdf/queue/url", reextract=True)
+
+    assert mock_ocr.scan.call_count == 2
+    assert set(mock_ocr.scan.call_args.args[2]) == set(queries) - {queries[1]}
+    message = json.loads(mock_queue.send_message.call_args.args[1])
+    assert set(message["extracted_data"]) == set(queries)
+    assert message["answered_queries"][queries[1]] == "adapter:1@version-1"
+    assert message["document_version"] == "version-1"
@@ -0,0 +1,162 @@
+import json
+from unittest import mock
+
+from src import context
+from src.database.data.document_item import DocumentItem
+from src.database.database import Database
+from src.documents import complete_extraction, extract_text
+from src.documents.extraction_cache import ExtractionCache
+from src.forms.data_form import DataForm
+from src.forms.w2 import W2
+from src.message_queue import MessageQueue
+from src.ocr import ClassificationScope, Ocr
+from src.storage import CloudStorage, CloudStorageException
+
+context = context.ApplicationContext()
+
+
+def setup_function():
+    context.reset()
+
+
+def in_memory_cloud_storage(content_hash="identical-content"):
+    files = {}
+
+    def get_file(remote_url):
+        if remote_url not in files:
+            raise CloudStorageException(f"Failed to get the file at {remote_url}")
+        return files[remote_url]
+
+    def put_object(bucket_name, key, body, metadata):
+        files[f"s3://{bucket_name}/{key}"] = body
+
+    mock_cloud_storage = mock.MagicMock()
+    mock_cloud_storage.file_exists_and_allowed_to_access.return_value = True
+    mock_cloud_storage.content_hash.return_value = content_hash
+    mock_cloud_storage.object_version.return_value = "version-1"
+    mock_cloud_storage.get_file.side_effect = get_file
+    mock_cloud_storage.put_object.side_effect = put_object
+    return mock_cloud_storage
+
+
+def setup_extraction(configuration_version="adapter:1"):
+    mock_cloud_storage = in_memory_cloud_storage()
+    context.register(CloudStorage, mock_cloud_storage)
+    context.register(ExtractionCache, ExtractionCache(mock_cloud_storage, "bucket"))
+
+    mock_ocr = mock.MagicMock()
+    mock_ocr.extract_raw_text.return_value = ["Form W-2 Wage and Tax Statement"]
+    mock_ocr.start_scan.return_value = None
+    mock_ocr.scan.return_value = {"Employee name": {"value": "DogCow", "confidence": 99.0}}
+    mock_ocr.configuration_version.return_value = configuration_version
+    mock_ocr.query_configurations.side_effect = lambda form: {query: configuration_version for query in form.queries()}
+    context.register(Ocr, mock_ocr)
+
+    mock_queue = mock.MagicMock()
+    context.register(MessageQueue, mock_queue)
+
+    return mock_ocr, mock_queue
+
+
+def test_identical_document_skips_ocr():
+    mock_ocr, mock_queue = setup_extraction()
+
+    extract_text.extract_text("s3://bucket/input/first.jpg", "https://asdf/queue/url")
+    mock_ocr.reset_mock()
+    extract_text.extract_text("s3://bucket/input/second.jpg", "https://asdf/queue/url")
+
+    mock_ocr.extract_raw_text.assert_not_called()
+    mock_ocr.scan.assert_not_called()
+    message = json.loads(mock_queue.send_message.call_args[0][1])
+    assert message == {
+        "document_url": "s3://bucket/input/second.jpg",
+        "extracted_data": {"Employee name": {"value": "DogCow", "confidence": 99.0}},
+        "document_type": "W2",
+        "document_version": None,
+        "answered_queries": {query: "adapter:1@version-1" for query in W2().queries()},
+    }
+
+
+def test_new_adapter_version_scans_again_without_classifying_again():
+    mock_ocr, _ = setup_extraction()
+    extract_text.extract_text("s3://bucket/input/first.jpg", "https://asdf/queue/url")
+
+    mock_ocr.reset_mock()
+    mock_ocr.configuration_version.return_value = "adapter:2"
+    extract_text.extract_text("s3://bucket/input/second.jpg", "https://asdf/queue/url")
+
+    mock_ocr.extract_raw_text.assert_not_called()
+    mock_ocr.scan.assert_called_once()
+
+
+def test_different_classification_scope_classifies_again():
+    mock_ocr, _ = setup_extraction()
+    extract_text.extract_text("s3://bucket/input/first.jpg", "https://asdf/queue/url")
+
+    mock_ocr.reset_mock()
+    extract_text.extract_text("s3://bucket/input/second.jpg", "https://asdf/queue/url", ClassificationScope.HEADER)
+
+    mock_ocr.extract_raw_text.assert_called_once()
+
+
+def test_result_key_changes_with_the_queries():
+    mock_ocr = mock.MagicMock()
+    mock_ocr.configuration_version.return_value = "adapter:1"
+    extraction_cache = ExtractionCache(mock.MagicMock(), "bucket")
+
+    form = DataForm("DogCow", "DogCow Form", ["What does the DogCow say?"])
+    changed_form = DataForm("DogCow", "DogCow Form", ["Moof?"])
+
+    key = extraction_cache.result_key("hash", form, mock_ocr)
+    changed_key = extraction_cache.result_key("hash", changed_form, mock_ocr)
+
+    assert key.startswith("extraction-cache/hash/DogCow/")
+    assert key != changed_key
+
+
+def test_completed_ocr_jobs_are_stored_for_identical_documents():
+    mock_ocr, _ = setup_extraction()
+    mock_ocr.start_scan.return_value = ["job-1"]
+    mock_database = mock.MagicMock()
+    context.register(Database, mock_database)
+
+    extract_text.extract_text("s3://bucket/input/first.jpg", "https://asdf/queue/url")
+
+    recorded_document = mock_database.write_document.call_args[0][0]
+    assert recorded_document.extraction_cache_key is not None
+
+    mock_ocr.finish_scan.return_value = {"Employee name": {"value": "DogCow", "confidence": 99.0}}
+    mock_database.get_document.return_value = DocumentItem(
+        "first",
+        "s3://bucket/input/first.jpg",
+        document_type="W2",
+        ocr_job_ids=["job-1"],
+        extraction_cache_key=recorded_document.extraction_cache_key,
+    )
+    complete_extraction.complete_extraction("job-1", "SUCCEEDED", "first", "https://asdf/queue/url")
+
+    mock_ocr.reset_mock()
+    extract_text.extract_text("s3://bucket/input/second.jpg", "https://asdf/queue/url")
+
+    mock_ocr.start_scan.assert_not_called()
+    mock_ocr.scan.assert_not_called()
+
+
+def test_reused_answers_are_not_cached():
+    mock_ocr, _ = setup_extraction()
+    queries = W2().queries()
+    mock_database = mock.MagicMock()
+    mock_database.get_document.return_value = DocumentItem(
+        document_type="W2",
+        extracted_data={queries[0]: {"value": "Edited by hand", "confidence": 100.0}},
+        answered_queries={queries[0]: "adapter:1@version-1"},
+    )
+    context.register(Database, mock_database)
+
+    extract_text.extract_text("s3://bucket/input/first.jpg", "https://asdf/queue/url")
+    context.register(Database, mock.MagicMock())
+    mock_ocr.reset_mock()
+    extract_text.extract_text("s3://bucket/input/second.jpg", "https://asdf/queue/url")
+
+    # the identical document is scanned itself instead of getting the first document's hand edits
+    mock_ocr.scan.assert_called_once()
@@ -1,3 +1,4 @@
+import threading
 from unittest import mock
 
 import pytest
@@ -7,13 +8,15 @@ from src.database.data.document_item import DocumentItem
 from src.database.database import Database
 from src.database.exception import DatabaseException
 from src.documents import get_document
-from src.storage import CloudStorage, CloudStorageException
+from src.documents.document_cache import DocumentCache
+from src.storage import CloudStorage, CloudStorageException, CloudStorageFileTooLargeException
 
 context = context.ApplicationContext()
 
 
 def setup_function():
     context.reset()
+    DocumentCache().invalidate()
 
 
 @pytest.fixture
@@ -70,7 +73,7 @@ def test_get_document_cloud_storage_get_document_raise_exception(expected_docume
 
     mock_cloud_storage = mock.MagicMock()
     exception = CloudStorageException("something went wrong")
-    mock_cloud_storage.get_file.side_effect = exception
+    mock_cloud_storage.get_file_base64.side_effect = exception
     context.register(CloudStorage, mock_cloud_storage)
 
     with pytest.raises(CloudStorageException):
@@ -86,9 +89,9 @@ def test_get_document_works(expected_document):
 
     mock_cloud_storage = mock.MagicMock()
     expected_access_url = "A different URL"
-    expected_document_data = b"DogCow goes Moof!"
+    expected_document_data = "RG9nQ293IGdvZXMgTW9vZiE="
     mock_cloud_storage.access_url.return_value = expected_access_url
-    mock_cloud_storage.get_file.return_value = expected_document_data
+    mock_cloud_storage.get_file_base64.return_value = expected_document_data
     context.register(CloudStorage, mock_cloud_storage)
 
     document_info, storage_access_url, document_data = get_document.get_document(expected_document.document_id)
@@ -96,3 +99,76 @@ def test_get_document_works(expected_document):
     assert document_info == expected_document
     assert storage_access_url == expected_access_url
     assert document_data == expected_document_data
+
+
+def test_get_document_without_inline_file(expected_document):
+    """The document isn't downloaded when it isn't inlined."""
+
+    mock_database = mock.MagicMock()
+    mock_database.get_document.return_value = expected_document
+    context.register(Database, mock_database)
+
+    mock_cloud_storage = mock.MagicMock()
+    expected_access_url = "A different URL"
+    mock_cloud_storage.access_url.return_value = expected_access_url
+    context.register(CloudStorage, mock_cloud_storage)
+
+    document_info, storage_access_url, document_data = get_document.get_document(
+        expected_document.document_id, inline_file=False
+    )
+
+    assert document_info == expected_document
+    assert storage_access_url == expected_access_url
+    assert document_data is None
+    mock_cloud_storage.get_file_base64.assert_not_called()
+
+
+def test_get_document_too_large_to_inline(expected_document):
+    """A document larger than the inline size limit is only available through the access URL."""
+
+    mock_database = mock.MagicMock()
+    mock_database.get_document.return_value = expected_document
+    context.register(Database, mock_database)
+
+    mock_cloud_storage = mock.MagicMock()
+    expected_access_url = "A different URL"
+    mock_cloud_storage.access_url.return_value = expected_access_url
+    mock_cloud_storage.get_file_base64.side_effect = CloudStorageFileTooLargeException("too big")
+    context.register(CloudStorage, mock_cloud_storage)
+
+    document_info, storage_access_url, document_data = get_document.get_document(
+        expected_document.document_id, max_inline_file_size=10
+    )
+
+    assert storage_access_url == expected_access_url
+    assert document_data is None
+    mock_cloud_storage.get_file_base64.assert_called_with(expected_document.document_url, 10)
+
+
+def test_get_document_fetches_the_access_url_and_file_at_the_same_time(expected_document):
+    """Neither cloud storage call waits on the other."""
+
+    mock_database = mock.MagicMock()
+    mock_database.get_document.return_value = expected_document
+    context.register(Database, mock_database)
+
+    # each call only returns once both have started
+    both_started = threading.Barrier(2, timeout=5)
+
+    def access_url(remote_url):
+        both_started.wait()
+        return "A different URL"
+
+    def get_file_base64(remote_url, max_size):
+        both_started.wait()
+        return "RG9nQ293"
+
+    mock_cloud_storage = mock.MagicMock()
+    mock_cloud_storage.access_url.side_effect = access_url
+    mock_cloud_storage.get_file_base64.side_effect = get_file_base64
+    context.register(CloudStorage, mock_cloud_storage)
+
+    _, storage_access_url, document_data = get_document.get_document(expected_document.document_id)
+
+    assert storage_access_url == "A different URL"
+    assert document_data == "RG9nQ293"
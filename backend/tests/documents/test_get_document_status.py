@@ -0,0 +1,38 @@
+from unittest import mock
+
+from src import context
+from src.database.data.document_item import DocumentItem
+from src.database.database import Database
+from src.documents import get_document_status
+
+context = context.ApplicationContext()
+
+
+def setup_function():
+    context.reset()
+
+
+def test_get_document_status_only_reads_the_status():
+    mock_database = mock.MagicMock()
+    mock_database.get_document.return_value = DocumentItem("document ID", status="complete", version=5)
+    context.register(Database, mock_database)
+
+    document_status = get_document_status.get_document_status("document ID")
+
+    assert document_status.status == "complete"
+    mock_database.get_document.assert_called_with("document ID", ["document_id", "status", "version"])
+
+
+def test_entity_tag_changes_with_the_version():
+    first_tag = get_document_status.entity_tag(DocumentItem("document ID", version=1))
+    second_tag = get_document_status.entity_tag(DocumentItem("document ID", version=2))
+
+    assert first_tag == '"1"'
+    assert first_tag != second_tag
+
+
+def test_entity_tag_without_a_version_uses_the_status():
+    processing_tag = get_document_status.entity_tag(DocumentItem("document ID", status="processing"))
+    complete_tag = get_document_status.entity_tag(DocumentItem("document ID", status="complete"))
+
+    assert processing_tag != complete_tag
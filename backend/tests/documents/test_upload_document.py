@@ -5,9 +5,14 @@ from unittest import mock
 import pytest
 
 from src import context
+from src.database.data.document_item import DocumentItem
+from src.database.database import Database
 from src.documents.upload_document import (
+    MULTIPART_UPLOAD_THRESHOLD,
+    complete_direct_upload,
     decode_file_content,
     generate_secure_filename,
+    start_direct_upload,
     upload_file_data,
 )
 from src.storage import CloudStorage
@@ -65,3 +70,67 @@ def test_decode_file_content_with_bad_type():
     mock_file_content = 1234
     with pytest.raises(TypeError):
         decode_file_content(mock_file_content)
+
+
+def test_start_direct_upload_of_a_small_file_uses_a_form():
+    mock_cloud_storage = mock.MagicMock()
+    mock_cloud_storage.upload_form.return_value = {"url": "https://upload/url", "fields": {"key": "value"}}
+    context.register(CloudStorage, mock_cloud_storage)
+
+    document_id, key, upload = start_direct_upload("Original.PDF", 1024, "mock_bucket", "input/")
+
+    assert key == f"input/{document_id}.pdf"
+    assert upload == {"form": {"url": "https://upload/url", "fields": {"key": "value"}}}
+    mock_cloud_storage.upload_form.assert_called_with("mock_bucket", key, {"original_filename": "Original.PDF"}, 1024)
+    mock_cloud_storage.start_multipart_upload.assert_not_called()
+
+
+def test_start_direct_upload_of_a_large_file_uses_parts():
+    mock_cloud_storage = mock.MagicMock()
+    mock_cloud_storage.start_multipart_upload.return_value = "upload ID"
+    mock_cloud_storage.multipart_upload_part_urls.side_effect = lambda bucket, key, upload_id, part_count: [
+        f"https://part/{number}" for number in range(1, part_count + 1)
+    ]
+    context.register(CloudStorage, mock_cloud_storage)
+
+    file_size = MULTIPART_UPLOAD_THRESHOLD * 2 + 1
+    document_id, key, upload = start_direct_upload("scan.pdf", file_size, "mock_bucket", "input/")
+
+    multipart = upload["multipart"]
+    assert multipart["upload_id"] == "upload ID"
+    assert multipart["part_size"] * len(multipart["part_urls"]) >= file_size
+    assert multipart["part_size"] * (len(multipart["part_urls"]) - 1) < file_size
+    mock_cloud_storage.upload_form.assert_not_called()
+
+
+@pytest.mark.parametrize("file_size", [0, -1, 501 * 1024 * 1024])
+def test_start_direct_upload_rejects_bad_sizes(file_size):
+    context.register(CloudStorage, mock.MagicMock())
+
+    with pytest.raises(ValueError):
+        start_direct_upload("scan.pdf", file_size, "mock_bucket", "input/")
+
+
+def test_complete_direct_upload_uses_the_recorded_document_url():
+    mock_database = mock.MagicMock()
+    mock_database.get_document.return_value = DocumentItem("document ID", "s3://mock_bucket/input/document ID.pdf")
+    context.register(Database, mock_database)
+
+    mock_cloud_storage = mock.MagicMock()
+    context.register(CloudStorage, mock_cloud_storage)
+
+    complete_direct_upload("document ID", "upload ID", ["etag 1", "etag 2"])
+
+    mock_cloud_storage.complete_multipart_upload.assert_called_with(
+        "s3://mock_bucket/input/document ID.pdf", "upload ID", ["etag 1", "etag 2"]
+    )
+
+
+def test_complete_direct_upload_of_unknown_document():
+    mock_database = mock.MagicMock()
+    mock_database.get_document.return_value = None
+    context.register(Database, mock_database)
+    context.register(CloudStorage, mock.MagicMock())
+
+    with pytest.raises(FileNotFoundError):
+        complete_direct_upload("document ID", "upload ID", ["etag 1"])
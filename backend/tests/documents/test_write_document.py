@@ -7,6 +7,7 @@ from src.database.data.document_item import DocumentItem
 from src.database.database import Database
 from src.database.exception import DatabaseException
 from src.documents import write_document
+from src.idempotency import IdempotencyLedger, RunStatus
 
 context = context.ApplicationContext()
 
@@ -56,3 +57,116 @@ def test_update_document_works():
 
     write_document.update_document(expected_document_url, expected_document_type, expected_extracted_data)
     mock_database.write_document.assert_called_with(expected_item)
+
+
+def test_update_documents_keeps_how_the_queries_were_answered():
+    mock_database = mock.MagicMock()
+    mock_database.write_documents.return_value = []
+    context.register(Database, mock_database)
+
+    write_document.update_documents(
+        [("s3://bucket/input/DogCow.jpg", "W2", {"Who?": {}}), ("s3://bucket/input/Clarus.jpg", None, {})],
+        answered_queries=[{"Who?": "adapter:1"}, None],
+    )
+
+    written_documents = mock_database.write_documents.call_args.args[0]
+    assert written_documents[0].answered_queries == {"Who?": "adapter:1"}
+    assert written_documents[1].answered_queries is None
+
+
+def test_update_documents_returns_the_indexes_that_failed():
+    mock_database = mock.MagicMock()
+    mock_database.write_documents.side_effect = lambda documents: [documents[1]]
+    context.register(Database, mock_database)
+
+    failed_indexes = write_document.update_documents(
+        [
+            ("s3://bucket/input/DogCow.jpg", "W2", {"key": "value"}),
+            ("s3://bucket/input/Clarus.jpg", None, {}),
+        ]
+    )
+
+    assert failed_indexes == [1]
+    written_documents = mock_database.write_documents.call_args.args[0]
+    assert written_documents[0] == DocumentItem(
+        "DogCow", "s3://bucket/input/DogCow.jpg", "complete", "W2", {"key": "value"}
+    )
+
+
+def test_update_documents_skips_updates_that_were_already_written():
+    mock_database = mock.MagicMock()
+    mock_database.write_documents.side_effect = lambda documents: [
+        document for document in documents if document.document_id == "Moof"
+    ]
+    context.register(Database, mock_database)
+    mock_ledger = mock.MagicMock()
+    mock_ledger.start.side_effect = ["token-1", RunStatus.COMPLETE, "token-3"]
+    context.register(IdempotencyLedger, mock_ledger)
+
+    failed_indexes = write_document.update_documents(
+        [
+            ("s3://bucket/input/DogCow.jpg", "W2", {}),
+            ("s3://bucket/input/Clarus.jpg", None, {}),
+            ("s3://bucket/input/Moof.jpg", None, {}),
+            ("s3://bucket/input/Unversioned.jpg", None, {}),
+        ],
+        ["version-1", "version-2", "version-3", None],
+    )
+
+    assert failed_indexes == [2]
+    written_ids = [document.document_id for document in mock_database.write_documents.call_args.args[0]]
+    assert written_ids == ["DogCow", "Moof", "Unversioned"]
+    mock_ledger.start.assert_any_call("update_document:s3://bucket/input/DogCow.jpg:version-1")
+    mock_ledger.complete.assert_called_once_with("update_document:s3://bucket/input/DogCow.jpg:version-1", "token-1")
+    mock_ledger.release.assert_called_once_with("update_document:s3://bucket/input/Moof.jpg:version-3", "token-3")
+
+
+def test_update_documents_fails_updates_another_run_is_writing():
+    mock_database = mock.MagicMock()
+    mock_database.write_documents.return_value = []
+    context.register(Database, mock_database)
+    mock_ledger = mock.MagicMock()
+    mock_ledger.start.side_effect = [RunStatus.IN_PROGRESS, "token-2"]
+    context.register(IdempotencyLedger, mock_ledger)
+
+    failed_indexes = write_document.update_documents(
+        [
+            ("s3://bucket/input/DogCow.jpg", "W2", {}),
+            ("s3://bucket/input/Clarus.jpg", None, {}),
+            ("s3://bucket/input/DogCow.jpg", "W2", {}),
+        ],
+        ["version-1", "version-2", "version-1"],
+    )
+
+    # the run writing DogCow can still fail, so it's retried, along with its duplicate
+    assert failed_indexes == [0, 2]
+    written_ids = [document.document_id for document in mock_database.write_documents.call_args.args[0]]
+    assert written_ids == ["Clarus"]
+    assert mock_ledger.start.call_count == 2
+
+
+class InMemoryIdempotencyLedger(IdempotencyLedger):
+    def __init__(self):
+        self.completed_keys = set()
+
+    def start(self, key):
+        return RunStatus.COMPLETE if key in self.completed_keys else "token"
+
+    def complete(self, key, token):
+        self.completed_keys.add(key)
+
+    def release(self, key, token):
+        pass
+
+
+def test_update_document_writes_a_version_again_when_its_queries_changed():
+    mock_database = mock.MagicMock()
+    context.register(Database, mock_database)
+    context.register(IdempotencyLedger, InMemoryIdempotencyLedger())
+
+    # a duplicate message, and then the data of a re-extraction with a query answered with an adapter
+    for configuration in ["none", "none", "adapter:1"]:
+        answered_queries = {"Moof?": f"{configuration}@version-1"}
+        write_document.update_document("s3://bucket/input/DogCow.jpg", "W2", {}, "version-1", answered_queries)
+
+    assert mock_database.write_document.call_count == 2
@@ -0,0 +1,59 @@
+import json
+from unittest import mock
+
+from src import context
+from src.database.data.document_item import DocumentItem
+from src.database.database import Database
+from src.external.aws.lambdas import get_document_status
+
+context = context.ApplicationContext()
+
+
+def setup_function():
+    context.reset()
+
+
+def register_document(document):
+    mock_database = mock.MagicMock()
+    mock_database.get_document.return_value = document
+    context.register(Database, mock_database)
+
+
+def status_event(headers=None):
+    return {"pathParameters": {"document_id": "document ID"}, "headers": headers}
+
+
+def test_status_is_returned_with_an_etag():
+    register_document(DocumentItem("document ID", status="processing", version=7))
+
+    response = get_document_status.lambda_handler(status_event(), None)
+
+    assert response["statusCode"] == 200
+    assert response["headers"]["ETag"] == '"7"'
+    assert json.loads(response["body"]) == {"document_id": "document ID", "status": "processing"}
+
+
+def test_not_modified_when_the_etag_matches():
+    register_document(DocumentItem("document ID", status="processing", version=7))
+
+    response = get_document_status.lambda_handler(status_event({"If-None-Match": '"6", "7"'}), None)
+
+    assert response["statusCode"] == 304
+    assert response["body"] == ""
+
+
+def test_modified_when_the_etag_is_old():
+    register_document(DocumentItem("document ID", status="complete", version=8))
+
+    response = get_document_status.lambda_handler(status_event({"if-none-match": '"7"'}), None)
+
+    assert response["statusCode"] == 200
+    assert response["headers"]["ETag"] == '"8"'
+
+
+def test_missing_document():
+    register_document(None)
+
+    response = get_document_status.lambda_handler(status_event(), None)
+
+    assert response["statusCode"] == 404
@@ -0,0 +1,21 @@
+import base64
+import json
+
+from src.external.aws.lambdas import get_extracted_document
+
+
+def test_response_body_with_inline_file_is_the_same_json():
+    response = {"document_id": "a document", "extracted_data": {"key": {"value": 'a "quoted" value', "confidence": 1}}}
+    encoded_document = base64.b64encode(bytes(range(256))).decode("ascii")
+
+    body = get_extracted_document.response_body(response, encoded_document)
+
+    assert json.loads(body) == {**response, "base64_encoded_file": encoded_document}
+
+
+def test_response_body_without_inline_file():
+    response = {"document_id": "a document", "signed_url": "https://a/signed/url"}
+
+    body = get_extracted_document.response_body(response, None)
+
+    assert json.loads(body) == response
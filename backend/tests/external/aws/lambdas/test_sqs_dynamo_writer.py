@@ -0,0 +1,117 @@
+import gzip
+import json
+from unittest import mock
+
+from src import context
+from src.database.database import Database
+from src.external.aws.lambdas import sqs_dynamo_writer
+from src.idempotency import IdempotencyLedger, RunStatus
+from src.message_queue import claim_check
+from src.storage import CloudStorage
+
+context = context.ApplicationContext()
+
+
+def setup_function():
+    context.reset()
+
+
+def sqs_record(message_id, body):
+    return {"messageId": message_id, "body": body}
+
+
+def document_update(document_id):
+    return json.dumps({"document_url": f"s3://bucket/input/{document_id}.jpg", "extracted_data": {}})
+
+
+def test_only_failed_messages_are_reported():
+    mock_database = mock.MagicMock()
+    mock_database.write_documents.side_effect = lambda documents: [
+        document for document in documents if document.document_id == "Clarus"
+    ]
+    context.register(Database, mock_database)
+
+    event = {
+        "Records": [
+            sqs_record("1", document_update("DogCow")),
+            sqs_record("2", "not JSON"),
+            sqs_record("3", document_update("Clarus")),
+        ]
+    }
+
+    response = sqs_dynamo_writer.lambda_handler(event, None)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "2"}, {"itemIdentifier": "3"}]}
+    assert len(mock_database.write_documents.call_args.args[0]) == 2
+
+
+def test_every_message_is_reported_when_the_database_fails():
+    mock_database = mock.MagicMock()
+    mock_database.write_documents.side_effect = Exception("the database is down")
+    context.register(Database, mock_database)
+
+    event = {"Records": [sqs_record("1", document_update("DogCow")), sqs_record("2", document_update("Clarus"))]}
+
+    response = sqs_dynamo_writer.lambda_handler(event, None)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "1"}, {"itemIdentifier": "2"}]}
+
+
+def test_claim_checks_are_resolved():
+    mock_database = mock.MagicMock()
+    mock_database.write_documents.return_value = []
+    context.register(Database, mock_database)
+
+    mock_cloud_storage = mock.MagicMock()
+    mock_cloud_storage.get_file.return_value = gzip.compress(document_update("DogCow").encode("utf-8"))
+    context.register(CloudStorage, mock_cloud_storage)
+
+    event = {"Records": [sqs_record("1", claim_check.claim_check("s3://bucket/claim-check/a.json.gz"))]}
+
+    response = sqs_dynamo_writer.lambda_handler(event, None)
+
+    assert response == {"batchItemFailures": []}
+    mock_cloud_storage.get_file.assert_called_with("s3://bucket/claim-check/a.json.gz")
+    assert mock_database.write_documents.call_args.args[0][0].document_id == "DogCow"
+
+
+def test_duplicate_deliveries_are_written_once():
+    mock_database = mock.MagicMock()
+    mock_database.write_documents.return_value = []
+    context.register(Database, mock_database)
+
+    claimed_keys = set()
+    mock_ledger = mock.MagicMock()
+    mock_ledger.start.side_effect = lambda key: (
+        RunStatus.COMPLETE if key in claimed_keys else claimed_keys.add(key) or "token"
+    )
+    context.register(IdempotencyLedger, mock_ledger)
+
+    update = json.dumps(
+        {"document_url": "s3://bucket/input/DogCow.jpg", "extracted_data": {}, "document_version": "version-1"}
+    )
+    event = {"Records": [sqs_record("1", update), sqs_record("2", update)]}
+
+    response = sqs_dynamo_writer.lambda_handler(event, None)
+
+    assert response == {"batchItemFailures": []}
+    assert len(mock_database.write_documents.call_args.args[0]) == 1
+
+
+def test_updates_another_run_is_writing_are_redelivered():
+    mock_database = mock.MagicMock()
+    mock_database.write_documents.return_value = []
+    context.register(Database, mock_database)
+
+    mock_ledger = mock.MagicMock()
+    mock_ledger.start.return_value = RunStatus.IN_PROGRESS
+    context.register(IdempotencyLedger, mock_ledger)
+
+    update = json.dumps(
+        {"document_url": "s3://bucket/input/DogCow.jpg", "extracted_data": {}, "document_version": "version-1"}
+    )
+
+    response = sqs_dynamo_writer.lambda_handler({"Records": [sqs_record("1", update)]}, None)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "1"}]}
+    mock_database.write_documents.assert_called_once_with([])
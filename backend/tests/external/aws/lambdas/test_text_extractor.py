@@ -0,0 +1,174 @@
+import importlib
+import json
+import os
+import threading
+from unittest import mock
+
+import pytest
+
+from src import context
+from src.documents.extraction_cache import ExtractionCache
+from src.ocr import Ocr, OcrException
+from src.storage import CloudStorage
+
+
+@pytest.fixture(scope="module")
+def text_extractor():
+    with (
+        mock.patch.dict(os.environ, {"SQS_QUEUE_URL": "https://asdf/queue/url"}),
+        mock.patch("src.external.aws.clients.client"),
+    ):
+        return importlib.import_module("src.external.aws.lambdas.text_extractor")
+
+
+def s3_record(key, bucket="bucket"):
+    return {"eventSource": "aws:s3", "s3": {"bucket": {"name": bucket}, "object": {"key": key}}}
+
+
+def sqs_record(message_id, body):
+    return {"eventSource": "aws:sqs", "messageId": message_id, "body": json.dumps(body)}
+
+
+def eventbridge_event(key, bucket="bucket"):
+    return {"detail-type": "Object Created", "detail": {"bucket": {"name": bucket}, "object": {"key": key}}}
+
+
+def test_documents_in_s3_event(text_extractor):
+    event = {"Records": [s3_record("input/a.jpg"), s3_record("input/with+space.pdf")]}
+
+    documents, _ = text_extractor.documents_in_event(event)
+
+    assert documents == [(None, "s3://bucket/input/a.jpg"), (None, "s3://bucket/input/with space.pdf")]
+
+
+def test_documents_in_sqs_event(text_extractor):
+    event = {
+        "Records": [
+            sqs_record("1", {"Records": [s3_record("input/a.jpg"), s3_record("input/b.jpg")]}),
+            sqs_record("2", eventbridge_event("input/c.jpg")),
+            sqs_record("3", {"Event": "s3:TestEvent"}),
+            {"eventSource": "aws:sqs", "messageId": "4", "body": "not JSON"},
+        ]
+    }
+
+    documents, unreadable_message_ids = text_extractor.documents_in_event(event)
+
+    assert documents == [
+        ("1", "s3://bucket/input/a.jpg"),
+        ("1", "s3://bucket/input/b.jpg"),
+        ("2", "s3://bucket/input/c.jpg"),
+    ]
+    assert unreadable_message_ids == ["4"]
+
+
+def test_documents_in_eventbridge_event(text_extractor):
+    documents, _ = text_extractor.documents_in_event(eventbridge_event("input/a.jpg"))
+
+    assert documents == [(None, "s3://bucket/input/a.jpg")]
+
+
+def test_every_record_is_processed_concurrently(text_extractor):
+    # every extraction only finishes once all three have started
+    all_started = threading.Barrier(3, timeout=5)
+    event = {"Records": [s3_record(f"input/{index}.jpg") for index in range(3)]}
+
+    with (
+        mock.patch.object(text_extractor, "max_concurrency", 3),
+        mock.patch.object(
+            text_extractor.extract_text, "extract_text", side_effect=lambda *args, **kwargs: all_started.wait()
+        ),
+    ):
+        text_extractor.lambda_handler(event, None)
+
+
+def test_failed_sqs_messages_are_reported(text_extractor):
+    def extract_text(s3_url, *args, **kwargs):
+        if "bad" in s3_url:
+            raise OcrException("bad document")
+
+    event = {
+        "Records": [
+            sqs_record("1", {"Records": [s3_record("input/good.jpg")]}),
+            sqs_record("2", {"Records": [s3_record("input/good.jpg"), s3_record("input/bad.jpg")]}),
+            sqs_record("3", {"Records": [s3_record("input/bad.jpg")]}),
+        ]
+    }
+
+    with mock.patch.object(text_extractor.extract_text, "extract_text", side_effect=extract_text) as mock_extract:
+        response = text_extractor.lambda_handler(event, None)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "2"}, {"itemIdentifier": "3"}]}
+    assert mock_extract.call_count == 4
+
+
+def test_s3_event_fails_after_every_record_is_processed(text_extractor):
+    event = {"Records": [s3_record("input/bad.jpg"), s3_record("input/good.jpg")]}
+
+    with (
+        mock.patch.object(
+            text_extractor.extract_text, "extract_text", side_effect=[FileNotFoundError("gone"), None]
+        ) as mock_extract,
+        pytest.raises(Exception, match="1 of 2"),
+    ):
+        text_extractor.lambda_handler(event, None)
+
+    assert mock_extract.call_count == 2
+
+
+def test_registered_providers_resolve_without_deadlocking(text_extractor):
+    application_context = context.ApplicationContext()
+    application_context.reset()
+    with (
+        mock.patch.dict(
+            os.environ, {"SQS_QUEUE_URL": "https://asdf/queue/url", "EXTRACTION_CACHE_BUCKET": "cache-bucket"}
+        ),
+        mock.patch("src.external.aws.clients.client"),
+    ):
+        importlib.reload(text_extractor)
+
+        resolved = []
+        thread = threading.Thread(
+            target=lambda: resolved.extend(
+                application_context.implementation(identifier) for identifier in (ExtractionCache, CloudStorage, Ocr)
+            ),
+            daemon=True,
+        )
+        thread.start()
+        thread.join(timeout=5)
+
+    application_context.reset()
+    assert len(resolved) == 3
+    assert resolved[0].bucket_name == "cache-bucket"
+
+
+def test_importing_creates_no_textract_client(text_extractor):
+    with (
+        mock.patch.dict(os.environ, {"SQS_QUEUE_URL": "https://asdf/queue/url"}),
+        mock.patch("src.external.aws.clients.client") as mock_client,
+    ):
+        importlib.reload(text_extractor)
+
+    assert "textract" not in [call.args[0] for call in mock_client.call_args_list]
+
+
+def test_resolving_the_ocr_engine_does_not_wait_for_adapter_versions(text_extractor):
+    application_context = context.ApplicationContext()
+    application_context.reset()
+    release = threading.Event()
+    with (
+        mock.patch.dict(os.environ, {"SQS_QUEUE_URL": "https://asdf/queue/url", "TEXTRACT_ADAPTER_ID_W2_0": "adapter"}),
+        mock.patch("src.external.aws.clients.client") as mock_client,
+    ):
+        mock_client.return_value.list_adapter_versions.side_effect = lambda **kwargs: (
+            release.wait(timeout=5) and {"AdapterVersions": [{"AdapterVersion": "1", "CreationTime": 0}]}
+        )
+        importlib.reload(text_extractor)
+
+        resolved = []
+        thread = threading.Thread(target=lambda: resolved.append(application_context.implementation(Ocr)), daemon=True)
+        thread.start()
+        thread.join(timeout=1)
+        release.set()
+
+    application_context.reset()
+    assert len(resolved) == 1
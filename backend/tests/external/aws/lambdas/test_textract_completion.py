@@ -0,0 +1,37 @@
+import importlib
+import os
+import threading
+from unittest import mock
+
+from src import context
+from src.documents.extraction_cache import ExtractionCache
+from src.storage import CloudStorage
+
+context = context.ApplicationContext()
+
+
+def setup_function():
+    context.reset()
+
+
+def test_registered_providers_resolve_without_deadlocking():
+    with (
+        mock.patch.dict(
+            os.environ, {"SQS_QUEUE_URL": "https://asdf/queue/url", "EXTRACTION_CACHE_BUCKET": "cache-bucket"}
+        ),
+        mock.patch("src.external.aws.clients.client"),
+    ):
+        importlib.reload(importlib.import_module("src.external.aws.lambdas.textract_completion"))
+
+        resolved = []
+        thread = threading.Thread(
+            target=lambda: resolved.extend(
+                context.implementation(identifier) for identifier in (ExtractionCache, CloudStorage)
+            ),
+            daemon=True,
+        )
+        thread.start()
+        thread.join(timeout=5)
+
+    assert len(resolved) == 2
+    assert resolved[0].bucket_name == "cache-bucket"
@@ -0,0 +1,43 @@
+from unittest import mock
+
+from src.external.aws import clients
+
+
+def setup_function():
+    clients.reset()
+
+
+def teardown_function():
+    clients.reset()
+
+
+def test_client_is_created_once_and_shared():
+    with mock.patch("boto3.client") as mock_boto3_client:
+        first_client = clients.client("s3")
+        second_client = clients.client("s3")
+
+    assert first_client is second_client
+    mock_boto3_client.assert_called_once()
+
+
+def test_client_keeps_connections_alive_in_a_pool():
+    with mock.patch("boto3.client") as mock_boto3_client:
+        clients.client("textract", max_pool_connections=16)
+
+    args, kwargs = mock_boto3_client.call_args
+    assert args == ("textract",)
+    assert kwargs["config"].tcp_keepalive is True
+    assert kwargs["config"].max_pool_connections == 16
+
+
+def test_clients_with_different_pool_sizes_are_separate():
+    with mock.patch("boto3.client", side_effect=lambda *args, **kwargs: mock.MagicMock()):
+        assert clients.client("s3", max_pool_connections=10) is not clients.client("s3", max_pool_connections=20)
+
+
+def test_client_retries_can_be_turned_off():
+    with mock.patch("boto3.client") as mock_boto3_client:
+        clients.client("textract", max_attempts=1)
+
+    args, kwargs = mock_boto3_client.call_args
+    assert kwargs["config"].retries == {"mode": "standard", "max_attempts": 1}
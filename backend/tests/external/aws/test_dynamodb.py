@@ -1,5 +1,7 @@
 from decimal import Decimal
+from unittest import mock
 
+from src.database.data.document_item import DocumentItem
 from src.external.aws.dynamodb import DynamoDb
 
 
@@ -133,3 +135,109 @@ def test_convert_to_decimal_complex():
         },
         "d": "Something else",
     }
+
+
+def create_dynamodb(mock_client):
+    with mock.patch("src.external.aws.clients.client", return_value=mock_client):
+        return DynamoDb()
+
+
+def test_get_document_with_attributes_uses_a_projection():
+    mock_client = mock.MagicMock()
+    mock_client.get_item.return_value = {
+        "Item": {"document_id": {"S": "document ID"}, "status": {"S": "complete"}, "version": {"N": "12"}}
+    }
+
+    document = create_dynamodb(mock_client).get_document("document ID", ["document_id", "status", "version"])
+
+    assert document == DocumentItem("document ID", status="complete", version=12)
+    _, kwargs = mock_client.get_item.call_args
+    assert kwargs["ProjectionExpression"] == "#attribute0, #attribute1, #attribute2"
+    assert kwargs["ExpressionAttributeNames"] == {
+        "#attribute0": "document_id",
+        "#attribute1": "status",
+        "#attribute2": "version",
+    }
+
+
+def test_write_document_sets_a_new_version():
+    mock_client = mock.MagicMock()
+    dynamodb = create_dynamodb(mock_client)
+
+    dynamodb.write_document(DocumentItem("document ID", "s3://bucket/input/document ID.jpg"))
+    first_version = int(mock_client.put_item.call_args.kwargs["Item"]["version"]["N"])
+    dynamodb.write_document(DocumentItem("document ID", "s3://bucket/input/document ID.jpg"))
+    second_version = int(mock_client.put_item.call_args.kwargs["Item"]["version"]["N"])
+
+    assert second_version > first_version
+
+
+class FakeBatchWriteClient:
+    """Leaves the given document IDs unprocessed the given number of times before writing them."""
+
+    def __init__(self, unprocessed_times: dict[str, int] | None = None):
+        self.unprocessed_times = unprocessed_times or {}
+        self.batches = []
+
+    def batch_write_item(self, RequestItems):
+        (table, requests), *_ = RequestItems.items()
+        self.batches.append([request["PutRequest"]["Item"]["document_id"]["S"] for request in requests])
+
+        unprocessed = []
+        for request in requests:
+            document_id = request["PutRequest"]["Item"]["document_id"]["S"]
+            if self.unprocessed_times.get(document_id, 0) > 0:
+                self.unprocessed_times[document_id] -= 1
+                unprocessed.append(request)
+
+        return {"UnprocessedItems": {table: unprocessed} if unprocessed else {}}
+
+
+def create_batch_dynamodb(fake_client):
+    dynamodb = create_dynamodb(fake_client)
+    dynamodb.table = "table"
+    dynamodb.batch_write_backoff_seconds = 0
+    return dynamodb
+
+
+def test_write_documents_in_batches_of_25():
+    fake_client = FakeBatchWriteClient()
+    documents = [DocumentItem(f"document {index}") for index in range(60)]
+
+    failed_documents = create_batch_dynamodb(fake_client).write_documents(documents)
+
+    assert failed_documents == []
+    assert [len(batch) for batch in fake_client.batches] == [25, 25, 10]
+
+
+def test_write_documents_retries_unprocessed_documents():
+    fake_client = FakeBatchWriteClient({"document 1": 2})
+    documents = [DocumentItem(f"document {index}") for index in range(3)]
+
+    failed_documents = create_batch_dynamodb(fake_client).write_documents(documents)
+
+    assert failed_documents == []
+    assert fake_client.batches == [["document 0", "document 1", "document 2"], ["document 1"], ["document 1"]]
+
+
+def test_write_documents_returns_documents_that_stay_unprocessed():
+    fake_client = FakeBatchWriteClient({"document 1": 100})
+    documents = [DocumentItem(f"document {index}") for index in range(3)]
+    dynamodb = create_batch_dynamodb(fake_client)
+
+    failed_documents = dynamodb.write_documents(documents)
+
+    assert failed_documents == [documents[1]]
+    assert len(fake_client.batches) == dynamodb.max_batch_write_attempts
+
+
+def test_write_documents_keeps_the_last_write_of_a_document():
+    fake_client = FakeBatchWriteClient()
+    mock_client = mock.MagicMock(wraps=fake_client)
+    documents = [DocumentItem("DogCow", status="processing"), DocumentItem("DogCow", status="complete")]
+
+    create_batch_dynamodb(mock_client).write_documents(documents)
+
+    requests = mock_client.batch_write_item.call_args.kwargs["RequestItems"]["table"]
+    assert len(requests) == 1
+    assert requests[0]["PutRequest"]["Item"]["status"] == {"S": "complete"}
@@ -0,0 +1,121 @@
+from unittest import mock
+
+import pytest
+
+from src.external.aws.dynamodb_idempotency_ledger import DynamoDbIdempotencyLedger
+from src.idempotency import IdempotencyException, RunInProgressException, RunStatus
+
+
+class ConditionalCheckFailedException(Exception):
+    def __init__(self, item=None):
+        super().__init__()
+        self.response = {"Item": item} if item is not None else {}
+
+
+class FakeDynamoDbClient:
+    """Keeps the ledger table in memory and checks the same conditions DynamoDB would."""
+
+    def __init__(self):
+        self.items = {}
+        self.exceptions = mock.MagicMock()
+        self.exceptions.ConditionalCheckFailedException = ConditionalCheckFailedException
+
+    def put_item(self, TableName, Item, ExpressionAttributeValues, **kwargs):
+        existing = self.items.get(Item["idempotency_key"]["S"])
+        now = int(ExpressionAttributeValues[":now"]["N"])
+        if existing is not None and int(existing["expires_at"]["N"]) >= now:
+            raise ConditionalCheckFailedException(existing)
+        self.items[Item["idempotency_key"]["S"]] = Item
+
+    def update_item(self, TableName, Key, ExpressionAttributeValues, **kwargs):
+        existing = self.items.get(Key["idempotency_key"]["S"])
+        if existing is None or existing["token"] != ExpressionAttributeValues[":token"]:
+            raise ConditionalCheckFailedException()
+        existing["status"] = ExpressionAttributeValues[":complete"]
+        existing["expires_at"] = ExpressionAttributeValues[":expires_at"]
+
+    def delete_item(self, TableName, Key, ExpressionAttributeValues, **kwargs):
+        existing = self.items.get(Key["idempotency_key"]["S"])
+        if existing is None or existing["token"] != ExpressionAttributeValues[":token"]:
+            raise ConditionalCheckFailedException()
+        del self.items[Key["idempotency_key"]["S"]]
+
+
+def create_ledger(client, now=1000):
+    with mock.patch("src.external.aws.clients.client", return_value=client):
+        ledger = DynamoDbIdempotencyLedger()
+    ledger.in_progress_seconds = 60
+    ledger.completed_seconds = 3600
+    ledger.clock = lambda: now
+    return ledger
+
+
+def test_only_one_run_claims_a_key():
+    ledger = create_ledger(FakeDynamoDbClient())
+
+    assert isinstance(ledger.start("key"), str)
+    assert ledger.start("key") is RunStatus.IN_PROGRESS
+
+
+def test_completed_key_is_not_claimed_again():
+    ledger = create_ledger(FakeDynamoDbClient())
+
+    token = ledger.start("key")
+    ledger.complete("key", token)
+    ledger.clock = lambda: 1000 + 120
+
+    assert ledger.start("key") is RunStatus.COMPLETE
+
+
+def test_released_key_is_claimed_again():
+    ledger = create_ledger(FakeDynamoDbClient())
+
+    token = ledger.start("key")
+    ledger.release("key", token)
+
+    assert isinstance(ledger.start("key"), str)
+
+
+def test_expired_claim_is_claimed_again_and_the_old_run_does_not_complete_it():
+    client = FakeDynamoDbClient()
+    ledger = create_ledger(client)
+    crashed_token = ledger.start("key")
+
+    ledger.clock = lambda: 1000 + 61
+    retry_token = ledger.start("key")
+    ledger.complete("key", crashed_token)
+
+    assert isinstance(retry_token, str)
+    assert client.items["key"]["status"]["S"] == "in_progress"
+
+
+def test_run_once_releases_the_key_when_the_run_fails():
+    ledger = create_ledger(FakeDynamoDbClient())
+
+    with pytest.raises(ValueError):
+        ledger.run_once("key", mock.MagicMock(side_effect=ValueError()))
+
+    run = mock.MagicMock()
+    assert ledger.run_once("key", run) is True
+    assert ledger.run_once("key", run) is False
+    run.assert_called_once()
+
+
+def test_start_fails_when_dynamodb_fails():
+    client = mock.MagicMock()
+    client.exceptions.ConditionalCheckFailedException = ConditionalCheckFailedException
+    client.put_item.side_effect = Exception("DynamoDB is down")
+
+    with pytest.raises(IdempotencyException):
+        create_ledger(client).start("key")
+
+
+def test_run_once_of_a_key_in_progress_fails_so_the_delivery_is_retried():
+    ledger = create_ledger(FakeDynamoDbClient())
+    ledger.start("key")
+    run = mock.MagicMock()
+
+    with pytest.raises(RunInProgressException):
+        ledger.run_once("key", run)
+
+    run.assert_not_called()
@@ -1,6 +1,13 @@
+import base64
+import datetime
+import hashlib
+import io
+from unittest import mock
+
 import pytest
 
 from src.external.aws.s3 import S3
+from src.storage import CloudStorageFileTooLargeException
 
 
 def test_parse_s3_url_no_s3_scheme():
@@ -31,3 +38,159 @@ def test_parse_s3_url_works():
 
     assert actual_bucket == expected_bucket
     assert actual_object_key == expected_object_key
+
+
+class ShortReadStream(io.BytesIO):
+    """Returns fewer bytes than asked for, like a network stream can."""
+
+    def read(self, size=-1):
+        return super().read(min(size, 7) if size > 0 else size)
+
+
+def create_s3(mock_client):
+    with mock.patch("src.external.aws.clients.client", return_value=mock_client):
+        return S3()
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 3, 100, 1000])
+def test_get_file_base64_matches_encoding_the_whole_file(size):
+    data = bytes(range(256)) * 4
+    data = data[:size]
+    mock_client = mock.MagicMock()
+    mock_client.get_object.return_value = {"Body": ShortReadStream(data), "ContentLength": len(data)}
+
+    with mock.patch("src.external.aws.s3.BASE64_CHUNK_SIZE", 30):
+        encoded = create_s3(mock_client).get_file_base64("s3://bucket/key")
+
+    assert encoded == base64.b64encode(data).decode("ascii")
+
+
+def test_get_file_base64_over_max_size():
+    body = ShortReadStream(b"12345")
+    mock_client = mock.MagicMock()
+    mock_client.get_object.return_value = {"Body": body, "ContentLength": 5}
+
+    with pytest.raises(CloudStorageFileTooLargeException):
+        create_s3(mock_client).get_file_base64("s3://bucket/key", max_size=4)
+
+    assert body.closed
+
+
+def test_upload_form_limits_the_size_and_keeps_the_metadata():
+    mock_client = mock.MagicMock()
+    mock_client.generate_presigned_post.return_value = {"url": "https://bucket/", "fields": {"key": "input/a.pdf"}}
+
+    form = create_s3(mock_client).upload_form("bucket", "input/a.pdf", {"original_filename": "A.pdf"}, 100)
+
+    assert form == {"url": "https://bucket/", "fields": {"key": "input/a.pdf"}}
+    _, kwargs = mock_client.generate_presigned_post.call_args
+    assert kwargs["Fields"] == {"x-amz-meta-original_filename": "A.pdf"}
+    assert ["content-length-range", 1, 100] in kwargs["Conditions"]
+    assert {"x-amz-meta-original_filename": "A.pdf"} in kwargs["Conditions"]
+
+
+def test_multipart_upload_part_urls_are_numbered_from_one():
+    mock_client = mock.MagicMock()
+    mock_client.generate_presigned_url.side_effect = lambda operation, Params, ExpiresIn: Params["PartNumber"]
+
+    part_urls = create_s3(mock_client).multipart_upload_part_urls("bucket", "input/a.pdf", "upload ID", 3)
+
+    assert part_urls == [1, 2, 3]
+
+
+def test_complete_multipart_upload_numbers_the_parts():
+    mock_client = mock.MagicMock()
+
+    create_s3(mock_client).complete_multipart_upload("s3://bucket/input/a.pdf", "upload ID", ["etag 1", "etag 2"])
+
+    mock_client.complete_multipart_upload.assert_called_with(
+        Bucket="bucket",
+        Key="input/a.pdf",
+        UploadId="upload ID",
+        MultipartUpload={"Parts": [{"PartNumber": 1, "ETag": "etag 1"}, {"PartNumber": 2, "ETag": "etag 2"}]},
+    )
+
+
+def test_content_hash_uses_the_hash_stored_at_upload():
+    mock_client = mock.MagicMock()
+    mock_client.head_object.return_value = {"Metadata": {"sha256": "stored-hash"}}
+
+    assert create_s3(mock_client).content_hash("s3://bucket/input/a.pdf") == "stored-hash"
+    mock_client.get_object.assert_not_called()
+
+
+def test_content_hash_reads_the_file_without_a_stored_hash():
+    data = bytes(range(256)) * 4
+    mock_client = mock.MagicMock()
+    mock_client.head_object.return_value = {"Metadata": {}}
+    mock_client.get_object.return_value = {"Body": ShortReadStream(data)}
+
+    content_hash = create_s3(mock_client).content_hash("s3://bucket/input/a.pdf")
+
+    assert content_hash == hashlib.sha256(data).hexdigest()
+
+
+def test_content_type_is_guessed_from_the_uploaded_file_name():
+    mock_client = mock.MagicMock()
+    mock_client.head_object.return_value = {
+        "ContentType": "binary/octet-stream",
+        "Metadata": {"original_filename": "DogCow.JPG"},
+    }
+
+    assert create_s3(mock_client).content_type("s3://bucket/input/a") == "image/jpeg"
+
+
+def test_content_type_is_read_from_the_file():
+    mock_client = mock.MagicMock()
+    mock_client.head_object.return_value = {"ContentType": "application/pdf", "Metadata": {}}
+
+    assert create_s3(mock_client).content_type("s3://bucket/input/a.png") == "application/pdf"
+
+
+def test_object_version_is_the_version_id_in_a_versioned_bucket():
+    mock_client = mock.MagicMock()
+    mock_client.head_object.return_value = {
+        "VersionId": "DogCow",
+        "ETag": '"moof"',
+        "LastModified": datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC),
+    }
+
+    assert create_s3(mock_client).object_version("s3://bucket/input/a.pdf") == "DogCow"
+
+
+def test_object_version_changes_when_the_same_file_is_uploaded_again():
+    mock_client = mock.MagicMock()
+    s3 = create_s3(mock_client)
+
+    mock_client.head_object.return_value = {
+        "VersionId": "null",
+        "ETag": '"moof"',
+        "LastModified": datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC),
+    }
+    first_version = s3.object_version("s3://bucket/input/a.pdf")
+
+    mock_client.head_object.return_value = {
+        "ETag": '"moof"',
+        "LastModified": datetime.datetime(2025, 1, 2, tzinfo=datetime.UTC),
+    }
+    second_version = s3.object_version("s3://bucket/input/a.pdf")
+
+    assert first_version != second_version
+
+
+def test_list_files_reads_every_page():
+    mock_client = mock.MagicMock()
+    mock_client.get_paginator.return_value.paginate.return_value = [
+        {"Contents": [{"Key": "ocr-archive/a/job-1.jsonl.gz"}, {"Key": "ocr-archive/a/job-2.jsonl.gz"}]},
+        {"Contents": [{"Key": "ocr-archive/b/job-3.jsonl.gz"}]},
+        {},
+    ]
+
+    files = list(create_s3(mock_client).list_files("bucket", "ocr-archive/"))
+
+    assert files == [
+        "s3://bucket/ocr-archive/a/job-1.jsonl.gz",
+        "s3://bucket/ocr-archive/a/job-2.jsonl.gz",
+        "s3://bucket/ocr-archive/b/job-3.jsonl.gz",
+    ]
+    mock_client.get_paginator.return_value.paginate.assert_called_with(Bucket="bucket", Prefix="ocr-archive/")
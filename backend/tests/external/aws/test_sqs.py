@@ -0,0 +1,27 @@
+from unittest import mock
+
+import pytest
+
+from src.external.aws.sqs import Sqs
+from src.message_queue import MessageQueueException
+
+
+def create_sqs(mock_client):
+    with mock.patch("src.external.aws.clients.client", return_value=mock_client):
+        return Sqs()
+
+
+def test_send_message():
+    mock_client = mock.MagicMock()
+
+    create_sqs(mock_client).send_message("https://asdf/queue/url", "message")
+
+    mock_client.send_message.assert_called_once_with(QueueUrl="https://asdf/queue/url", MessageBody="message")
+
+
+def test_send_message_failure_is_wrapped():
+    mock_client = mock.MagicMock()
+    mock_client.send_message.side_effect = Exception("throttled")
+
+    with pytest.raises(MessageQueueException):
+        create_sqs(mock_client).send_message("https://asdf/queue/url", "message")
@@ -1,14 +1,435 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
 from src.external.aws.textract import Textract
+from src.external.aws.textract_adapter_versions import AdapterVersionCache
+from src.forms.data_form import DataForm
 from src.forms.w2 import W2
+from src.ocr import ClassificationScope
+
+
+def create_textract(mock_textract_client, max_concurrency=None, content_type=None):
+    with mock.patch("src.external.aws.clients.client", return_value=mock_textract_client):
+        textract = Textract(max_concurrency)
+    textract.poll_interval_seconds = 0
+    textract.cloud_storage = mock.MagicMock()
+    textract.cloud_storage.content_type.return_value = content_type
+    return textract
+
+
+def query_answer_blocks(query, answer):
+    return [
+        {
+            "BlockType": "QUERY",
+            "Id": f"{query}-query",
+            "Query": {"Text": query},
+            "Relationships": [{"Type": "ANSWER", "Ids": [f"{query}-answer"]}],
+        },
+        {"BlockType": "QUERY_RESULT", "Id": f"{query}-answer", "Text": answer, "Confidence": 99.0},
+    ]
+
+
+def analyze_document_answering_every_query(**kwargs):
+    blocks = [
+        block for query in kwargs["QueriesConfig"]["Queries"] for block in query_answer_blocks(query["Text"], "Moof!")
+    ]
+    return {"Blocks": blocks}
+
+
+def test_textract_asks_w2_queries_in_jobs_of_30():
+    mock_textract_client = mock.MagicMock()
+    mock_textract_client.start_document_analysis.return_value = {"JobId": "job"}
+    with mock.patch.dict(
+        os.environ,
+        {"TEXTRACT_NOTIFICATION_TOPIC_ARN": "topic:arn", "TEXTRACT_NOTIFICATION_ROLE_ARN": "role:arn"},
+    ):
+        textract = create_textract(mock_textract_client)
+
+    textract.start_scan("s3://bucket/key.jpg", W2(), "DogCow")
+
+    queries = [
+        call.kwargs["QueriesConfig"]["Queries"] for call in mock_textract_client.start_document_analysis.mock_calls
+    ]
+    assert [len(job_queries) for job_queries in queries] == [30, 5]
+    assert all(query["Pages"] == ["*"] for job_queries in queries for query in job_queries)
+
+
+def test_textract_queries_starts_all_jobs_before_polling():
+    calls = []
+    job_polls = {}
+
+    def start_document_analysis(**kwargs):
+        calls.append("start")
+        return {"JobId": f"job-{len(calls)}"}
+
+    def get_document_analysis(JobId):
+        calls.append("get")
+        job_polls[JobId] = job_polls.get(JobId, 0) + 1
+        status = "IN_PROGRESS" if job_polls[JobId] == 1 else "SUCCEEDED"
+        return {"JobStatus": status, "JobId": JobId}
+
+    mock_textract_client = mock.MagicMock()
+    mock_textract_client.start_document_analysis.side_effect = start_document_analysis
+    mock_textract_client.get_document_analysis.side_effect = get_document_analysis
+    textract = create_textract(mock_textract_client)
+
+    response = textract.scan("s3://bucket/key.jpg", W2())
+
+    assert response == {}
+    assert calls[:2] == ["start", "start"]
+    assert job_polls == {"job-1": 2, "job-2": 2}
+
+
+def test_textract_queries_respects_the_concurrency_cap():
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+
+    def start_document_analysis(**kwargs):
+        nonlocal in_flight, max_in_flight
+        with lock:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight -= 1
+        return {"JobId": "job"}
+
+    mock_textract_client = mock.MagicMock()
+    mock_textract_client.start_document_analysis.side_effect = start_document_analysis
+    mock_textract_client.get_document_analysis.return_value = {"JobStatus": "SUCCEEDED"}
+    textract = create_textract(mock_textract_client, max_concurrency=1)
+
+    textract.scan("s3://bucket/key.jpg", W2())
+
+    assert mock_textract_client.start_document_analysis.call_count == 2
+    assert max_in_flight == 1
+
+
+def test_textract_concurrency_cap_applies_across_documents_scanned_at_once():
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+
+    def start_document_analysis(**kwargs):
+        nonlocal in_flight, max_in_flight
+        with lock:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight -= 1
+        return {"JobId": "job"}
+
+    mock_textract_client = mock.MagicMock()
+    mock_textract_client.start_document_analysis.side_effect = start_document_analysis
+    mock_textract_client.get_document_analysis.return_value = {"JobStatus": "SUCCEEDED"}
+    textract = create_textract(mock_textract_client, max_concurrency=2)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        list(executor.map(lambda index: textract.scan(f"s3://bucket/{index}.jpg", W2()), range(3)))
+
+    assert mock_textract_client.start_document_analysis.call_count == 6
+    assert max_in_flight == 2
+
+
+def dogcow_form(query_count):
+    return DataForm("DOGCOW", "DogCow Form", [f"What is the DogCow's {index}th Moof?" for index in range(query_count)])
+
+
+def test_textract_analyzes_a_single_page_image_synchronously():
+    form = dogcow_form(20)
+    skipped_queries = form.queries()[:5]
+    mock_textract_client = mock.MagicMock()
+    mock_textract_client.analyze_document.side_effect = analyze_document_answering_every_query
+    textract = create_textract(mock_textract_client, content_type="image/jpeg")
+
+    response = textract.scan("s3://bucket/key.jpg", form, skipped_queries)
+
+    assert response == {query: {"value": "Moof!", "confidence": 99.0} for query in form.queries()[5:]}
+    mock_textract_client.start_document_analysis.assert_not_called()
+    calls = mock_textract_client.analyze_document.call_args_list
+    # synchronous analysis answers at most 15 queries on a page, which is as many as are left to ask
+    assert [len(call.kwargs["QueriesConfig"]["Queries"]) for call in calls] == [15]
+    assert calls[0].kwargs["Document"] == {"S3Object": {"Bucket": "bucket", "Name": "key.jpg"}}
+    assert textract.analysis_modes == {"sync": 1}
+
+
+def test_textract_analyzes_with_jobs_an_image_that_takes_more_synchronous_calls_than_jobs():
+    mock_textract_client = mock.MagicMock()
+    mock_textract_client.start_document_analysis.return_value = {"JobId": "job"}
+    mock_textract_client.get_document_analysis.return_value = {"JobStatus": "SUCCEEDED"}
+    textract = create_textract(mock_textract_client, content_type="image/png")
+
+    # a W2's 35 queries take 3 synchronous calls, but only 2 jobs
+    textract.scan("s3://bucket/key.png", W2())
+
+    mock_textract_client.analyze_document.assert_not_called()
+    assert mock_textract_client.start_document_analysis.call_count == 2
+    assert textract.analysis_modes == {"async": 1}
+
+
+def test_textract_analyzes_a_pdf_with_jobs():
+    mock_textract_client = mock.MagicMock()
+    mock_textract_client.start_document_analysis.return_value = {"JobId": "job"}
+    mock_textract_client.get_document_analysis.return_value = {"JobStatus": "SUCCEEDED"}
+    textract = create_textract(mock_textract_client, content_type="application/pdf")
+
+    # its page count isn't known, so it can't be analyzed synchronously
+    textract.scan("s3://bucket/key.pdf", dogcow_form(5))
+
+    mock_textract_client.analyze_document.assert_not_called()
+    assert mock_textract_client.start_document_analysis.call_count == 1
+    assert textract.analysis_modes == {"async": 1}
+
+
+def test_textract_analyzes_with_jobs_what_synchronous_analysis_does_not_support():
+    error = Exception("multi-page image")
+    error.response = {"Error": {"Code": "UnsupportedDocumentException"}}
+    mock_textract_client = mock.MagicMock()
+    mock_textract_client.analyze_document.side_effect = error
+    mock_textract_client.start_document_analysis.return_value = {"JobId": "job"}
+    mock_textract_client.get_document_analysis.return_value = {"JobStatus": "SUCCEEDED"}
+    textract = create_textract(mock_textract_client, content_type="image/png")
+
+    assert textract.scan("s3://bucket/key.png", dogcow_form(5)) == {}
+
+    assert mock_textract_client.start_document_analysis.call_count == 1
+    assert textract.analysis_modes == {"async": 1}
+
+
+def test_textract_start_scan_of_a_single_page_image_is_not_split():
+    form = dogcow_form(5)
+    mock_textract_client = mock.MagicMock()
+    mock_textract_client.analyze_document.side_effect = analyze_document_answering_every_query
+    with mock.patch.dict(
+        os.environ,
+        {"TEXTRACT_NOTIFICATION_TOPIC_ARN": "topic:arn", "TEXTRACT_NOTIFICATION_ROLE_ARN": "role:arn"},
+    ):
+        textract = create_textract(mock_textract_client, content_type="image/png")
+
+    assert textract.start_scan("s3://bucket/key.png", form, "DogCow") is None
+    textract.scan("s3://bucket/key.png", form)
+
+    mock_textract_client.start_document_analysis.assert_not_called()
+    assert mock_textract_client.analyze_document.call_count == 1
+    # the scan that follows uses what the start looked up about the image
+    textract.cloud_storage.content_type.assert_called_once_with("s3://bucket/key.png")
 
 
-def test_textract_split_w2_queries_by_30():
-    w2 = W2()
+def test_textract_start_scan_without_notification_channel_is_not_split():
+    mock_textract_client = mock.MagicMock()
+    textract = create_textract(mock_textract_client)
+
+    assert textract.start_scan("s3://bucket/key.jpg", W2(), "DogCow") is None
+    mock_textract_client.start_document_analysis.assert_not_called()
+
+
+def test_textract_start_scan_with_notification_channel():
+    mock_textract_client = mock.MagicMock()
+    mock_textract_client.start_document_analysis.return_value = {"JobId": "job"}
+    with mock.patch.dict(
+        os.environ,
+        {"TEXTRACT_NOTIFICATION_TOPIC_ARN": "topic:arn", "TEXTRACT_NOTIFICATION_ROLE_ARN": "role:arn"},
+    ):
+        textract = create_textract(mock_textract_client)
+
+    job_ids = textract.start_scan("s3://bucket/key.jpg", W2(), "DogCow")
+
+    assert job_ids == ["job", "job"]
+    mock_textract_client.get_document_analysis.assert_not_called()
+    args, kwargs = mock_textract_client.start_document_analysis.call_args
+    assert kwargs["NotificationChannel"] == {"SNSTopicArn": "topic:arn", "RoleArn": "role:arn"}
+    assert kwargs["JobTag"] == "DogCow"
+
+
+def test_textract_start_scan_skips_queries_within_their_chunk():
+    mock_textract_client = mock.MagicMock()
+    mock_textract_client.start_document_analysis.return_value = {"JobId": "job"}
+    mock_textract_client.list_adapter_versions.return_value = {
+        "AdapterVersions": [{"AdapterVersion": "1", "CreationTime": 1}]
+    }
+    AdapterVersionCache().invalidate()
+    with mock.patch.dict(
+        os.environ,
+        {
+            "TEXTRACT_NOTIFICATION_TOPIC_ARN": "topic:arn",
+            "TEXTRACT_NOTIFICATION_ROLE_ARN": "role:arn",
+            "TEXTRACT_ADAPTER_ID_W2_1": "second-chunk-adapter",
+        },
+    ):
+        textract = create_textract(mock_textract_client)
+        queries = W2().queries()
+        # everything of the first chunk of 30 queries and one query of the second chunk were answered before
+        job_ids = textract.start_scan("s3://bucket/key.jpg", W2(), "DogCow", set(queries[:31]))
+
+    AdapterVersionCache().invalidate()
+    assert job_ids == ["job"]
+    _, kwargs = mock_textract_client.start_document_analysis.call_args
+    assert [query["Text"] for query in kwargs["QueriesConfig"]["Queries"]] == queries[31:]
+    assert kwargs["AdaptersConfig"]["Adapters"][0]["AdapterId"] == "second-chunk-adapter"
+
+
+def test_textract_query_configurations_are_the_adapter_of_each_chunk():
+    mock_textract_client = mock.MagicMock()
+    mock_textract_client.list_adapter_versions.return_value = {
+        "AdapterVersions": [{"AdapterVersion": "3", "CreationTime": 1}]
+    }
+    textract = create_textract(mock_textract_client)
+    AdapterVersionCache().invalidate()
+
+    with mock.patch.dict(os.environ, {"TEXTRACT_ADAPTER_ID_W2_0": "adapter"}):
+        query_configurations = textract.query_configurations(W2())
+
+    AdapterVersionCache().invalidate()
+    queries = W2().queries()
+    assert query_configurations == {
+        **{query: "adapter:3" for query in queries[:30]},
+        **{query: "none" for query in queries[30:]},
+    }
+
+
+def test_textract_configuration_version_changes_with_the_adapter_version():
+    mock_textract_client = mock.MagicMock()
+    textract = create_textract(mock_textract_client)
+    AdapterVersionCache().invalidate()
+
+    with mock.patch.dict(os.environ, {"TEXTRACT_ADAPTER_ID_W2_0": "adapter"}):
+        mock_textract_client.list_adapter_versions.return_value = {
+            "AdapterVersions": [{"AdapterVersion": "1", "CreationTime": 1}]
+        }
+        first_version = textract.configuration_version(W2())
+
+        AdapterVersionCache().invalidate()
+        mock_textract_client.list_adapter_versions.return_value = {
+            "AdapterVersions": [{"AdapterVersion": "1", "CreationTime": 1}, {"AdapterVersion": "2", "CreationTime": 2}]
+        }
+        second_version = textract.configuration_version(W2())
+
+    AdapterVersionCache().invalidate()
+    assert first_version != second_version
+    assert textract.configuration_version(None) == "forms"
+
+
+def test_textract_parse_completion_notification_in_sns_envelope():
+    textract_message = {"JobId": "job", "Status": "SUCCEEDED", "API": "StartDocumentAnalysis", "JobTag": "DogCow"}
+    message = json.dumps({"Type": "Notification", "Message": json.dumps(textract_message)})
+
+    assert Textract.parse_completion_notification(message) == ("job", "SUCCEEDED", "DogCow")
+
+
+def test_textract_queries_follows_next_token():
+    pages = {
+        None: {
+            "JobStatus": "SUCCEEDED",
+            "NextToken": "page-2",
+            "Blocks": [
+                {
+                    "BlockType": "QUERY",
+                    "Id": "123",
+                    "Relationships": [{"Type": "ANSWER", "Ids": ["1234"]}],
+                    "Query": {"Text": "What did the DogCow say?"},
+                }
+            ],
+        },
+        "page-2": {
+            "JobStatus": "SUCCEEDED",
+            "Blocks": [{"BlockType": "QUERY_RESULT", "Id": "1234", "Text": "Moof!", "Confidence": 0.99}],
+        },
+    }
+
+    mock_textract_client = mock.MagicMock()
+    mock_textract_client.start_document_analysis.return_value = {"JobId": "job"}
+    mock_textract_client.get_document_analysis.side_effect = lambda JobId, NextToken=None: pages[NextToken]
+    textract = create_textract(mock_textract_client)
+
+    response = textract.scan("s3://bucket/key.jpg", W2())
+
+    assert response == {"What did the DogCow say?": {"value": "Moof!", "confidence": 0.99}}
+    mock_textract_client.get_document_analysis.assert_any_call(JobId="job", NextToken="page-2")
+
+
+def test_textract_parse_forms_from_a_stream_of_pages():
+    blocks = [
+        {
+            "BlockType": "KEY_VALUE_SET",
+            "Id": "1",
+            "EntityTypes": ["KEY"],
+            "Relationships": [{"Type": "VALUE", "Ids": ["2"]}, {"Type": "CHILD", "Ids": ["3"]}],
+        },
+        {
+            "BlockType": "KEY_VALUE_SET",
+            "Id": "2",
+            "EntityTypes": ["VALUE"],
+            "Relationships": [{"Type": "CHILD", "Ids": ["4"]}],
+        },
+        {"BlockType": "WORD", "Id": "3", "Text": "DogCow", "Confidence": 90.0},
+        {"BlockType": "WORD", "Id": "4", "Text": "Moof!", "Confidence": 80.0},
+    ]
+    pages = (page for page in [{"Blocks": blocks[:1]}, {"Blocks": blocks[1:3]}, {"Blocks": blocks[3:]}])
+
+    actual_parsed_response = Textract._parse_textract_forms(pages)
+
+    assert actual_parsed_response == Textract._parse_textract_forms({"Blocks": blocks})
+    assert actual_parsed_response == {"DogCow": {"value": "Moof!", "confidence": 80.0}}
+
+
+def create_line(text, page, top):
+    return {"BlockType": "LINE", "Text": text, "Page": page, "Geometry": {"BoundingBox": {"Top": top}}}
+
+
+def test_textract_lines_in_scope():
+    response = {
+        "Blocks": [
+            create_line("Form W-2", 1, 0.05),
+            create_line("Employee's name", 1, 0.6),
+            create_line("Page two", 2, 0.05),
+            {"BlockType": "WORD", "Text": "Form", "Page": 1, "Geometry": {"BoundingBox": {"Top": 0.05}}},
+        ]
+    }
+
+    assert Textract._lines_in_scope(response, ClassificationScope.DOCUMENT, 0.25) == [
+        "Form W-2",
+        "Employee's name",
+        "Page two",
+    ]
+    assert Textract._lines_in_scope(response, ClassificationScope.FIRST_PAGE, 0.25) == ["Form W-2", "Employee's name"]
+    assert Textract._lines_in_scope(response, ClassificationScope.HEADER, 0.25) == ["Form W-2"]
+
+
+def test_textract_parse_lines_and_forms_in_one_walk():
+    response = {
+        "Blocks": [
+            create_line("Form W-2", 1, 0.05),
+            {
+                "BlockType": "KEY_VALUE_SET",
+                "Id": "1",
+                "EntityTypes": ["KEY"],
+                "Relationships": [{"Type": "VALUE", "Ids": ["2"]}, {"Type": "CHILD", "Ids": ["3"]}],
+            },
+            {
+                "BlockType": "KEY_VALUE_SET",
+                "Id": "2",
+                "EntityTypes": ["VALUE"],
+                "Relationships": [{"Type": "CHILD", "Ids": ["4"]}],
+            },
+            {"BlockType": "WORD", "Id": "3", "Text": "DogCow", "Confidence": 90.0},
+            {"BlockType": "WORD", "Id": "4", "Text": "Moof!", "Confidence": 80.0},
+            create_line("Employee's name", 1, 0.6),
+        ]
+    }
+    for block_id, block in enumerate(response["Blocks"]):
+        block.setdefault("Id", f"line-{block_id}")
+        block.setdefault("Confidence", 99.0)
 
-    response = Textract._split_list_by_30(w2.queries())
+    lines, forms = Textract._parse_lines_and_forms(response, ClassificationScope.HEADER, 0.25)
 
-    assert len(response[0]) == 30
-    assert len(response[1]) == 5
+    assert lines == Textract._lines_in_scope(response, ClassificationScope.HEADER, 0.25) == ["Form W-2"]
+    assert forms == Textract._parse_textract_forms(response) == {"DogCow": {"value": "Moof!", "confidence": 80.0}}
 
 
 def test_textract_parse_query_response():
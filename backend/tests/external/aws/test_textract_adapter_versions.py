@@ -0,0 +1,119 @@
+import os
+import threading
+from concurrent import futures
+from unittest import mock
+
+from src.external.aws.textract_adapter_versions import AdapterVersionCache, adapter_ids_from_environment
+
+adapter_version_cache = AdapterVersionCache()
+
+now = 0.0
+
+
+def setup_function():
+    global now
+    now = 0.0
+    adapter_version_cache.invalidate()
+    adapter_version_cache.ttl_seconds = 60
+    adapter_version_cache.clock = lambda: now
+
+
+def test_get_looks_up_once_within_the_ttl():
+    lookup = mock.MagicMock(return_value="1")
+
+    assert adapter_version_cache.get("adapter", lookup) == "1"
+    assert adapter_version_cache.get("adapter", lookup) == "1"
+
+    lookup.assert_called_once_with("adapter")
+
+
+def test_get_keys_by_adapter_id():
+    lookup = mock.MagicMock(side_effect=lambda adapter_id: f"{adapter_id} version")
+
+    assert adapter_version_cache.get("DogCow", lookup) == "DogCow version"
+    assert adapter_version_cache.get("Clarus", lookup) == "Clarus version"
+
+
+def test_get_returns_the_expired_version_while_refreshing_in_the_background():
+    global now
+    lookup = mock.MagicMock(side_effect=["1", "2"])
+    adapter_version_cache.get("adapter", lookup)
+
+    now = 61.0
+
+    assert adapter_version_cache.get("adapter", lookup) == "1"
+    adapter_version_cache._refreshes["adapter"].result(timeout=5)
+    assert adapter_version_cache.get("adapter", lookup) == "2"
+
+
+def test_invalidate_forces_a_new_lookup():
+    lookup = mock.MagicMock(side_effect=["1", "2"])
+    adapter_version_cache.get("adapter", lookup)
+
+    adapter_version_cache.invalidate("adapter")
+
+    assert adapter_version_cache.get("adapter", lookup) == "2"
+
+
+def test_warm_ignores_failed_lookups():
+    def lookup(adapter_id):
+        if adapter_id == "bad":
+            raise ValueError("No versions found for the specified adapter.")
+        return "1"
+
+    futures.wait(adapter_version_cache.warm(["bad", "good"], lookup), timeout=5)
+
+    never_called = mock.MagicMock()
+    assert adapter_version_cache.get("good", never_called) == "1"
+    never_called.assert_not_called()
+
+
+def test_warm_does_not_wait_for_the_lookups():
+    looking_up = threading.Event()
+    release = threading.Event()
+
+    def lookup(adapter_id):
+        looking_up.set()
+        release.wait(timeout=5)
+        return "1"
+
+    refreshes = adapter_version_cache.warm(["adapter"], lookup)
+
+    assert looking_up.wait(timeout=5)
+    assert not refreshes[0].done()
+    release.set()
+    assert refreshes[0].result(timeout=5) == "1"
+
+
+def test_get_waits_for_the_warm_up_in_flight_instead_of_looking_up_again():
+    looking_up = threading.Event()
+
+    def lookup(adapter_id):
+        looking_up.set()
+        return "1"
+
+    adapter_version_cache.warm(["adapter"], lookup)
+    assert looking_up.wait(timeout=5)
+
+    never_called = mock.MagicMock()
+    assert adapter_version_cache.get("adapter", never_called) == "1"
+    never_called.assert_not_called()
+
+
+def test_get_looks_up_itself_when_the_warm_up_has_not_started():
+    release = threading.Event()
+    adapter_version_cache.warm(["busy"], lambda adapter_id: release.wait(timeout=5) and "1")
+    queued_lookup = mock.MagicMock(return_value="queued")
+    refreshes = adapter_version_cache.warm(["adapter"], queued_lookup)
+
+    assert adapter_version_cache.get("adapter", lambda adapter_id: "2") == "2"
+
+    release.set()
+    assert refreshes[0].cancelled()
+    queued_lookup.assert_not_called()
+
+
+def test_adapter_ids_from_environment():
+    environment = {"TEXTRACT_ADAPTER_ID_W2_0": "first", "TEXTRACT_ADAPTER_ID_W2_1": "second", "OTHER": "nope"}
+    with mock.patch.dict(os.environ, environment, clear=True):
+        assert sorted(adapter_ids_from_environment()) == ["first", "second"]
@@ -0,0 +1,123 @@
+from unittest import mock
+
+from src import context
+from src.database.database import Database
+from src.external.aws import reprocess_textract_archive
+from src.external.aws.textract import Textract
+from src.external.aws.textract_archive import FORMS_PARSER, QUERIES_PARSER, TextractArchive
+from src.forms.w2 import W2
+
+context = context.ApplicationContext()
+
+
+class DirectoryStorage:
+    """Stores what's put into any bucket in a local folder, laid out like a copy of the archive."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def put_object(self, bucket_name, key, body, metadata):
+        path = self.directory / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(body)
+
+
+def setup_function():
+    context.reset()
+
+
+def query_response(query, answer, job_id):
+    return {
+        "JobStatus": "SUCCEEDED",
+        "Blocks": [
+            {
+                "BlockType": "QUERY",
+                "Id": f"{job_id}-q",
+                "Query": {"Text": query},
+                "Relationships": [{"Type": "ANSWER", "Ids": [f"{job_id}-a"]}],
+            },
+            {"BlockType": "QUERY_RESULT", "Id": f"{job_id}-a", "Text": answer, "Confidence": 99.0},
+        ],
+    }
+
+
+def archive_scan(archive, document_url, job_answers, parser=QUERIES_PARSER, form=None):
+    job_ids = list(job_answers)
+    for job_id, (query, answer) in job_answers.items():
+        responses = [query_response(query, answer, job_id)]
+        assert list(archive.recording(responses, document_url, form, parser, job_id, job_ids)) == responses
+
+
+def test_recording_archives_the_responses_once_they_are_consumed(tmp_path):
+    archive = TextractArchive(DirectoryStorage(tmp_path), "bucket")
+    pages = [query_response("Who?", "Clarus", "job-1"), query_response("Says?", "Moof!", "job-1")]
+
+    recording = archive.recording(iter(pages), "s3://bucket/input/DogCow.jpg", W2(), QUERIES_PARSER, "job-1", ["job-1"])
+    assert next(recording) == pages[0]
+    assert not (tmp_path / "ocr-archive/DogCow/job-1.jsonl.gz").exists()
+    assert list(recording) == pages[1:]
+
+    header, responses = TextractArchive.open((tmp_path / "ocr-archive/DogCow/job-1.jsonl.gz").read_bytes())
+    assert header["document_url"] == "s3://bucket/input/DogCow.jpg"
+    assert header["document_type"] == "W2"
+    assert header["job_ids"] == ["job-1"]
+    assert list(responses) == pages
+
+
+def test_forms_scan_is_archived():
+    mock_textract_client = mock.MagicMock()
+    mock_textract_client.analyze_document.return_value = {"Blocks": []}
+    mock_cloud_storage = mock.MagicMock()
+    with mock.patch("src.external.aws.clients.client", return_value=mock_textract_client):
+        textract = Textract()
+    textract.archive = TextractArchive(mock_cloud_storage, "archive-bucket")
+
+    textract.scan("s3://bucket/input/DogCow.jpg", None)
+
+    bucket_name, key, body, _ = mock_cloud_storage.put_object.call_args.args
+    header, responses = TextractArchive.open(body)
+    assert bucket_name == "archive-bucket"
+    assert key == f"ocr-archive/DogCow/{header['job_id']}.jsonl.gz"
+    assert header["parser"] == FORMS_PARSER
+    assert list(responses) == [{"Blocks": []}]
+
+
+def test_reprocess_writes_the_latest_scan_of_every_document(tmp_path):
+    archive = TextractArchive(DirectoryStorage(tmp_path), "bucket", prefix="")
+    archive_scan(archive, "s3://bucket/input/DogCow.jpg", {"old-job": ("Who?", "Clarence")})
+    archive_scan(archive, "s3://bucket/input/DogCow.jpg", {"job-1": ("Who?", "Clarus"), "job-2": ("Says?", "Moof!")})
+    archive_scan(
+        archive, "s3://bucket/input/Incomplete.jpg", {"job-3": ("Who?", "Clarus"), "job-4": ("Says?", "Moof!")}
+    )
+    (tmp_path / "Incomplete/job-4.jsonl.gz").unlink()
+    mock_database = mock.MagicMock()
+    mock_database.get_document.return_value = None
+    context.register(Database, mock_database)
+
+    archived_documents = reprocess_textract_archive.archived_documents_in_directory(tmp_path)
+    reprocessed, skipped, failed = reprocess_textract_archive.reprocess(archived_documents, max_workers=2)
+
+    assert (reprocessed, skipped, failed) == (["DogCow"], ["Incomplete"], [])
+    document_item = mock_database.write_document.call_args.args[0]
+    assert document_item.document_id == "DogCow"
+    assert document_item.extracted_data == {
+        "Who?": {"value": "Clarus", "confidence": 99.0},
+        "Says?": {"value": "Moof!", "confidence": 99.0},
+    }
+
+
+def test_archived_documents_in_bucket_are_grouped_by_document():
+    mock_cloud_storage = mock.MagicMock()
+    mock_cloud_storage.list_files.return_value = [
+        "s3://bucket/ocr-archive/DogCow/job-1.jsonl.gz",
+        "s3://bucket/ocr-archive/DogCow/job-2.jsonl.gz",
+        "s3://bucket/ocr-archive/Clarus/job-3.jsonl.gz",
+        "s3://bucket/ocr-archive/Clarus/notes.txt",
+    ]
+
+    archived_documents = reprocess_textract_archive.archived_documents_in_bucket(mock_cloud_storage, "bucket")
+
+    assert archived_documents == {
+        "DogCow": ["s3://bucket/ocr-archive/DogCow/job-1.jsonl.gz", "s3://bucket/ocr-archive/DogCow/job-2.jsonl.gz"],
+        "Clarus": ["s3://bucket/ocr-archive/Clarus/job-3.jsonl.gz"],
+    }
@@ -0,0 +1,117 @@
+import os
+from unittest import mock
+
+import pytest
+
+from src.external.aws.textract_query_planner import format_pages, parse_pages, plan_queries
+from src.forms.data_form import DataForm
+from src.forms.w2 import W2
+
+
+def numbered_queries(count, prefix="Query"):
+    return [f"{prefix} {number}" for number in range(count)]
+
+
+def test_all_page_queries_are_planned_in_declaration_order_jobs_of_30():
+    plan = plan_queries(W2(), adapter_ids={})
+
+    assert [len(job.queries) for job in plan.jobs] == [30, 5]
+    assert [query.text for job in plan.jobs for query in job.queries] == W2().queries()
+    assert all(job.adapter_pages() == {} for job in plan.jobs)
+
+
+def test_queries_on_different_pages_share_a_job():
+    first_page_queries = numbered_queries(30, "First page")
+    second_page_queries = numbered_queries(30, "Second page")
+    form = DataForm(
+        "DOGCOW",
+        "DogCow Form",
+        first_page_queries + second_page_queries,
+        {
+            **{query: ["1"] for query in first_page_queries},
+            **{query: ["2-*"] for query in second_page_queries},
+        },
+    )
+
+    plan = plan_queries(form, adapter_ids={})
+
+    (job,) = plan.jobs
+    assert len(job.queries) == 60
+    assert job.queries_config()[0] == {"Text": "First page 0", "Pages": ["1"]}
+    assert job.queries_config()[-1] == {"Text": "Second page 29", "Pages": ["2-*"]}
+
+
+def test_a_page_is_never_asked_more_than_30_queries():
+    queries = numbered_queries(40)
+    form = DataForm("DOGCOW", "DogCow Form", queries, {query: ["2"] for query in queries[:20]})
+
+    plan = plan_queries(form, adapter_ids={})
+
+    # 20 queries on page 2 and 20 on every page add up to 40 on page 2
+    assert [len(job.queries) for job in plan.jobs] == [30, 10]
+    assert [query.text for query in plan.jobs[1].queries] == queries[30:]
+
+
+def test_adapters_only_share_a_job_on_different_pages():
+    queries = numbered_queries(60)
+    form = DataForm(
+        "DOGCOW",
+        "DogCow Form",
+        queries,
+        {**{query: ["1"] for query in queries[:30]}, **{q: ["2"] for q in queries[30:]}},
+    )
+
+    plan = plan_queries(form, adapter_ids={0: "first-adapter", 1: "second-adapter"})
+
+    (job,) = plan.jobs
+    assert job.adapter_pages() == {"first-adapter": ["1"], "second-adapter": ["2"]}
+
+
+def test_queries_without_an_adapter_are_not_asked_on_an_adapters_pages():
+    queries = numbered_queries(31)
+    form = DataForm("DOGCOW", "DogCow Form", queries, {queries[30]: ["3"]})
+
+    plan = plan_queries(form, adapter_ids={0: "first-adapter"})
+
+    assert [len(job.queries) for job in plan.jobs] == [30, 1]
+    assert plan.jobs[0].adapter_pages() == {"first-adapter": ["*"]}
+    assert plan.jobs[1].adapter_pages() == {}
+
+
+def test_skipped_queries_keep_the_adapter_trained_for_them():
+    queries = numbered_queries(35)
+
+    with mock.patch.dict(os.environ, {"TEXTRACT_ADAPTER_ID_DOGCOW_1": "second-adapter"}):
+        plan = plan_queries(DataForm("DOGCOW", "DogCow Form", queries), skipped_queries=set(queries[:31]))
+
+    (job,) = plan.jobs
+    assert [query.text for query in job.queries] == queries[31:]
+    assert job.adapter_pages() == {"second-adapter": ["*"]}
+
+
+def test_nothing_is_planned_when_every_query_is_skipped():
+    queries = numbered_queries(3)
+
+    plan = plan_queries(DataForm("DOGCOW", "DogCow Form", queries), skipped_queries=set(queries), adapter_ids={})
+
+    assert plan.to_dict() == {"form": "DOGCOW", "jobs": []}
+
+
+def test_pages_round_trip_merged():
+    assert format_pages(parse_pages(["3", "1-2", "5-*", "6"])) == ["1-3", "5-*"]
+    assert format_pages(parse_pages(["2-*", "1"])) == ["*"]
+
+
+@pytest.mark.parametrize("pages", ["0", "3-2", "a", "*-2", ""])
+def test_invalid_pages_are_rejected(pages):
+    with pytest.raises(ValueError):
+        parse_pages([pages])
+
+
+def test_queries_past_the_last_page_are_left_out():
+    queries = numbered_queries(20)
+    form = DataForm("DOGCOW", "DogCow Form", queries, {query: ["2-*"] for query in queries[:5]})
+
+    plan = plan_queries(form, adapter_ids={}, max_queries_per_page=15, page_count=1)
+
+    assert [[query.text for query in job.queries] for job in plan.jobs] == [queries[5:]]
@@ -0,0 +1,166 @@
+import os
+from unittest import mock
+
+import botocore.exceptions
+import pytest
+
+from src.external.aws.textract import Textract
+from src.external.aws.textract_rate_limiter import DEFAULT_TRANSACTIONS_PER_SECOND, TextractRateLimiter, TokenBucket
+from src.ocr import OcrException
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class ThrottlingException(Exception):
+    def __init__(self):
+        super().__init__("Rate exceeded")
+        self.response = {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}
+
+
+class ThrottlingTextractClient:
+    """Throttles the first calls it gets on purpose, like Textract does when the account is over its quota."""
+
+    def __init__(self, throttled_calls):
+        self.throttled_calls = throttled_calls
+        self.calls = 0
+
+    def detect_document_text(self, Document):
+        self.calls += 1
+        if self.calls <= self.throttled_calls:
+            raise ThrottlingException()
+        return {"Blocks": [{"BlockType": "LINE", "Text": "Form W-2 Wage and Tax Statement", "Page": 1}]}
+
+
+def create_rate_limiter(clock):
+    rate_limiter = TextractRateLimiter.__wrapped__()
+    rate_limiter.clock = clock
+    rate_limiter.sleep = clock.sleep
+    return rate_limiter
+
+
+def create_textract(textract_client, rate_limiter):
+    with mock.patch("src.external.aws.clients.client", return_value=textract_client):
+        textract = Textract()
+    textract.rate_limiter = rate_limiter
+    return textract
+
+
+def test_token_bucket_allows_a_burst_then_paces_calls():
+    clock = FakeClock()
+    bucket = TokenBucket(2, clock, clock.sleep)
+
+    waits = [bucket.acquire() for _ in range(4)]
+
+    assert waits == [0, 0, 0.5, 0.5]
+    assert clock.now == 1.0
+
+
+def test_token_bucket_slows_down_when_throttled_and_recovers():
+    clock = FakeClock()
+    bucket = TokenBucket(10, clock, clock.sleep)
+
+    bucket.throttled()
+    bucket.throttled()
+    assert bucket.rate == 2.5
+
+    for _ in range(100):
+        bucket.succeeded()
+    assert bucket.rate == 10
+
+
+def test_each_api_has_its_own_budget():
+    clock = FakeClock()
+    with mock.patch.dict(os.environ, {"TEXTRACT_TPS_ANALYZE_DOCUMENT": "1", "TEXTRACT_TPS_DETECT_DOCUMENT_TEXT": "1"}):
+        rate_limiter = create_rate_limiter(clock)
+
+        rate_limiter.call("analyze_document", lambda: None)
+        rate_limiter.call("detect_document_text", lambda: None)
+        rate_limiter.call("analyze_document", lambda: None)
+
+    assert rate_limiter.metrics()["analyze_document"]["wait_seconds"] == 1
+    assert rate_limiter.metrics()["detect_document_text"]["wait_seconds"] == 0
+
+
+def test_throttled_calls_are_retried_with_backoff():
+    clock = FakeClock()
+    textract_client = ThrottlingTextractClient(throttled_calls=3)
+    textract = create_textract(textract_client, create_rate_limiter(clock))
+
+    lines = textract.extract_raw_text("s3://bucket/input/DogCow.jpg")
+
+    assert lines == ["Form W-2 Wage and Tax Statement"]
+    assert textract_client.calls == 4
+    metrics = textract.rate_limiter.metrics()["detect_document_text"]
+    assert metrics["calls"] == 4
+    assert metrics["throttles"] == 3
+    assert clock.now == pytest.approx(metrics["wait_seconds"] + metrics["backoff_seconds"])
+
+
+def test_call_fails_once_every_attempt_is_throttled():
+    clock = FakeClock()
+    rate_limiter = create_rate_limiter(clock)
+    rate_limiter.max_attempts = 3
+    textract_client = ThrottlingTextractClient(throttled_calls=10)
+    textract = create_textract(textract_client, rate_limiter)
+
+    with pytest.raises(OcrException):
+        textract.extract_raw_text("s3://bucket/input/DogCow.jpg")
+
+    assert textract_client.calls == 3
+
+
+def test_other_errors_are_not_retried():
+    rate_limiter = create_rate_limiter(FakeClock())
+    failing_call = mock.MagicMock(side_effect=ValueError("bad request"))
+
+    with pytest.raises(ValueError):
+        rate_limiter.call("analyze_document", failing_call)
+
+    failing_call.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        botocore.exceptions.ClientError(
+            {"Error": {"Code": "InternalServerError"}, "ResponseMetadata": {"HTTPStatusCode": 500}}, "AnalyzeDocument"
+        ),
+        botocore.exceptions.ClientError(
+            {"Error": {"Code": "Unknown"}, "ResponseMetadata": {"HTTPStatusCode": 503}}, "AnalyzeDocument"
+        ),
+        botocore.exceptions.ReadTimeoutError(endpoint_url="https://textract"),
+        botocore.exceptions.EndpointConnectionError(endpoint_url="https://textract"),
+    ],
+)
+def test_transient_errors_are_retried_without_slowing_down(error):
+    rate_limiter = create_rate_limiter(FakeClock())
+    flaky_call = mock.MagicMock(side_effect=[error, error, {"Blocks": []}])
+
+    assert rate_limiter.call("analyze_document", flaky_call) == {"Blocks": []}
+
+    assert flaky_call.call_count == 3
+    metrics = rate_limiter.metrics()["analyze_document"]
+    assert (metrics["transient_errors"], metrics["throttles"]) == (2, 0)
+    assert rate_limiter._bucket("analyze_document").rate == DEFAULT_TRANSACTIONS_PER_SECOND["analyze_document"]
+
+
+def test_client_errors_are_not_retried():
+    rate_limiter = create_rate_limiter(FakeClock())
+    error = botocore.exceptions.ClientError(
+        {"Error": {"Code": "InvalidParameterException"}, "ResponseMetadata": {"HTTPStatusCode": 400}}, "AnalyzeDocument"
+    )
+    failing_call = mock.MagicMock(side_effect=error)
+
+    with pytest.raises(botocore.exceptions.ClientError):
+        rate_limiter.call("analyze_document", failing_call)
+
+    failing_call.assert_called_once()
@@ -0,0 +1,46 @@
+from src.forms.matcher import FormMatcher, normalize
+
+
+def test_normalize_ignores_case_spacing_and_hyphens():
+    assert normalize("Form W-2") == normalize("form  w2") == normalize("FORM W - 2") == " form w 2 "
+
+
+def test_match_tolerates_ocr_noise():
+    matcher = FormMatcher([("W2", "W-2"), ("1099NEC", "1099-NEC"), ("DD214", "DD FORM 214")])
+
+    assert matcher.match(["Form W2 Wage and Tax Statement"])[0].form == "W2"
+    assert matcher.match(["form 1099 nec"])[0].form == "1099NEC"
+    assert matcher.match(["DD Form 214, AUG 2009"])[0].form == "DD214"
+
+
+def test_match_only_matches_whole_words():
+    matcher = FormMatcher([("W2", "W-2")])
+
+    assert matcher.match(["new 2025 rules"]) == []
+
+
+def test_match_stops_at_the_first_decisive_match():
+    matcher = FormMatcher([("W2", "W-2"), ("DD214", "DD FORM 214")])
+
+    candidates = matcher.match(["DD FORM 214", "Copy of W-2 attached"])
+
+    assert [candidate.form for candidate in candidates] == ["DD214"]
+
+
+def test_match_scores_every_candidate_when_not_decisive():
+    matcher = FormMatcher([("W2", "W-2"), ("DD214", ["DD FORM 214", "DD-214"])], decisive_score=3)
+
+    candidates = matcher.match(["Attach W-2 here", "DD FORM 214", "See DD-214", "W-2"])
+
+    assert [(candidate.form, candidate.score, candidate.first_line) for candidate in candidates] == [
+        ("W2", 2, 0),
+        ("DD214", 2, 1),
+    ]
+
+
+def test_match_with_overlapping_patterns():
+    matcher = FormMatcher([("short", "FORM 214"), ("long", "DD FORM 214 MEMBER")], decisive_score=2)
+
+    candidates = matcher.match(["DD FORM 214 MEMBER 4"])
+
+    assert sorted(candidate.form for candidate in candidates) == ["long", "short"]
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from src.forms.data_form import DataForm
+from src.forms.registry import FormEntry, FormRegistry
+from src.forms.w2 import W2
+
+
+def test_discover_finds_every_form_implementation(tmp_path):
+    registry = FormRegistry.discover(definitions_folder=tmp_path)
+
+    assert sorted(registry.identifiers()) == ["1099NEC", "DD214", "W2"]
+    assert isinstance(registry.form("W2"), W2)
+
+
+def test_discover_finds_forms_defined_as_data(tmp_path):
+    definition = {
+        "identifier": "DOGCOW",
+        "form_matches": "DogCow Form",
+        "queries": ["What does the DogCow say?"],
+        "query_pages": {"What does the DogCow say?": ["2"]},
+    }
+    tmp_path.joinpath("dogcow.json").write_text(json.dumps(definition))
+
+    registry = FormRegistry.discover(definitions_folder=tmp_path)
+    form = registry.form("DOGCOW")
+
+    assert isinstance(form, DataForm)
+    assert form.form_matches() == "DogCow Form"
+    assert form.queries() == ["What does the DogCow say?"]
+    assert form.query_pages() == {"What does the DogCow say?": ["2"]}
+
+
+def test_manifest_round_trip(tmp_path):
+    manifest_file = tmp_path.joinpath("manifest.json")
+    FormRegistry.discover(definitions_folder=tmp_path).write_manifest(manifest_file)
+
+    registry = FormRegistry.load(manifest_file)
+
+    assert sorted(registry.identifiers()) == ["1099NEC", "DD214", "W2"]
+    assert registry.form("W2").queries() == W2().queries()
+
+
+def test_forms_are_only_loaded_when_asked_for():
+    registry = FormRegistry([FormEntry("MISSING", "Missing Form", "src.forms.does_not_exist", "Missing")])
+
+    candidates = registry.matcher().match(["This is the Missing Form"])
+
+    assert candidates[0].form == "MISSING"
+    with pytest.raises(ModuleNotFoundError):
+        registry.form("MISSING")
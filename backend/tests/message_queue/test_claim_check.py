@@ -0,0 +1,71 @@
+import gzip
+import json
+from unittest import mock
+
+from src import context
+from src.message_queue import ClaimCheckMessageQueue, claim_check
+from src.storage import CloudStorage
+
+context = context.ApplicationContext()
+
+
+def setup_function():
+    context.reset()
+
+
+def create_claim_check_queue(threshold_bytes=100):
+    mock_queue = mock.MagicMock()
+    mock_cloud_storage = mock.MagicMock()
+    return (
+        ClaimCheckMessageQueue(mock_queue, mock_cloud_storage, "bucket", threshold_bytes),
+        mock_queue,
+        mock_cloud_storage,
+    )
+
+
+def test_small_message_is_sent_as_is():
+    claim_check_queue, mock_queue, mock_cloud_storage = create_claim_check_queue()
+
+    claim_check_queue.send_message("https://asdf/queue/url", "small message")
+
+    mock_queue.send_message.assert_called_with("https://asdf/queue/url", "small message")
+    mock_cloud_storage.put_object.assert_not_called()
+
+
+def test_large_message_is_stored_and_sent_as_a_claim_check():
+    claim_check_queue, mock_queue, mock_cloud_storage = create_claim_check_queue()
+    message = json.dumps({"extracted_data": {"field": "value" * 100}})
+
+    claim_check_queue.send_message("https://asdf/queue/url", message)
+
+    bucket_name, key, body, _ = mock_cloud_storage.put_object.call_args.args
+    assert bucket_name == "bucket"
+    assert key.startswith("claim-check/")
+    assert gzip.decompress(body).decode("utf-8") == message
+
+    sent_message = mock_queue.send_message.call_args.args[1]
+    assert claim_check.is_claim_check(sent_message)
+    assert json.loads(sent_message) == {"claim_check": f"s3://bucket/{key}"}
+
+
+def test_resolve_gets_the_stored_message():
+    claim_check_queue, mock_queue, mock_cloud_storage = create_claim_check_queue()
+    message = json.dumps({"extracted_data": {"field": "value" * 100}})
+    claim_check_queue.send_message("https://asdf/queue/url", message)
+
+    _, _, stored_body, _ = mock_cloud_storage.put_object.call_args.args
+    mock_cloud_storage.get_file.return_value = stored_body
+    context.register(CloudStorage, mock_cloud_storage)
+
+    assert claim_check.resolve(mock_queue.send_message.call_args.args[1]) == message
+
+
+def test_resolve_returns_inline_messages_without_storage():
+    mock_cloud_storage = mock.MagicMock()
+    context.register(CloudStorage, mock_cloud_storage)
+
+    assert (
+        claim_check.resolve('{"document_url": "s3://bucket/input/a.jpg"}')
+        == '{"document_url": "s3://bucket/input/a.jpg"}'
+    )
+    mock_cloud_storage.get_file.assert_not_called()
@@ -0,0 +1,88 @@
+import threading
+from unittest import mock
+
+from src import context
+from src.storage import CloudStorage
+
+application_context = context.ApplicationContext()
+
+
+def setup_function():
+    application_context.reset()
+
+
+@context.inject
+def function_to_inject(argument, cloud_storage: CloudStorage = None, untyped=None):
+    return cloud_storage
+
+
+def test_inject_uses_the_registered_implementation():
+    mock_cloud_storage = mock.MagicMock()
+    application_context.register(CloudStorage, mock_cloud_storage)
+
+    assert function_to_inject("argument") is mock_cloud_storage
+
+
+def test_inject_does_not_override_a_passed_in_argument():
+    application_context.register(CloudStorage, mock.MagicMock())
+    passed_in_cloud_storage = mock.MagicMock()
+
+    assert function_to_inject("argument", cloud_storage=passed_in_cloud_storage) is passed_in_cloud_storage
+
+
+def test_inject_without_a_registered_implementation_keeps_the_default():
+    assert function_to_inject("argument") is None
+
+
+def test_inject_only_reflects_on_the_function_once():
+    @context.inject
+    def another_function_to_inject(cloud_storage: CloudStorage = None):
+        return cloud_storage
+
+    with mock.patch("src.context.get_type_hints", wraps=context.get_type_hints) as spied_get_type_hints:
+        another_function_to_inject()
+        another_function_to_inject()
+
+    spied_get_type_hints.assert_called_once()
+
+
+def test_provider_is_only_called_on_first_use():
+    mock_cloud_storage = mock.MagicMock()
+    provider = mock.MagicMock(return_value=mock_cloud_storage)
+    application_context.register_provider(CloudStorage, provider)
+
+    provider.assert_not_called()
+    assert application_context.exists(CloudStorage)
+
+    assert function_to_inject("argument") is mock_cloud_storage
+    assert function_to_inject("argument") is mock_cloud_storage
+    provider.assert_called_once()
+
+
+def test_register_replaces_a_provider():
+    provider = mock.MagicMock()
+    application_context.register_provider(CloudStorage, provider)
+    mock_cloud_storage = mock.MagicMock()
+
+    application_context.register(CloudStorage, mock_cloud_storage)
+
+    assert application_context.implementation(CloudStorage) is mock_cloud_storage
+    provider.assert_not_called()
+
+
+def test_provider_can_inject_another_provided_implementation():
+    mock_cloud_storage = mock.MagicMock()
+    application_context.register_provider(CloudStorage, lambda: mock_cloud_storage)
+
+    @context.inject
+    def provider(cloud_storage: CloudStorage = None):
+        return {"cloud_storage": cloud_storage}
+
+    application_context.register_provider(dict, provider)
+
+    result = []
+    thread = threading.Thread(target=lambda: result.append(application_context.implementation(dict)), daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+
+    assert result == [{"cloud_storage": mock_cloud_storage}]
@@ -7,8 +7,11 @@ resource "aws_api_gateway_deployment" "api_deployment" {
   rest_api_id = aws_api_gateway_rest_api.api.id
 
   triggers = {
-    redeployment_for_document    = module.document_endpoints.resource_method_integration_configuration_hash
-    redeployment_for_document_id = module.document_id_endpoints.resource_method_integration_configuration_hash
+    redeployment_for_document        = module.document_endpoints.resource_method_integration_configuration_hash
+    redeployment_for_document_id     = module.document_id_endpoints.resource_method_integration_configuration_hash
+    redeployment_for_document_status = module.document_status_endpoints.resource_method_integration_configuration_hash
+    redeployment_for_upload          = module.document_upload_endpoints.resource_method_integration_configuration_hash
+    redeployment_for_document_upload = module.document_id_upload_endpoints.resource_method_integration_configuration_hash
   }
 
   lifecycle {
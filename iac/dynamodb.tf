@@ -9,3 +9,20 @@ resource "aws_dynamodb_table" "extract_table" {
     type = "S"
   }
 }
+
+resource "aws_dynamodb_table" "idempotency_table" {
+  name     = "${local.project}-${var.environment}-idempotency"
+  hash_key = "idempotency_key"
+
+  billing_mode = "PAY_PER_REQUEST"
+
+  attribute {
+    name = "idempotency_key"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+}
@@ -64,6 +64,94 @@ module "document_id_endpoints" {
   depends_on = [aws_api_gateway_rest_api.api]
 }
 
+module "document_status_endpoints" {
+  source = "./endpoint"
+
+  api_gateway_name = aws_api_gateway_rest_api.api.name
+
+  handler_method_mapping = [
+    {
+      name              = "get-document-status"
+      handler_file_path = local.lambda_filename
+      handler_package   = "src.external.aws.lambdas.get_document_status.lambda_handler"
+      http_method       = "GET"
+    },
+  ]
+
+  resource_prefix       = "${local.project}-${var.environment}"
+  path_part             = "status"
+  resource_parent_id    = module.document_id_endpoints.resource_id
+  lambda_execution_role = aws_iam_role.execution_role.arn
+  kms_key_arn           = aws_kms_key.encryption.arn
+
+  environment_variables = {
+    DYNAMODB_TABLE = aws_dynamodb_table.extract_table.name
+  }
+
+  authorizer = aws_api_gateway_authorizer.authorizer.id
+
+  depends_on = [aws_api_gateway_rest_api.api]
+}
+
+module "document_upload_endpoints" {
+  source = "./endpoint"
+
+  api_gateway_name = aws_api_gateway_rest_api.api.name
+
+  handler_method_mapping = [
+    {
+      name              = "start-document-upload"
+      handler_file_path = local.lambda_filename
+      handler_package   = "src.external.aws.lambdas.s3_direct_upload.lambda_handler"
+      http_method       = "POST"
+    },
+  ]
+
+  resource_prefix       = "${local.project}-${var.environment}"
+  path_part             = "upload"
+  resource_parent_id    = module.document_endpoints.resource_id
+  lambda_execution_role = aws_iam_role.execution_role.arn
+  kms_key_arn           = aws_kms_key.encryption.arn
+
+  environment_variables = {
+    S3_BUCKET_NAME = aws_s3_bucket.document_storage.bucket
+    DYNAMODB_TABLE = aws_dynamodb_table.extract_table.name
+  }
+
+  authorizer = aws_api_gateway_authorizer.authorizer.id
+
+  depends_on = [aws_api_gateway_rest_api.api]
+}
+
+module "document_id_upload_endpoints" {
+  source = "./endpoint"
+
+  api_gateway_name = aws_api_gateway_rest_api.api.name
+
+  handler_method_mapping = [
+    {
+      name              = "complete-document-upload"
+      handler_file_path = local.lambda_filename
+      handler_package   = "src.external.aws.lambdas.s3_complete_upload.lambda_handler"
+      http_method       = "POST"
+    },
+  ]
+
+  resource_prefix       = "${local.project}-${var.environment}"
+  path_part             = "upload"
+  resource_parent_id    = module.document_id_endpoints.resource_id
+  lambda_execution_role = aws_iam_role.execution_role.arn
+  kms_key_arn           = aws_kms_key.encryption.arn
+
+  environment_variables = {
+    DYNAMODB_TABLE = aws_dynamodb_table.extract_table.name
+  }
+
+  authorizer = aws_api_gateway_authorizer.authorizer.id
+
+  depends_on = [aws_api_gateway_rest_api.api]
+}
+
 module "token_endpoints" {
   source = "./endpoint"
 
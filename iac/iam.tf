@@ -28,7 +28,7 @@ data "aws_iam_policy_document" "dynamodb_lambda_policy" {
   statement {
     effect    = "Allow"
     actions   = ["dynamodb:*"]
-    resources = [aws_dynamodb_table.extract_table.arn]
+    resources = [aws_dynamodb_table.extract_table.arn, aws_dynamodb_table.idempotency_table.arn]
   }
 }
 
@@ -90,7 +90,7 @@ data "aws_iam_policy_document" "sqs_lambda_policy" {
   statement {
     effect    = "Allow"
     actions   = ["sqs:*"]
-    resources = [aws_sqs_queue.queue_to_dynamo.arn]
+    resources = [aws_sqs_queue.queue_to_dynamo.arn, aws_sqs_queue.textract_completion.arn]
   }
 }
 
@@ -130,3 +130,61 @@ resource "aws_iam_role_policy_attachment" "attach_textract_permission_to_role" {
   role       = aws_iam_role.execution_role.name
   policy_arn = data.aws_iam_policy.lambda_textract_execution.arn
 }
+
+resource "aws_iam_role" "textract_notification_role" {
+  name = "${local.project}-${var.environment}-textract-notification-role"
+
+  assume_role_policy = data.aws_iam_policy_document.textract_assume_role.json
+}
+
+data "aws_iam_policy_document" "textract_assume_role" {
+  statement {
+    effect = "Allow"
+    principals {
+      type        = "Service"
+      identifiers = ["textract.amazonaws.com"]
+    }
+    actions = ["sts:AssumeRole"]
+  }
+}
+
+data "aws_iam_policy_document" "textract_notification_policy" {
+  statement {
+    effect    = "Allow"
+    actions   = ["sns:Publish"]
+    resources = [aws_sns_topic.textract_completion.arn]
+  }
+
+  statement {
+    effect = "Allow"
+    actions = [
+      "kms:Decrypt",
+      "kms:GenerateDataKey",
+    ]
+    resources = ["*"]
+  }
+}
+
+resource "aws_iam_role_policy" "textract_notification_policy" {
+  name   = "${local.project}-${var.environment}-textract-notification-policy"
+  role   = aws_iam_role.textract_notification_role.id
+  policy = data.aws_iam_policy_document.textract_notification_policy.json
+}
+
+data "aws_iam_policy_document" "pass_textract_notification_role_policy" {
+  statement {
+    effect    = "Allow"
+    actions   = ["iam:PassRole"]
+    resources = [aws_iam_role.textract_notification_role.arn]
+  }
+}
+
+resource "aws_iam_policy" "pass_textract_notification_role_policy" {
+  name   = "${local.project}-${var.environment}-pass-textract-notification-role-policy"
+  policy = data.aws_iam_policy_document.pass_textract_notification_role_policy.json
+}
+
+resource "aws_iam_role_policy_attachment" "attach_pass_textract_notification_role_to_role" {
+  role       = aws_iam_role.execution_role.name
+  policy_arn = aws_iam_policy.pass_textract_notification_role_policy.arn
+}
@@ -1,8 +1,17 @@
 locals {
   lambda_filename         = "${path.module}/../backend/dist/lambda.zip"
   lambda_source_code_hash = filebase64sha256(local.lambda_filename)
-  textract_environment_variables = merge(var.textract_form_adapters_env_var_mapping, {
-    SQS_QUEUE_URL = aws_sqs_queue.queue_to_dynamo.url
+  textract_notification_environment_variables = var.textract_completion_notifications ? {
+    TEXTRACT_NOTIFICATION_TOPIC_ARN = aws_sns_topic.textract_completion.arn
+    TEXTRACT_NOTIFICATION_ROLE_ARN  = aws_iam_role.textract_notification_role.arn
+  } : {}
+  textract_environment_variables = merge(var.textract_form_adapters_env_var_mapping, local.textract_notification_environment_variables, {
+    SQS_QUEUE_URL           = aws_sqs_queue.queue_to_dynamo.url
+    DYNAMODB_TABLE          = aws_dynamodb_table.extract_table.name
+    CLAIM_CHECK_BUCKET      = aws_s3_bucket.document_storage.bucket
+    EXTRACTION_CACHE_BUCKET = aws_s3_bucket.document_storage.bucket
+    IDEMPOTENCY_TABLE       = aws_dynamodb_table.idempotency_table.name
+    TEXTRACT_ARCHIVE_BUCKET = aws_s3_bucket.document_storage.bucket
   })
 }
 
@@ -67,8 +76,8 @@ resource "aws_lambda_function" "write_to_dynamodb" {
 
   environment {
     variables = {
-      SQS_QUEUE_URL  = aws_sqs_queue.queue_to_dynamo.url
-      DYNAMODB_TABLE = aws_dynamodb_table.extract_table.name
+      DYNAMODB_TABLE    = aws_dynamodb_table.extract_table.name
+      IDEMPOTENCY_TABLE = aws_dynamodb_table.idempotency_table.name
     }
   }
 }
@@ -76,7 +85,9 @@ resource "aws_lambda_function" "write_to_dynamodb" {
 resource "aws_lambda_event_source_mapping" "invoke_dynamodb_writer_from_sqs" {
   event_source_arn                   = aws_sqs_queue.queue_to_dynamo.arn
   function_name                      = aws_lambda_function.write_to_dynamodb.arn
-  maximum_batching_window_in_seconds = 0
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = 1 # SQS batches larger than 10 need a batching window
+  function_response_types            = ["ReportBatchItemFailures"]
 
   depends_on = [aws_iam_role_policy_attachment.attach_sqs_permission_to_role]
 }
@@ -128,3 +139,36 @@ resource "aws_lambda_provisioned_concurrency_config" "authorizer_concurrency" {
   provisioned_concurrent_executions = 1
   qualifier                         = aws_lambda_function.authorizer.version
 }
+
+resource "aws_lambda_function" "textract_completion" {
+  function_name = "${local.project}-${var.environment}-textract-completion"
+
+  filename         = local.lambda_filename
+  source_code_hash = local.lambda_source_code_hash
+
+  handler = "src.external.aws.lambdas.textract_completion.lambda_handler"
+
+  memory_size                    = 256
+  timeout                        = 30
+  runtime                        = "python3.13"
+  reserved_concurrent_executions = -1
+  publish                        = true
+
+  architectures = ["arm64"]
+
+  kms_key_arn = aws_kms_key.encryption.arn
+
+  role = aws_iam_role.execution_role.arn
+
+  environment {
+    variables = local.textract_environment_variables
+  }
+}
+
+resource "aws_lambda_event_source_mapping" "invoke_textract_completion_from_sqs" {
+  event_source_arn = aws_sqs_queue.textract_completion.arn
+  function_name    = aws_lambda_function.textract_completion.arn
+  batch_size       = 1
+
+  depends_on = [aws_iam_role_policy_attachment.attach_sqs_permission_to_role]
+}
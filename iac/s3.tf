@@ -31,6 +31,75 @@ resource "aws_s3_bucket_lifecycle_configuration" "document_storage_lifecycles" {
       days = 31
     }
   }
+
+  rule {
+    id     = "delete-claim-checked-messages"
+    status = "Enabled"
+
+    filter {
+      prefix = "claim-check/"
+    }
+
+    # longer than SQS keeps a message
+    expiration {
+      days = 15
+    }
+  }
+
+  rule {
+    id     = "delete-archived-ocr-responses"
+    status = "Enabled"
+
+    filter {
+      prefix = "ocr-archive/"
+    }
+
+    # the responses are as sensitive as the documents they were read from, so they aren't kept any longer
+    expiration {
+      days = 31
+    }
+  }
+
+  rule {
+    id     = "delete-stale-extraction-cache"
+    status = "Enabled"
+
+    filter {
+      prefix = "extraction-cache/"
+    }
+
+    # results under an old form or adapter version are never read again, and the rest hold the data of documents
+    # that are only kept this long
+    expiration {
+      days = 31
+    }
+  }
+
+  rule {
+    id     = "abort-abandoned-uploads"
+    status = "Enabled"
+
+    filter {
+      prefix = "input/"
+    }
+
+    abort_incomplete_multipart_upload {
+      days_after_initiation = 1
+    }
+  }
+}
+
+# browsers upload documents straight to the bucket with presigned URLs
+resource "aws_s3_bucket_cors_configuration" "document_storage_uploads" {
+  bucket = aws_s3_bucket.document_storage.id
+
+  cors_rule {
+    allowed_methods = ["POST", "PUT"]
+    allowed_origins = ["https://${aws_cloudfront_distribution.distribution.domain_name}"]
+    allowed_headers = ["*"]
+    expose_headers  = ["ETag"] # needed to complete a multipart upload
+    max_age_seconds = 3600
+  }
 }
 
 resource "aws_s3_bucket" "website_storage" {
@@ -0,0 +1,11 @@
+resource "aws_sns_topic" "textract_completion" {
+  name = "AmazonTextract-${local.project}-${var.environment}-completion"
+
+  kms_master_key_id = "alias/aws/sns"
+}
+
+resource "aws_sns_topic_subscription" "textract_completion_to_sqs" {
+  topic_arn = aws_sns_topic.textract_completion.arn
+  protocol  = "sqs"
+  endpoint  = aws_sqs_queue.textract_completion.arn
+}
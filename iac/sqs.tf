@@ -3,3 +3,46 @@ resource "aws_sqs_queue" "queue_to_dynamo" {
 
   kms_master_key_id = aws_kms_key.encryption.id
 }
+
+resource "aws_sqs_queue" "textract_completion" {
+  name = "${local.project}-${var.environment}-textract-completion"
+
+  # SNS can't deliver to a queue encrypted with a customer managed key without a key policy for it
+  sqs_managed_sse_enabled    = true
+  visibility_timeout_seconds = 30
+
+  # a notification that arrives before its jobs are recorded is delivered again, but one that never matches its
+  # document is set aside instead of retried until it expires
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.textract_completion_dead_letter.arn
+    maxReceiveCount     = 5
+  })
+}
+
+resource "aws_sqs_queue" "textract_completion_dead_letter" {
+  name = "${local.project}-${var.environment}-textract-completion-dead-letter"
+
+  sqs_managed_sse_enabled = true
+}
+
+resource "aws_sqs_queue_policy" "textract_completion" {
+  queue_url = aws_sqs_queue.textract_completion.id
+  policy    = data.aws_iam_policy_document.textract_completion_queue_policy.json
+}
+
+data "aws_iam_policy_document" "textract_completion_queue_policy" {
+  statement {
+    effect = "Allow"
+    principals {
+      type        = "Service"
+      identifiers = ["sns.amazonaws.com"]
+    }
+    actions   = ["sqs:SendMessage"]
+    resources = [aws_sqs_queue.textract_completion.arn]
+    condition {
+      test     = "ArnEquals"
+      variable = "aws:SourceArn"
+      values   = [aws_sns_topic.textract_completion.arn]
+    }
+  }
+}
@@ -12,3 +12,9 @@ variable "textract_form_adapters_env_var_mapping" {
   sensitive = true
   nullable  = true
 }
+
+variable "textract_completion_notifications" {
+  description = "Have Textract notify a completion handler when query jobs finish instead of polling for them"
+  type        = bool
+  default     = false
+}
@@ -18,7 +18,8 @@ export default function VerifyPage({ signOut }: VerifyPageProps) {
   } = useVerifyPage(signOut);
 
   function displayFilePreview(
-    base64_encoded_file: string,
+    base64_encoded_file?: string,
+    signed_url?: string,
     document_key?: string
   ) {
     // get file extension
@@ -26,8 +27,10 @@ export default function VerifyPage({ signOut }: VerifyPageProps) {
 
     const mimeType =
       fileExtension === 'pdf' ? 'application/pdf' : `image/${fileExtension}`;
-    // Base64 URL to display image
-    const base64Src = `data:${mimeType};base64,${base64_encoded_file}`;
+    // Base64 URL to display image, large files aren't inlined and are shown from the signed URL instead
+    const base64Src = base64_encoded_file
+      ? `data:${mimeType};base64,${base64_encoded_file}`
+      : signed_url;
 
     return (
       <div id="file-display-container">
@@ -171,10 +174,12 @@ export default function VerifyPage({ signOut }: VerifyPageProps) {
                     <div className="usa-card__body">
                       <div id="file-display-container"></div>
                       <div>
-                        {getDocumentResponseData?.base64_encoded_file &&
+                        {(getDocumentResponseData?.base64_encoded_file ||
+                          getDocumentResponseData?.signed_url) &&
                           displayFilePreview(
-                            getDocumentResponseData.base64_encoded_file,
-                            getDocumentResponseData.document_key
+                            getDocumentResponseData?.base64_encoded_file,
+                            getDocumentResponseData?.signed_url,
+                            getDocumentResponseData?.document_key
                           )}
                       </div>
                       <p>
@@ -41,6 +41,24 @@ describe('displayFileName', () => {
 describe('pollGetDocumentApi', () => {
   const mockAuthorizedFetch = api.authorizedFetch as ReturnType<typeof vi.fn>;
   const documentId = 'test-document-id';
+  const document = {
+    status: 'complete',
+    document_id: documentId,
+    document_key: 'input/test.pdf',
+  };
+
+  const statusResponse = (status: string, entityTag = `"${status}"`) => ({
+    ok: true,
+    status: 200,
+    headers: new Headers({ ETag: entityTag }),
+    json: vi.fn().mockResolvedValue({ status, document_id: documentId }),
+  });
+
+  const documentResponse = () => ({
+    ok: true,
+    status: 200,
+    json: vi.fn().mockResolvedValue(document),
+  });
 
   beforeEach(() => {
     vi.useFakeTimers();
@@ -50,22 +68,23 @@ describe('pollGetDocumentApi', () => {
     vi.useRealTimers();
   });
 
-  it('should return response data when API returns complete status', async () => {
-    // Mock a successful response with complete status
-    const mockResponse = {
-      ok: true,
-      status: 200,
-      json: vi.fn().mockResolvedValue({
-        status: 'complete',
-        document_id: documentId,
-        document_key: 'input/test.pdf',
-      }),
-    };
-    mockAuthorizedFetch.mockResolvedValue(mockResponse);
+  it('should return the document once its status is complete', async () => {
+    mockAuthorizedFetch
+      .mockResolvedValueOnce(statusResponse('complete'))
+      .mockResolvedValueOnce(documentResponse());
 
     const result = await pollGetDocumentApi(documentId, 1);
 
-    expect(mockAuthorizedFetch).toHaveBeenCalledWith(
+    expect(mockAuthorizedFetch).toHaveBeenNthCalledWith(
+      1,
+      `/api/document/${documentId}/status`,
+      {
+        method: 'GET',
+        headers: { Accept: 'application/json' },
+      }
+    );
+    expect(mockAuthorizedFetch).toHaveBeenNthCalledWith(
+      2,
       `/api/document/${documentId}`,
       {
         method: 'GET',
@@ -73,11 +92,7 @@ describe('pollGetDocumentApi', () => {
       }
     );
     expect(result).toEqual({
-      responseData: {
-        status: 'complete',
-        document_id: documentId,
-        document_key: 'input/test.pdf',
-      },
+      responseData: document,
       failure: undefined,
     });
   });
@@ -116,30 +131,28 @@ describe('pollGetDocumentApi', () => {
     });
   });
 
-  it('should retry when API returns non-complete status and eventually succeed', async () => {
-    // Mock responses: first with processing status, second with complete status
-    const mockProcessingResponse = {
-      ok: true,
-      status: 200,
-      json: vi.fn().mockResolvedValue({
-        status: 'processing',
-        document_id: documentId,
-      }),
-    };
+  it('should return unauthenticated failure when the document API returns 401', async () => {
+    mockAuthorizedFetch
+      .mockResolvedValueOnce(statusResponse('complete'))
+      .mockResolvedValueOnce({
+        ok: false,
+        status: 401,
+        statusText: 'Unauthorized',
+      });
 
-    const mockCompleteResponse = {
-      ok: true,
-      status: 200,
-      json: vi.fn().mockResolvedValue({
-        status: 'complete',
-        document_id: documentId,
-        document_key: 'input/test.pdf',
-      }),
-    };
+    const result = await pollGetDocumentApi(documentId, 1);
 
+    expect(result).toEqual({
+      failure: 'unauthenticated',
+      responseData: undefined,
+    });
+  });
+
+  it('should retry when the status is not complete and only get the document once it is', async () => {
     mockAuthorizedFetch
-      .mockResolvedValueOnce(mockProcessingResponse)
-      .mockResolvedValueOnce(mockCompleteResponse);
+      .mockResolvedValueOnce(statusResponse('processing'))
+      .mockResolvedValueOnce(statusResponse('complete'))
+      .mockResolvedValueOnce(documentResponse());
 
     // not awaiting because need to skip past the sleep
     const resultPromise = pollGetDocumentApi(documentId, 2, 1000);
@@ -150,29 +163,59 @@ describe('pollGetDocumentApi', () => {
     // now await the promise
     const result = await resultPromise;
 
-    expect(mockAuthorizedFetch).toHaveBeenCalledTimes(2);
+    expect(mockAuthorizedFetch).toHaveBeenCalledTimes(3);
+    expect(mockAuthorizedFetch).toHaveBeenNthCalledWith(
+      2,
+      `/api/document/${documentId}/status`,
+      {
+        method: 'GET',
+        headers: {
+          Accept: 'application/json',
+          'If-None-Match': '"processing"',
+        },
+      }
+    );
     expect(result).toEqual({
-      responseData: {
-        status: 'complete',
-        document_id: documentId,
-        document_key: 'input/test.pdf',
-      },
+      responseData: document,
       failure: undefined,
     });
   });
 
-  it('should return timeout failure after max attempts', async () => {
-    // Mock a response with non-complete status
-    const mockResponse = {
-      ok: true,
-      status: 200,
-      json: vi.fn().mockResolvedValue({
-        status: 'processing',
-        document_id: documentId,
-      }),
-    };
+  it('should retry when the status has not changed', async () => {
+    mockAuthorizedFetch
+      .mockResolvedValueOnce(statusResponse('processing'))
+      .mockResolvedValueOnce({ ok: false, status: 304 })
+      .mockResolvedValueOnce(statusResponse('complete'))
+      .mockResolvedValueOnce(documentResponse());
 
-    mockAuthorizedFetch.mockResolvedValue(mockResponse);
+    const resultPromise = pollGetDocumentApi(documentId, 3, 1000);
+
+    await vi.advanceTimersByTimeAsync(1000);
+    await vi.advanceTimersByTimeAsync(1000);
+
+    const result = await resultPromise;
+
+    expect(mockAuthorizedFetch).toHaveBeenCalledTimes(4);
+    expect(result).toEqual({
+      responseData: document,
+      failure: undefined,
+    });
+  });
+
+  it('should stop polling when the extraction failed', async () => {
+    mockAuthorizedFetch.mockResolvedValueOnce(statusResponse('failed'));
+
+    const result = await pollGetDocumentApi(documentId, 2, 1000);
+
+    expect(mockAuthorizedFetch).toHaveBeenCalledTimes(1);
+    expect(result).toEqual({
+      failure: 'failed',
+      responseData: undefined,
+    });
+  });
+
+  it('should return timeout failure after max attempts', async () => {
+    mockAuthorizedFetch.mockResolvedValue(statusResponse('processing'));
 
     const resultPromise = pollGetDocumentApi(documentId, 2, 1000);
 
@@ -181,6 +224,7 @@ describe('pollGetDocumentApi', () => {
 
     const result = await resultPromise;
 
+    expect(mockAuthorizedFetch).toHaveBeenCalledTimes(2);
     expect(result).toEqual({
       failure: 'timeout',
       responseData: undefined,
@@ -195,19 +239,10 @@ describe('pollGetDocumentApi', () => {
       statusText: 'Internal Server Error',
     };
 
-    const mockSuccessResponse = {
-      ok: true,
-      status: 200,
-      json: vi.fn().mockResolvedValue({
-        status: 'complete',
-        document_id: documentId,
-        document_key: 'input/test.pdf',
-      }),
-    };
-
     mockAuthorizedFetch
       .mockResolvedValueOnce(mockErrorResponse)
-      .mockResolvedValueOnce(mockSuccessResponse);
+      .mockResolvedValueOnce(statusResponse('complete'))
+      .mockResolvedValueOnce(documentResponse());
 
     const resultPromise = pollGetDocumentApi(documentId, 2, 1000);
 
@@ -215,13 +250,9 @@ describe('pollGetDocumentApi', () => {
 
     const result = await resultPromise;
 
-    expect(mockAuthorizedFetch).toHaveBeenCalledTimes(2);
+    expect(mockAuthorizedFetch).toHaveBeenCalledTimes(3);
     expect(result).toEqual({
-      responseData: {
-        status: 'complete',
-        document_id: documentId,
-        document_key: 'input/test.pdf',
-      },
+      responseData: document,
       failure: undefined,
     });
   });
@@ -230,15 +261,8 @@ describe('pollGetDocumentApi', () => {
     // Mock a thrown exception followed by a successful response
     mockAuthorizedFetch
       .mockRejectedValueOnce(new Error('Network error'))
-      .mockResolvedValueOnce({
-        ok: true,
-        status: 200,
-        json: vi.fn().mockResolvedValue({
-          status: 'complete',
-          document_id: documentId,
-          document_key: 'input/test.pdf',
-        }),
-      });
+      .mockResolvedValueOnce(statusResponse('complete'))
+      .mockResolvedValueOnce(documentResponse());
 
     const resultPromise = pollGetDocumentApi(documentId, 2, 1000);
 
@@ -246,13 +270,9 @@ describe('pollGetDocumentApi', () => {
 
     const result = await resultPromise;
 
-    expect(mockAuthorizedFetch).toHaveBeenCalledTimes(2);
+    expect(mockAuthorizedFetch).toHaveBeenCalledTimes(3);
     expect(result).toEqual({
-      responseData: {
-        status: 'complete',
-        document_id: documentId,
-        document_key: 'input/test.pdf',
-      },
+      responseData: document,
       failure: undefined,
     });
   });
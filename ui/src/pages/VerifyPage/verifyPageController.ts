@@ -2,6 +2,7 @@ import {
   authorizedFetch,
   ExtractedData,
   GetDocumentResponse,
+  GetDocumentStatusResponse,
   UpdateDocumentResponse,
 } from '../../utils/api.ts';
 
@@ -11,7 +12,7 @@ export function displayFileName(document_key?: string): string {
 
 interface PollGetDocumentApiResponse {
   responseData?: GetDocumentResponse;
-  failure?: 'unauthenticated' | 'timeout';
+  failure?: 'unauthenticated' | 'timeout' | 'failed';
 }
 
 export async function pollGetDocumentApi(
@@ -20,29 +21,49 @@ export async function pollGetDocumentApi(
   delay = 2000
 ): Promise<PollGetDocumentApiResponse> {
   const sleep = () => new Promise((resolve) => setTimeout(resolve, delay));
+  // the status is polled instead of the whole document, and only when it has changed since the last poll
+  let statusEntityTag: string | null = null;
 
   for (let retryAttempt = 0; retryAttempt < attempts; retryAttempt++) {
     try {
-      const response = await authorizedFetch(`/api/document/${documentId}`, {
-        method: 'GET',
-        headers: { Accept: 'application/json' },
-      });
+      const headers: Record<string, string> = { Accept: 'application/json' };
+      if (statusEntityTag) {
+        headers['If-None-Match'] = statusEntityTag;
+      }
 
-      if (response.status === 401 || response.status === 403) {
+      const statusResponse = await authorizedFetch(
+        `/api/document/${documentId}/status`,
+        { method: 'GET', headers }
+      );
+
+      if (statusResponse.status === 401 || statusResponse.status === 403) {
         return {
           failure: 'unauthenticated',
         };
-      } else if (!response.ok) {
+      } else if (statusResponse.status === 304) {
+        console.info(
+          `Attempt ${retryAttempt + 1} is not complete. Trying again shortly.`
+        );
+        await sleep();
+        continue;
+      } else if (!statusResponse.ok) {
         console.warn(
-          `Attempt ${retryAttempt + 1} failed: ${response.statusText}`
+          `Attempt ${retryAttempt + 1} failed: ${statusResponse.statusText}`
         );
         await sleep();
         continue;
       }
 
-      const result = (await response.json()) as GetDocumentResponse;
+      statusEntityTag = statusResponse.headers.get('ETag');
+      const statusResult =
+        (await statusResponse.json()) as GetDocumentStatusResponse;
 
-      if (result.status !== 'complete') {
+      if (statusResult.status === 'failed') {
+        console.error('The document failed to be extracted');
+        return {
+          failure: 'failed',
+        };
+      } else if (statusResult.status !== 'complete') {
         console.info(
           `Attempt ${retryAttempt + 1} is not complete. Trying again shortly.`
         );
@@ -50,11 +71,31 @@ export async function pollGetDocumentApi(
         continue;
       }
 
+      const response = await authorizedFetch(`/api/document/${documentId}`, {
+        method: 'GET',
+        headers: { Accept: 'application/json' },
+      });
+
+      if (response.status === 401 || response.status === 403) {
+        return {
+          failure: 'unauthenticated',
+        };
+      } else if (!response.ok) {
+        console.warn(
+          `Attempt ${retryAttempt + 1} failed: ${response.statusText}`
+        );
+        // the status is unchanged, so it has to be fetched again to try the document again
+        statusEntityTag = null;
+        await sleep();
+        continue;
+      }
+
       return {
-        responseData: result,
+        responseData: (await response.json()) as GetDocumentResponse,
       };
     } catch (err) {
       console.error(`Attempt ${retryAttempt + 1} failed:`, err);
+      statusEntityTag = null;
       await sleep();
     }
   }
@@ -18,6 +18,11 @@ export interface GetDocumentResponse {
   base64_encoded_file?: string;
 }
 
+export interface GetDocumentStatusResponse {
+  document_id: string;
+  status: string;
+}
+
 export interface ExtractedData {
   [key: string]: FieldData;
 }